@@ -0,0 +1,121 @@
+"""
+In-process BM25 index over knowledge base sections.
+
+Most support questions that get past the quick responses are still plain
+FAQ lookups ("Do you offer gift cards?"). The index scores every section
+against the question with Okapi BM25, heading terms counting double; when
+the best section clearly beats the runner-up, SupportBot returns it
+verbatim instead of running the agent.
+"""
+import os
+import re
+import math
+from collections import Counter
+from typing import Optional
+
+from agents.sections import Section
+
+KNOWLEDGE_DIRECT_ANSWERS = os.getenv("KNOWLEDGE_DIRECT_ANSWERS", "true").lower() == "true"
+# Minimum BM25 score, and how many times the runner-up's score the best
+# section must reach, for a direct answer
+DIRECT_ANSWER_MIN_SCORE = float(os.getenv("DIRECT_ANSWER_MIN_SCORE", "6.0"))
+DIRECT_ANSWER_MIN_MARGIN = float(os.getenv("DIRECT_ANSWER_MIN_MARGIN", "1.5"))
+# Share of the question's terms the section must contain
+DIRECT_ANSWER_MIN_COVERAGE = float(os.getenv("DIRECT_ANSWER_MIN_COVERAGE", "0.6"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the i me my we our you your is are was be do does did can could "
+    "would should to of for in on at by with and or it this that how what "
+    "when where which who why there please any if am have has get".split()
+)
+
+
+def analyze(text: str) -> list[str]:
+    """Index terms: lowercase words minus stopwords, with a plural 's' stripped."""
+    terms = []
+    for word in _WORD.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of sections."""
+
+    def __init__(self, sections: list[Section], k1: float = 1.5, b: float = 0.75):
+        self.sections = sections
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        self._lengths: list[int] = []
+        for doc_id, section in enumerate(sections):
+            terms = analyze(" ".join(section.parents[1:] + [section.heading])) * 2
+            terms += analyze(section.body)
+            self._lengths.append(len(terms))
+            for term, count in Counter(terms).items():
+                self._postings.setdefault(term, []).append((doc_id, count))
+        self._avg_length = sum(self._lengths) / len(self._lengths) if sections else 0.0
+        count = len(sections)
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.sections)
+
+    def search(self, query: str, limit: int = 5) -> list[tuple[Section, float, float]]:
+        """
+        Best sections for `query`.
+
+        Returns:
+            (section, BM25 score, share of distinct query terms it contains),
+            best first
+        """
+        terms = set(analyze(query))
+        if not terms or not self.sections:
+            return []
+        scores: dict[int, float] = {}
+        matched: Counter = Counter()
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / self._avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                matched[doc_id] += 1
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [
+            (self.sections[doc_id], score, matched[doc_id] / len(terms))
+            for doc_id, score in best
+        ]
+
+    def direct_answer(
+        self,
+        query: str,
+        min_score: float = DIRECT_ANSWER_MIN_SCORE,
+        min_margin: float = DIRECT_ANSWER_MIN_MARGIN,
+        min_coverage: float = DIRECT_ANSWER_MIN_COVERAGE,
+    ) -> Optional[tuple[Section, float]]:
+        """
+        The section that answers `query` on its own, if the match is unambiguous.
+
+        Returns:
+            (section, score), or None when no section is a confident match
+        """
+        hits = self.search(query, limit=2)
+        if not hits:
+            return None
+        section, score, coverage = hits[0]
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        if score < min_score or coverage < min_coverage:
+            return None
+        if runner_up and score < runner_up * min_margin:
+            return None
+        return section, score
@@ -0,0 +1,109 @@
+"""
+Text embeddings for GoBuddy AI Agents.
+
+Two interchangeable embedders with an async `embed(texts)` returning an
+L2-normalized float32 matrix (one row per text), so cosine similarity is a
+dot product:
+
+- OpenAIEmbedder: OpenAI embedding models; best paraphrase matching
+- HashingEmbedder: local feature hashing over words and character trigrams;
+  no network or model download, good for near-duplicate wording and tests
+"""
+import os
+import re
+import hashlib
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("gobuddy.embeddings")
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "2"))
+
+_WORD = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an the i me my we our you your is are was be do does did can could "
+    "would should to of for in on at by with and or it this that how what "
+    "when where which who why there please".split()
+)
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-features embedding via the hashing trick."""
+
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> list[str]:
+        words = [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+        features = []
+        for word in words:
+            stem = word[:-1] if len(word) > 3 and word.endswith("s") else word
+            features.append(f"w:{stem}")
+            padded = f"^{stem}$"
+            features.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def embed_sync(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+                value = int.from_bytes(digest, "little")
+                # Words weigh more than their trigrams
+                weight = 2.0 if feature[0] == "w" else 1.0
+                sign = 1.0 if value & 1 else -1.0
+                matrix[row, (value >> 1) % self.dim] += sign * weight
+        return _normalize_rows(matrix)
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        return self.embed_sync(texts)
+
+
+class OpenAIEmbedder:
+    """Embeddings from the OpenAI API (client created on first use)."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, timeout: float = EMBEDDING_TIMEOUT_SECONDS):
+        self.model = model
+        self.timeout = timeout
+        self.name = f"openai-{model}"
+        self._client = None
+        self._sync_client = None
+
+    @staticmethod
+    def _to_matrix(response) -> np.ndarray:
+        vectors = [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+    async def embed(self, texts: list[str]) -> np.ndarray:
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            self._client = AsyncOpenAI(timeout=self.timeout, max_retries=0)
+        return self._to_matrix(await self._client.embeddings.create(model=self.model, input=texts))
+
+    def embed_sync(self, texts: list[str]) -> np.ndarray:
+        if self._sync_client is None:
+            from openai import OpenAI
+
+            self._sync_client = OpenAI(timeout=self.timeout, max_retries=0)
+        return self._to_matrix(self._sync_client.embeddings.create(model=self.model, input=texts))
+
+
+def create_embedder(kind: Optional[str] = None):
+    """Build the embedder named by `kind` ("openai" or "hashing")."""
+    kind = (kind or os.getenv("EMBEDDER", "openai")).lower()
+    if kind == "hashing":
+        return HashingEmbedder()
+    if kind != "openai":
+        logger.warning("Unknown embedder %s — using openai", kind)
+    return OpenAIEmbedder()
@@ -0,0 +1,107 @@
+"""
+Request fingerprints for GoBuddy AI Agents.
+
+Two requests that would produce the same answer should map to the same
+fingerprint even if they differ in casing, whitespace, punctuation or list
+order. Numbers that shape the answer, such as budgets, must match exactly:
+the plan is written for them. Used to coalesce concurrent identical runs
+and as a building block for response caching, together with
+`agent_signature`, which changes whenever an agent's prompt or model does.
+"""
+import re
+import json
+import hashlib
+from typing import Any, Optional
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_text(value: Optional[str]) -> Optional[str]:
+    """Casefold and collapse punctuation/whitespace: ' Bali,  Indonesia' -> 'bali indonesia'."""
+    if value is None:
+        return None
+    return _NON_WORD.sub(" ", value.casefold()).strip()
+
+
+def normalize_list(values: Optional[list[str]]) -> Optional[list[str]]:
+    """Normalize, de-duplicate and sort a list of free-text values."""
+    if not values:
+        return None
+    normalized = {normalize_text(v) for v in values}
+    return sorted(v for v in normalized if v) or None
+
+
+def normalize_budget(budget: Optional[float]) -> Optional[float]:
+    """A budget rounded to cents, so 2000 and 2000.0 match; None if unset."""
+    if budget is None:
+        return None
+    return round(float(budget), 2)
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return normalize_text(value)
+    if isinstance(value, (list, tuple, set)):
+        if all(isinstance(v, str) for v in value):
+            return normalize_list(list(value))
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in sorted(value.items())}
+    return value
+
+
+def request_fingerprint(kind: str, **params: Any) -> str:
+    """
+    Stable fingerprint of an agent request.
+
+    Args:
+        kind: Namespace for the request type (e.g. "trip_plan")
+        **params: Request parameters. Strings and string lists are normalized;
+            normalize numeric values like budgets before passing them in.
+
+    Returns:
+        Hex digest identifying the normalized request
+    """
+    canonical = json.dumps(
+        {"kind": kind, "params": _normalize(params)},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _describe(component: Any) -> Any:
+    if isinstance(component, str):
+        return component
+    if isinstance(component, type) and hasattr(component, "model_json_schema"):
+        return component.model_json_schema()
+    model = getattr(component, "model", None)
+    return {
+        "name": getattr(component, "name", None),
+        "role": getattr(component, "role", None),
+        "instructions": getattr(component, "instructions", None),
+        "model": getattr(model, "id", None),
+        "members": [
+            _describe(member)
+            for member in getattr(component, "agents", None) or getattr(component, "members", None) or []
+        ],
+    }
+
+
+def agent_signature(*components: Any) -> str:
+    """
+    Hash of what determines an agent's output besides the request.
+
+    Args:
+        *components: Agents or teams (name, role, instructions, model id and
+            team members are included), pydantic response models (their JSON
+            schema) or literal strings such as formatter instructions
+
+    Returns:
+        Short hex digest; include it in cache keys
+    """
+    canonical = json.dumps(
+        [_describe(c) for c in components], sort_keys=True, default=str
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()[:16]
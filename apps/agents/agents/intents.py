@@ -0,0 +1,170 @@
+"""
+Keyword intent matching for SupportBot quick responses.
+
+Intents are declared as keyword lists and compiled once into a word-level
+trie, so matching a message costs one pass over its words no matter how
+many intents are loaded. Keywords match whole words: "call" does not match
+"recall". Keyword syntax:
+
+- `refund`: the word "refund"
+- `cancel*`: any word starting with "cancel" (cancelled, cancellation)
+- `change booking`: the words "change" and "booking" in a row; only the last
+  word of a phrase may carry `*`
+
+An intent also has a priority (highest wins when several match; ties go to
+the intent declared first) and optional negative keywords that veto it.
+"""
+import re
+import json
+from pathlib import Path
+from typing import Optional, Union
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words of `text`; punctuation and apostrophes split words."""
+    return _WORD.findall(text.lower())
+
+
+class Intent:
+    """One quick-response intent."""
+
+    __slots__ = ("name", "response", "keywords", "negative", "priority", "order")
+
+    def __init__(
+        self,
+        name: str,
+        response: str,
+        keywords: list[str],
+        negative: Optional[list[str]] = None,
+        priority: int = 0,
+        order: int = 0,
+    ):
+        self.name = name
+        self.response = response
+        self.keywords = keywords
+        self.negative = negative or []
+        self.priority = priority
+        self.order = order
+
+
+class _Node:
+    __slots__ = ("children", "ids", "prefixes", "prefix_lengths")
+
+    def __init__(self):
+        self.children: dict[str, _Node] = {}
+        # Intent ids whose keyword ends at this node
+        self.ids: list[int] = []
+        # Word prefix -> intent ids, for keywords whose next word ends in "*"
+        self.prefixes: dict[str, list[int]] = {}
+        self.prefix_lengths: list[int] = []
+
+
+class _KeywordTrie:
+    """Word-level trie of keywords mapping to intent ids."""
+
+    def __init__(self):
+        self.root = _Node()
+
+    def add(self, keyword: str, intent_id: int) -> None:
+        prefix = keyword.rstrip().endswith("*")
+        words = tokenize(keyword)
+        if not words:
+            raise ValueError(f"Keyword {keyword!r} has no words")
+        node = self.root
+        for word in words[:-1]:
+            node = node.children.setdefault(word, _Node())
+        last = words[-1]
+        if prefix:
+            node.prefixes.setdefault(last, []).append(intent_id)
+            if len(last) not in node.prefix_lengths:
+                node.prefix_lengths.append(len(last))
+        else:
+            node.children.setdefault(last, _Node()).ids.append(intent_id)
+
+    def search(self, words: list[str]) -> set[int]:
+        """Ids of every intent with a keyword occurring in `words`."""
+        found: set[int] = set()
+        root = self.root
+        count = len(words)
+        for start in range(count):
+            node = root
+            position = start
+            while position < count:
+                word = words[position]
+                if node.prefixes:
+                    for length in node.prefix_lengths:
+                        ids = node.prefixes.get(word[:length])
+                        if ids:
+                            found.update(ids)
+                node = node.children.get(word)
+                if node is None:
+                    break
+                if node.ids:
+                    found.update(node.ids)
+                position += 1
+        return found
+
+
+class IntentMatcher:
+    """Compiled matcher over a fixed set of intents."""
+
+    def __init__(self, intents: list[Intent]):
+        self.intents = intents
+        self._positive = _KeywordTrie()
+        self._negative = _KeywordTrie()
+        for intent_id, intent in enumerate(intents):
+            for keyword in intent.keywords:
+                self._positive.add(keyword, intent_id)
+            for keyword in intent.negative:
+                self._negative.add(keyword, intent_id)
+
+    def match_all(self, text: str) -> list[Intent]:
+        """Every intent matching `text`, best first."""
+        words = tokenize(text)
+        if not words:
+            return []
+        candidates = self._positive.search(words)
+        if not candidates:
+            return []
+        candidates -= self._negative.search(words)
+        return sorted(
+            (self.intents[i] for i in candidates),
+            key=lambda intent: (-intent.priority, intent.order),
+        )
+
+    def match(self, text: str) -> Optional[Intent]:
+        """The best intent matching `text`, or None."""
+        matches = self.match_all(text)
+        return matches[0] if matches else None
+
+
+def load_intents(source: Union[str, Path, dict]) -> list[Intent]:
+    """
+    Read intents from a JSON file (or an already parsed mapping).
+
+    The file maps intent names to objects with `keywords` and `response`
+    and optional `negative` and `priority`:
+
+        {"contact": {"keywords": ["contact*", "phone"], "response": "...",
+                     "negative": ["contact lens*"], "priority": 10}}
+    """
+    if isinstance(source, dict):
+        data = source
+    else:
+        with open(source, encoding="utf-8") as f:
+            data = json.load(f)
+    intents = []
+    for order, (name, spec) in enumerate(data.items()):
+        intents.append(
+            Intent(
+                name=name,
+                response=spec["response"],
+                keywords=list(spec["keywords"]),
+                negative=list(spec.get("negative", [])),
+                priority=int(spec.get("priority", 0)),
+                order=order,
+            )
+        )
+    return intents
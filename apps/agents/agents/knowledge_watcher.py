@@ -0,0 +1,154 @@
+"""
+Hot reload of the knowledge directory.
+
+`KnowledgeWatcher` polls the directory for files whose mtime or size
+changed, confirms a real change by content hash (so a `touch` or a
+checkout that rewrites identical files is ignored) and hands the changed
+paths to a reload callback. The callback rebuilds whatever depends on the
+knowledge and swaps it in; requests keep using the previous version until
+then. The same diff runs on demand through `rescan()`, which is what the
+admin reload endpoint calls.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("gobuddy.knowledge_watcher")
+
+KNOWLEDGE_WATCH_ENABLED = os.getenv("KNOWLEDGE_WATCH_ENABLED", "true").lower() == "true"
+# How often the knowledge directory is polled for changes
+KNOWLEDGE_WATCH_SECONDS = float(os.getenv("KNOWLEDGE_WATCH_SECONDS", "10"))
+
+
+class KnowledgeChanges:
+    """Paths (relative to the watched directory) added, modified or removed."""
+
+    __slots__ = ("added", "modified", "removed")
+
+    def __init__(self, added: list[str], modified: list[str], removed: list[str]):
+        self.added = added
+        self.modified = modified
+        self.removed = removed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    def to_dict(self) -> dict:
+        return {"added": self.added, "modified": self.modified, "removed": self.removed}
+
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class KnowledgeWatcher:
+    """
+    Detects changed knowledge files and reloads them.
+
+    Args:
+        directory: Directory to watch (recursively)
+        on_change: Coroutine called with the changes; when it raises, the
+            changes are reported again on the next scan
+        interval: Seconds between background polls
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        on_change: Callable[[KnowledgeChanges], Awaitable[None]],
+        interval: float = KNOWLEDGE_WATCH_SECONDS,
+    ):
+        self.directory = directory
+        self.on_change = on_change
+        self.interval = interval
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        # relative path -> ((mtime_ns, size), sha256)
+        self._files: dict[str, tuple[tuple[int, int], str]] = self._scan({})
+        self.reloads = 0
+        self.failures = 0
+        self.last_reload: Optional[float] = None
+
+    def _scan(self, known: dict) -> dict[str, tuple[tuple[int, int], str]]:
+        """Current state of every file, hashing only those whose stat changed."""
+        files = {}
+        if not self.directory.exists():
+            return files
+        for path in sorted(p for p in self.directory.rglob("*") if p.is_file()):
+            name = path.relative_to(self.directory).as_posix()
+            try:
+                stat = path.stat()
+                key = (stat.st_mtime_ns, stat.st_size)
+                previous = known.get(name)
+                digest = previous[1] if previous and previous[0] == key else _file_hash(path)
+            except OSError:
+                # Deleted between listing and reading; treat as gone
+                continue
+            files[name] = (key, digest)
+        return files
+
+    def _diff(self, files: dict) -> KnowledgeChanges:
+        return KnowledgeChanges(
+            added=[name for name in files if name not in self._files],
+            modified=[
+                name for name, (_, digest) in files.items()
+                if name in self._files and self._files[name][1] != digest
+            ],
+            removed=[name for name in self._files if name not in files],
+        )
+
+    async def rescan(self) -> KnowledgeChanges:
+        """Diff the directory against the last reload and reload if anything changed."""
+        async with self._lock:
+            files = await asyncio.to_thread(self._scan, self._files)
+            changes = self._diff(files)
+            if not changes:
+                # Still record new mtimes so unchanged files aren't hashed again
+                self._files = files
+                return changes
+            logger.info("Knowledge changed: %s", changes.to_dict())
+            try:
+                await self.on_change(changes)
+            except Exception:
+                self.failures += 1
+                raise
+            self._files = files
+            self.reloads += 1
+            self.last_reload = time.time()
+            return changes
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.rescan()
+            except Exception as e:
+                logger.warning("Knowledge reload failed, keeping the current version: %s", e)
+
+    def start(self) -> None:
+        """Start polling in the background (call from the running event loop)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._files),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_reload": self.last_reload,
+            "watching": self._task is not None and not self._task.done(),
+        }
@@ -0,0 +1,209 @@
+"""
+Chunking and context packing for knowledge retrieval.
+
+What the support agent reads from the knowledge base goes into its prompt on
+every call, so it is kept small and on topic:
+
+- `chunk_sections` keeps every heading section whole (a FAQ question stays
+  with its answer) and only splits sections longer than a chunk budget,
+  at blank lines, never inside a paragraph, list or code block. Every
+  chunk carries its heading breadcrumb.
+- `ContextPacker` takes ranked chunks and keeps the best ones that fit a
+  token budget, dropping duplicates (the same text under two headings) and
+  backfilling from lower-ranked candidates.
+
+Token counts use the same rough 4-characters-per-token rule as the quota
+estimates; they are for budgeting, not billing.
+"""
+import os
+import re
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from agents.sections import Section
+
+logger = logging.getLogger("gobuddy.rag_context")
+
+# Longest chunk the chunker produces, unless a single paragraph is longer
+KNOWLEDGE_CHUNK_TOKENS = int(os.getenv("KNOWLEDGE_CHUNK_TOKENS", "300"))
+# Knowledge tokens a single search may add to the prompt
+KNOWLEDGE_CONTEXT_TOKENS = int(os.getenv("KNOWLEDGE_CONTEXT_TOKENS", "600"))
+# Ranked chunks the packer chooses from
+KNOWLEDGE_CANDIDATES = int(os.getenv("KNOWLEDGE_CANDIDATES", "12"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count of `text`."""
+    return (len(text) + 3) // 4
+
+
+def chunk_text(section: Section) -> str:
+    """Text of a chunk as embedded and shown to the model: breadcrumb, then body."""
+    return f"{section.title}\n\n{section.body}"
+
+
+def _blocks(body: str) -> list[str]:
+    """Blank-line separated blocks of `body`; code fences are never split."""
+    blocks: list[str] = []
+    current: list[str] = []
+    in_code = False
+    for line in body.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        if not line.strip() and not in_code:
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def chunk_section(section: Section, max_tokens: int = KNOWLEDGE_CHUNK_TOKENS) -> list[Section]:
+    """
+    Split `section` into chunks of at most `max_tokens` (breadcrumb included).
+
+    The first chunk keeps the section's id; later ones are `<id>-part-2`,
+    `<id>-part-3`... A block that is longer than `max_tokens` by itself
+    becomes its own oversized chunk rather than being cut.
+    """
+    if count_tokens(chunk_text(section)) <= max_tokens:
+        return [section]
+
+    header = count_tokens(section.title) + 1
+    groups: list[list[str]] = []
+    current: list[str] = []
+    size = header
+    for block in _blocks(section.body):
+        cost = count_tokens(block) + 1
+        if current and size + cost > max_tokens:
+            groups.append(current)
+            current = []
+            size = header
+        current.append(block)
+        size += cost
+    if current:
+        groups.append(current)
+
+    return [
+        Section(
+            id=section.id if n == 1 else f"{section.id}-part-{n}",
+            source=section.source,
+            heading=section.heading,
+            level=section.level,
+            parents=section.parents,
+            body="\n\n".join(group),
+        )
+        for n, group in enumerate(groups, start=1)
+    ]
+
+
+def chunk_sections(sections: list[Section], max_tokens: int = KNOWLEDGE_CHUNK_TOKENS) -> list[Section]:
+    """Chunks of every section, in order."""
+    return [chunk for section in sections for chunk in chunk_section(section, max_tokens)]
+
+
+class ContextTokens:
+    """Knowledge tokens one request pulled into its prompt, before and after packing."""
+
+    __slots__ = ("searches", "before", "after")
+
+    def __init__(self):
+        self.searches = 0
+        self.before = 0
+        self.after = 0
+
+    def to_dict(self) -> dict:
+        return {"searches": self.searches, "before": self.before, "after": self.after}
+
+
+_current_context: ContextVar[Optional[ContextTokens]] = ContextVar("gobuddy_context_tokens", default=None)
+
+
+@contextmanager
+def track_context() -> Iterator[ContextTokens]:
+    """Collect the knowledge tokens of every search inside the block."""
+    context = ContextTokens()
+    token = _current_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+
+
+class ContextPacker:
+    """
+    Fills a token budget with the best retrieved chunks.
+
+    Args:
+        budget: Maximum tokens of packed chunk text per search
+    """
+
+    def __init__(self, budget: int = KNOWLEDGE_CONTEXT_TOKENS):
+        self.budget = budget
+        self.searches = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.duplicates = 0
+        self.over_budget = 0
+
+    def pack(self, hits: list[tuple[Section, float]], limit: int) -> list[tuple[Section, float]]:
+        """
+        Best-first selection of at most `limit` of `hits` that fits the budget.
+
+        Chunks are taken in rank order; one that doesn't fit is skipped so a
+        shorter, lower-ranked chunk can still use the remaining budget. The
+        best chunk is always kept, even alone over budget.
+
+        Args:
+            hits: Ranked (chunk, score) candidates, best first
+            limit: Chunks a search returns; the top `limit` hits unpacked
+                are reported as the "before" figure
+        """
+        packed: list[tuple[Section, float]] = []
+        seen: set[str] = set()
+        used = 0
+        for section, score in hits:
+            if len(packed) >= limit:
+                break
+            key = _WHITESPACE.sub(" ", section.body).strip().lower()
+            if key in seen:
+                self.duplicates += 1
+                continue
+            cost = count_tokens(chunk_text(section))
+            if packed and used + cost > self.budget:
+                self.over_budget += 1
+                continue
+            seen.add(key)
+            packed.append((section, score))
+            used += cost
+
+        before = sum(count_tokens(chunk_text(section)) for section, _ in hits[:limit])
+        self.searches += 1
+        self.tokens_before += before
+        self.tokens_after += used
+        context = _current_context.get()
+        if context is not None:
+            context.searches += 1
+            context.before += before
+            context.after += used
+        logger.debug("Packed %d of %d chunks: %d -> %d tokens", len(packed), len(hits), before, used)
+        return packed
+
+    def stats(self) -> dict:
+        searches = self.searches or 1
+        return {
+            "budget": self.budget,
+            "searches": self.searches,
+            "avg_tokens_before": round(self.tokens_before / searches, 1),
+            "avg_tokens_after": round(self.tokens_after / searches, 1),
+            "tokens_saved": self.tokens_before - self.tokens_after,
+            "duplicates_dropped": self.duplicates,
+            "over_budget_dropped": self.over_budget,
+        }
@@ -11,6 +11,9 @@ from agno.models.openai import OpenAIChat
 from agno.memory import Memory
 from agno.tools.duckduckgo import DuckDuckGoTools
 
+from agents.fingerprint import agent_signature
+from agents.usage import record_usage
+
 
 # Structured output models
 class Destination(BaseModel):
@@ -73,12 +76,35 @@ recommender_agent = Agent(
     show_tool_calls=True,
 )
 
+# Memory-less recommender for non-personalized requests. Its answers are
+# cached and shared between users, so it must neither read nor learn from
+# any one user's memories.
+generic_recommender_agent = Agent(
+    name="TravelRecommender",
+    model=OpenAIChat(id="gpt-4o"),
+    tools=[DuckDuckGoTools()],
+    learning=False,
+    read_user_memories=False,
+    update_user_memories=False,
+    instructions=[
+        "You are a travel recommendation expert for GoBuddy Adventures.",
+        "Recommend destinations based only on the request and the preferences it states.",
+        "Consider: budget, travel style, interests and anything the user wants to avoid.",
+        "Suggest diverse options: popular destinations AND hidden gems.",
+        "Consider seasonality, current events, and practical travel factors.",
+        "Be enthusiastic but honest about destinations - mention any potential downsides.",
+    ],
+    markdown=True,
+    show_tool_calls=True,
+)
+
 
 async def get_recommendations(
     user_id: str,
     query: Optional[str] = None,
     preferences: Optional[dict] = None,
     num_recommendations: int = 3,
+    personalize: bool = True,
 ) -> dict:
     """
     Get personalized destination recommendations.
@@ -88,6 +114,9 @@ async def get_recommendations(
         query: Optional specific query (e.g., "beach destinations in Asia")
         preferences: Optional explicit preferences to consider
         num_recommendations: Number of destinations to recommend
+        personalize: Use the user's memories; when False a memory-less agent
+            answers, so the result depends only on the request and can be
+            shared between users
 
     Returns:
         Personalized recommendations with explanations
@@ -123,17 +152,26 @@ async def get_recommendations(
 
     prompt = "\n".join(prompt_parts)
 
-    # Get response with user context (memory)
-    response = await recommender_agent.arun(prompt, user_id=user_id)
+    if personalize:
+        # Get response with user context (memory)
+        response = await recommender_agent.arun(prompt, user_id=user_id)
+    else:
+        response = await generic_recommender_agent.arun(prompt)
+    record_usage(response)
 
     return {
         "recommendations": response.content,
         "user_id": user_id,
-        "personalized": True,
+        "personalized": personalize,
         "agent": "TravelRecommender",
     }
 
 
+def recommendation_signature() -> str:
+    """Signature of the non-personalized recommender; part of cache keys."""
+    return agent_signature(generic_recommender_agent)
+
+
 async def get_structured_recommendations(
     user_id: str,
     query: Optional[str] = None,
@@ -168,6 +206,7 @@ async def get_structured_recommendations(
     """
 
     response = await formatter.arun(format_prompt)
+    record_usage(response)
     return response.content
 
 
@@ -195,6 +234,7 @@ async def update_preferences(
     """
 
     response = await recommender_agent.arun(prompt, user_id=user_id)
+    record_usage(response)
 
     return {
         "updated": True,
@@ -236,6 +276,7 @@ async def provide_feedback(
     prompt = " ".join(prompt_parts)
 
     response = await recommender_agent.arun(prompt, user_id=user_id)
+    record_usage(response)
 
     return {
         "feedback_recorded": True,
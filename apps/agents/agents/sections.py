@@ -0,0 +1,146 @@
+"""
+Heading-delimited sections of the markdown knowledge base.
+
+The FAQ, policies and destination guides are organized as `#`/`##`/`###`
+headings with short bodies, so a heading plus the text under it is the
+natural unit to search and quote.
+"""
+import re
+from pathlib import Path
+from typing import Optional
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_SLUG = re.compile(r"[^a-z0-9]+")
+
+
+def slugify(text: str) -> str:
+    """'How do I book a trip?' -> 'how-do-i-book-a-trip'"""
+    return _SLUG.sub("-", text.lower()).strip("-")
+
+
+class Section:
+    """One heading and the text under it, up to the next heading."""
+
+    __slots__ = ("id", "source", "heading", "level", "parents", "body")
+
+    def __init__(
+        self,
+        id: str,
+        source: str,
+        heading: str,
+        level: int,
+        parents: list[str],
+        body: str,
+    ):
+        self.id = id
+        self.source = source
+        self.heading = heading
+        self.level = level
+        self.parents = parents
+        self.body = body
+
+    @property
+    def title(self) -> str:
+        """Heading with its parent headings: 'Cancellation Policy > Refund Schedule'."""
+        return " > ".join(self.parents[1:] + [self.heading])
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "source": self.source,
+            "heading": self.heading,
+            "title": self.title,
+        }
+
+
+def split_sections(text: str, source: str) -> list[Section]:
+    """
+    Split a markdown document into sections at every heading.
+
+    Sections without body text (a heading directly followed by a
+    subheading) are dropped; their headings still appear in `parents`.
+    Ids are `<source>#<heading slug>`, suffixed -2, -3... when repeated.
+    """
+    sections: list[Section] = []
+    stack: list[tuple[int, str]] = []
+    seen: dict[str, int] = {}
+    heading: Optional[tuple[int, str]] = None
+    lines: list[str] = []
+
+    def flush() -> None:
+        body = "\n".join(lines).strip()
+        if heading is None or not body:
+            return
+        level, title = heading
+        slug = slugify(title) or "section"
+        seen[slug] = seen.get(slug, 0) + 1
+        if seen[slug] > 1:
+            slug = f"{slug}-{seen[slug]}"
+        sections.append(
+            Section(
+                id=f"{source}#{slug}",
+                source=source,
+                heading=title,
+                level=level,
+                parents=[t for _, t in stack[:-1]],
+                body=body,
+            )
+        )
+
+    in_code = False
+    for line in text.splitlines():
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else _HEADING.match(line)
+        if match is None:
+            lines.append(line)
+            continue
+        flush()
+        level = len(match.group(1))
+        heading = (level, match.group(2))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append(heading)
+        lines = []
+    flush()
+    return sections
+
+
+def load_sections(directory: Path) -> list[Section]:
+    """Sections of every markdown file under `directory`, in path order."""
+    sections = []
+    for path in sorted(directory.rglob("*.md")):
+        source = path.relative_to(directory).as_posix()
+        sections.extend(split_sections(path.read_text(encoding="utf-8"), source))
+    return sections
+
+
+class SectionReader:
+    """
+    Sections of a set of markdown files, re-split only when a file changes.
+
+    Files are keyed by mtime and size; unchanged files reuse the sections
+    parsed last time.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+        self._files: dict[Path, tuple[tuple[int, int], list[Section]]] = {}
+        self.parsed = 0
+
+    def read(self, paths: list[Path]) -> list[Section]:
+        """Sections of `paths`, in order."""
+        files = {}
+        sections: list[Section] = []
+        for path in paths:
+            stat = path.stat()
+            key = (stat.st_mtime_ns, stat.st_size)
+            cached = self._files.get(path)
+            if cached is None or cached[0] != key:
+                source = path.relative_to(self.root).as_posix()
+                cached = (key, split_sections(path.read_text(encoding="utf-8"), source))
+                self.parsed += 1
+            files[path] = cached
+            sections.extend(cached[1])
+        self._files = files
+        return sections
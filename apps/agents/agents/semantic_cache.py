@@ -0,0 +1,158 @@
+"""
+Semantic answer cache for the SupportBot.
+
+Support questions are mostly paraphrases of a few dozen topics. Each question
+is embedded and compared (cosine similarity) against recently answered ones;
+when one is close enough its stored answer is returned instead of running the
+agent. Entries expire after a TTL, and the whole cache is dropped when any
+file under the knowledge directory changes so answers never outlive the
+policies they were based on.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger("gobuddy.semantic_cache")
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+# How often the knowledge directory is checked for changes
+SEMANTIC_CACHE_CHECK_SECONDS = float(os.getenv("SEMANTIC_CACHE_CHECK_SECONDS", "30"))
+
+
+def directory_version(path: Optional[Path]) -> str:
+    """Hash of every file's name, size and mtime under `path`."""
+    if path is None or not path.exists():
+        return ""
+    digest = hashlib.sha256()
+    for file in sorted(p for p in path.rglob("*") if p.is_file()):
+        stat = file.stat()
+        digest.update(f"{file.relative_to(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+class SemanticCache:
+    """
+    Fixed-capacity vector index of (question embedding -> answer).
+
+    Vectors live in one preallocated matrix, so a lookup is a single
+    matrix-vector product. When full, the oldest entry's slot is reused.
+    """
+
+    def __init__(
+        self,
+        embedder,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl: float = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        watch_dir: Optional[Path] = None,
+        check_interval: float = SEMANTIC_CACHE_CHECK_SECONDS,
+        enabled: bool = True,
+    ):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.watch_dir = watch_dir
+        self.check_interval = check_interval
+        self.enabled = enabled
+        self._vectors: Optional[np.ndarray] = None
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._answers: list[Optional[str]] = [None] * max_entries
+        self._next = 0
+        self._size = 0
+        self._version = directory_version(watch_dir)
+        self._checked_at = time.time()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    def invalidate(self) -> None:
+        """Drop every entry."""
+        self._expires[:] = 0
+        self._answers = [None] * self.max_entries
+        self._next = 0
+        self._size = 0
+        self.invalidations += 1
+
+    async def _check_knowledge(self, now: float) -> None:
+        if self.watch_dir is None or now - self._checked_at < self.check_interval:
+            return
+        self._checked_at = now
+        # Walking and stat-ing the tree is blocking file I/O; keep it off the loop
+        version = await asyncio.to_thread(directory_version, self.watch_dir)
+        if version != self._version:
+            logger.info("Knowledge changed — clearing semantic answer cache")
+            self._version = version
+            self.invalidate()
+
+    async def embed(self, question: str) -> Optional[np.ndarray]:
+        """Embedding for a question, or None if the embedder failed."""
+        try:
+            return (await self.embedder.embed([question]))[0]
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Embedding failed, skipping semantic cache: %s", e)
+            return None
+
+    async def lookup(self, question: str) -> tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Find a cached answer for a paraphrase of `question`.
+
+        Returns:
+            (answer or None, question embedding to pass to `store` on a miss)
+        """
+        if not self.enabled:
+            return None, None
+        now = time.time()
+        await self._check_knowledge(now)
+        vector = await self.embed(question)
+        if vector is None:
+            return None, None
+
+        if self._size:
+            scores = self._vectors[: self._size] @ vector
+            scores[self._expires[: self._size] <= now] = -1.0
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                self.hits += 1
+                return self._answers[best], vector
+
+        self.misses += 1
+        return None, vector
+
+    def store(self, vector: Optional[np.ndarray], answer: str) -> None:
+        """Remember an answer for the question embedded as `vector`."""
+        if not self.enabled or vector is None or not answer:
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        slot = self._next
+        self._vectors[slot] = vector
+        self._expires[slot] = time.time() + self.ttl
+        self._answers[slot] = answer
+        self._next = (slot + 1) % self.max_entries
+        self._size = max(self._size, slot + 1)
+
+    def stats(self) -> dict:
+        now = time.time()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": int((self._expires[: self._size] > now).sum()),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+        }
@@ -3,44 +3,66 @@ Support Bot Agent with RAG
 Answers customer questions using knowledge base of policies, FAQs, and trip information
 """
 import os
+import json
 import logging
 from pathlib import Path
 from typing import Optional
 
 from agno.agent import Agent
 from agno.models.openai import OpenAIChat
-from agno.knowledge.text import TextKnowledge
-from agno.knowledge.combined import CombinedKnowledge
+
+from agents.bm25 import KNOWLEDGE_DIRECT_ANSWERS, BM25Index
+from agents.embeddings import create_embedder
+from agents.intents import IntentMatcher, load_intents
+from agents.rag_context import track_context
+from agents.knowledge_watcher import KnowledgeChanges, KnowledgeWatcher
+from agents.sections import SectionReader
+from agents.semantic_cache import SEMANTIC_CACHE_ENABLED, SemanticCache
+from agents.usage import record_shared, record_usage
+from agents.vector_index import VectorKnowledge
 
 logger = logging.getLogger("gobuddy.support_bot")
 
 # Knowledge base paths
 KNOWLEDGE_DIR = Path(__file__).parent.parent / "knowledge"
 
-# Initialize knowledge sources
-knowledge_sources = []
 
-# Add policy document if exists
-policies_path = KNOWLEDGE_DIR / "policies.md"
-if policies_path.exists():
-    knowledge_sources.append(TextKnowledge(path=str(policies_path)))
+def find_knowledge_sources() -> list[Path]:
+    """Policies, FAQ and destination guides currently in the knowledge directory."""
+    sources = []
+
+    # Add policy document if exists
+    policies_path = KNOWLEDGE_DIR / "policies.md"
+    if policies_path.exists():
+        sources.append(policies_path)
+
+    # Add FAQ document if exists
+    faq_path = KNOWLEDGE_DIR / "faq.md"
+    if faq_path.exists():
+        sources.append(faq_path)
+
+    # Add destination guides if they exist
+    destinations_dir = KNOWLEDGE_DIR / "destinations"
+    if destinations_dir.exists():
+        sources.extend(sorted(destinations_dir.glob("*.md")))
+    return sources
+
 
-# Add FAQ document if exists
-faq_path = KNOWLEDGE_DIR / "faq.md"
-if faq_path.exists():
-    knowledge_sources.append(TextKnowledge(path=str(faq_path)))
+# Initialize knowledge sources (re-read by reload_knowledge)
+knowledge_sources = find_knowledge_sources()
 
-# Add destination guides if they exist
-destinations_dir = KNOWLEDGE_DIR / "destinations"
-if destinations_dir.exists():
-    for guide in destinations_dir.glob("*.md"):
-        knowledge_sources.append(TextKnowledge(path=str(guide)))
+# Parsed sections per file, re-split only when a file changes
+section_reader = SectionReader(KNOWLEDGE_DIR)
 
+# Shared by the knowledge index and the answer cache
+embedder = create_embedder()
 
-# Create combined knowledge base (in-memory for simplicity, can be pgvector in production)
+# Vector index over the knowledge sections, persisted so restarts only embed what changed
 knowledge = None
-if knowledge_sources:
-    knowledge = CombinedKnowledge(sources=knowledge_sources)
+if KNOWLEDGE_DIR.exists():
+    knowledge = VectorKnowledge(
+        knowledge_sources, root=KNOWLEDGE_DIR, embedder=embedder, reader=section_reader
+    )
 
 
 # Support Bot Agent
@@ -64,12 +86,52 @@ support_agent = Agent(
 )
 
 
+# Lexical index of knowledge sections, for answering plain FAQ lookups directly
+knowledge_index = BM25Index(section_reader.read(knowledge_sources))
+
+# Answers to recent questions, matched by meaning rather than exact wording
+answer_cache = SemanticCache(
+    embedder,
+    watch_dir=KNOWLEDGE_DIR,
+    enabled=SEMANTIC_CACHE_ENABLED,
+)
+
+
 async def load_knowledge():
     """Load the knowledge base. Called on server startup."""
     global knowledge
     if knowledge:
         await knowledge.aload(recreate=False)
-        logger.info("Loaded %d knowledge sources", len(knowledge_sources))
+        logger.info(
+            "Loaded %d knowledge sources (%d sections)",
+            len(knowledge_sources), len(knowledge.index.sections),
+        )
+
+
+async def reload_knowledge(changes: Optional[KnowledgeChanges] = None) -> None:
+    """
+    Rebuild everything derived from the knowledge directory and swap it in.
+
+    Only changed files are re-split and only changed sections re-embedded.
+    Each index is built on the side and replaced with a single assignment,
+    so in-flight requests finish on the previous version.
+    """
+    global knowledge_sources, knowledge_index, quick_response_matcher
+    sources = find_knowledge_sources()
+    matcher = IntentMatcher(load_intents(QUICK_RESPONSES_PATH))
+    if knowledge is not None:
+        knowledge.paths = sources
+        await knowledge.aload(recreate=False)
+    sections = section_reader.read(sources)
+    knowledge_sources = sources
+    knowledge_index = BM25Index(sections)
+    quick_response_matcher = matcher
+    answer_cache.invalidate()
+    logger.info("Reloaded knowledge: %d sources, %d sections", len(sources), len(sections))
+
+
+# Reloads the knowledge when files under KNOWLEDGE_DIR change; started on server startup
+knowledge_watcher = KnowledgeWatcher(KNOWLEDGE_DIR, on_change=reload_knowledge)
 
 
 async def answer_question(
@@ -91,6 +153,32 @@ async def answer_question(
     # Build prompt with context if provided
     prompt = question
 
+    # Context-free questions have one right answer for everyone; reuse it
+    cache_vector = None
+    if not context:
+        direct = knowledge_index.direct_answer(question) if KNOWLEDGE_DIRECT_ANSWERS else None
+        if direct is not None:
+            section, score = direct
+            logger.info("Answered from %s (BM25 %.1f)", section.id, score)
+            record_shared()
+            return {
+                "answer": section.body,
+                "sources_used": True,
+                "agent": "SupportBot",
+                "direct_answer": True,
+                "section_id": section.id,
+            }
+
+        cached, cache_vector = await answer_cache.lookup(question)
+        if cached is not None:
+            record_shared()
+            return {
+                "answer": cached,
+                "sources_used": bool(knowledge),
+                "agent": "SupportBot",
+                "cached": True,
+            }
+
     if context:
         context_parts = []
         if context.get("trip_id"):
@@ -104,45 +192,31 @@ async def answer_question(
             prompt = f"Context: {', '.join(context_parts)}\n\nQuestion: {question}"
 
     # Get response from agent
-    response = await support_agent.arun(prompt, user_id=user_id)
+    with track_context() as context_tokens:
+        response = await support_agent.arun(prompt, user_id=user_id)
+    record_usage(response)
+    if isinstance(response.content, str):
+        answer_cache.store(cache_vector, response.content)
 
-    return {
+    result = {
         "answer": response.content,
         "sources_used": bool(knowledge),
         "agent": "SupportBot",
     }
+    if context_tokens.searches:
+        # Knowledge tokens added to the prompt, before and after packing
+        result["context_tokens"] = context_tokens.to_dict()
+    return result
 
 
-# Quick response patterns for common questions
-QUICK_RESPONSES = {
-    "contact": {
-        "keywords": ["contact", "phone", "email", "reach", "call"],
-        "response": (
-            "You can reach GoBuddy Adventures support through:\n\n"
-            "- **Email**: support@gobuddy.com\n"
-            "- **Phone**: +1-800-GO-BUDDY (Available 24/7)\n"
-            "- **WhatsApp**: +1-555-123-4567\n\n"
-            "For urgent matters during your trip, use the emergency contact "
-            "provided in your trip details."
-        ),
-    },
-    "cancellation": {
-        "keywords": ["cancel", "refund", "change booking"],
-        "response": (
-            "For cancellation and refund requests:\n\n"
-            "- **14+ days before trip**: Full refund\n"
-            "- **7-14 days before trip**: 50% refund\n"
-            "- **Less than 7 days**: No refund (credit may be available)\n\n"
-            "To cancel, please email support@gobuddy.com with your booking reference."
-        ),
-    },
-}
+# Quick response intents for common questions (see agents.intents)
+QUICK_RESPONSES_PATH = os.getenv("QUICK_RESPONSES_PATH") or str(KNOWLEDGE_DIR / "quick_responses.json")
+with open(QUICK_RESPONSES_PATH, encoding="utf-8") as f:
+    QUICK_RESPONSES = json.load(f)
+quick_response_matcher = IntentMatcher(load_intents(QUICK_RESPONSES))
 
 
 def get_quick_response(question: str) -> Optional[str]:
     """Check if question matches a quick response pattern."""
-    question_lower = question.lower()
-    for category, data in QUICK_RESPONSES.items():
-        if any(keyword in question_lower for keyword in data["keywords"]):
-            return data["response"]
-    return None
+    intent = quick_response_matcher.match(question)
+    return intent.response if intent else None
@@ -3,7 +3,7 @@ Trip Planner Multi-Agent Team
 Coordinates Researcher, Planner, and Budgeter agents for comprehensive trip planning
 """
 import os
-from typing import Optional
+from typing import AsyncIterator, Optional
 from pydantic import BaseModel, Field
 
 from agno.agent import Agent
@@ -11,6 +11,9 @@ from agno.team import Team
 from agno.models.openai import OpenAIChat
 from agno.tools.duckduckgo import DuckDuckGoTools
 
+from agents.fingerprint import agent_signature, normalize_budget, request_fingerprint
+from agents.usage import record_usage
+
 
 # Structured output models
 class Activity(BaseModel):
@@ -117,6 +120,60 @@ trip_planner_team = Team(
 )
 
 
+TEAM_AGENTS = ["Researcher", "Planner", "Budgeter"]
+
+# Final formatting pass for structured plans
+FORMATTER_MODEL_ID = "gpt-4o"
+FORMATTER_INSTRUCTIONS = [
+    "Format the trip plan into a structured itinerary",
+    "Include all days with detailed activities",
+    "Ensure cost estimates are realistic",
+]
+
+
+def _build_prompt(
+    destination: str,
+    duration_days: int,
+    budget: Optional[float],
+    interests: Optional[list[str]],
+    travel_style: str,
+) -> str:
+    prompt_parts = [
+        f"Plan a {duration_days}-day trip to {destination}.",
+    ]
+
+    if budget:
+        prompt_parts.append(f"Budget: ${budget} USD total.")
+
+    if interests:
+        prompt_parts.append(f"Interests: {', '.join(interests)}.")
+
+    prompt_parts.append(f"Travel style: {travel_style}.")
+    prompt_parts.append(
+        "Please provide a detailed day-by-day itinerary with activities, "
+        "timings, cost estimates, and local tips."
+    )
+
+    return " ".join(prompt_parts)
+
+
+def _plan_result(
+    destination: str,
+    duration_days: int,
+    budget: Optional[float],
+    travel_style: str,
+    plan: str,
+) -> dict:
+    return {
+        "destination": destination,
+        "duration_days": duration_days,
+        "budget": budget,
+        "travel_style": travel_style,
+        "plan": plan,
+        "agents_used": list(TEAM_AGENTS),
+    }
+
+
 async def plan_trip(
     destination: str,
     duration_days: int,
@@ -139,75 +196,124 @@ async def plan_trip(
     Returns:
         Complete trip plan with itinerary
     """
-    # Build the prompt
-    prompt_parts = [
-        f"Plan a {duration_days}-day trip to {destination}.",
-    ]
+    prompt = _build_prompt(destination, duration_days, budget, interests, travel_style)
 
-    if budget:
-        prompt_parts.append(f"Budget: ${budget} USD total.")
+    # Run the team
+    response = await trip_planner_team.arun(prompt)
+    record_usage(response)
 
-    if interests:
-        prompt_parts.append(f"Interests: {', '.join(interests)}.")
+    return _plan_result(destination, duration_days, budget, travel_style, response.content)
 
-    prompt_parts.append(f"Travel style: {travel_style}.")
-    prompt_parts.append(
-        "Please provide a detailed day-by-day itinerary with activities, "
-        "timings, cost estimates, and local tips."
+
+def trip_plan_fingerprint(
+    destination: str,
+    duration_days: int,
+    budget: Optional[float] = None,
+    interests: Optional[list[str]] = None,
+    travel_style: str = "balanced",
+    structured: bool = False,
+) -> str:
+    """Fingerprint of a plan request; the budget must match to the cent."""
+    return request_fingerprint(
+        "trip_plan",
+        destination=destination,
+        duration_days=duration_days,
+        budget=normalize_budget(budget),
+        interests=interests,
+        travel_style=travel_style,
+        structured=structured,
     )
 
-    prompt = " ".join(prompt_parts)
 
-    # Run the team
-    response = await trip_planner_team.arun(prompt)
+def trip_plan_signature(structured: bool = False) -> str:
+    """Signature of the prompts and models behind a plan; part of cache keys."""
+    if not structured:
+        return agent_signature(trip_planner_team)
+    return agent_signature(
+        trip_planner_team, FORMATTER_MODEL_ID, *FORMATTER_INSTRUCTIONS, TripItinerary
+    )
 
-    return {
-        "destination": destination,
-        "duration_days": duration_days,
-        "budget": budget,
-        "travel_style": travel_style,
-        "plan": response.content,
-        "agents_used": ["Researcher", "Planner", "Budgeter"],
-    }
 
+def _chunk_agent(chunk) -> Optional[str]:
+    """Name of the team member that produced a streamed chunk, if reported."""
+    for attr in ("agent_name", "member_name"):
+        name = getattr(chunk, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return None
 
-# Structured output version for API
-async def plan_trip_structured(
+
+async def stream_plan_trip(
     destination: str,
     duration_days: int,
     budget: Optional[float] = None,
     interests: Optional[list[str]] = None,
     travel_style: str = "balanced",
-) -> TripItinerary:
+    user_id: Optional[str] = None,
+    structured: bool = False,
+) -> AsyncIterator[dict]:
     """
-    Plan a trip and return structured output.
+    Plan a trip, yielding progress events as the team produces them.
+
+    Events are dicts with "event" and "data":
+    - stage: a team member (or the formatter) started working
+    - delta: a piece of generated text
+    - summary: the final result, the same payload `plan_trip`
+      (or `plan_trip_structured` when `structured`) returns
     """
+    prompt = _build_prompt(destination, duration_days, budget, interests, travel_style)
+
+    current_agent = None
+    parts = []
+    last_chunk = None
+    async for chunk in await trip_planner_team.arun(
+        prompt, stream=True, stream_intermediate_steps=True
+    ):
+        last_chunk = chunk
+        agent = _chunk_agent(chunk)
+        if agent and agent != current_agent:
+            current_agent = agent
+            yield {"event": "stage", "data": {"agent": agent}}
+        content = getattr(chunk, "content", None)
+        if isinstance(content, str) and content:
+            parts.append(content)
+            yield {"event": "delta", "data": {"agent": current_agent, "content": content}}
+    # Streamed runs report aggregate metrics on their final chunk
+    if last_chunk is not None:
+        record_usage(last_chunk)
+
+    plan = "".join(parts)
+    if not structured:
+        yield {
+            "event": "summary",
+            "data": _plan_result(destination, duration_days, budget, travel_style, plan),
+        }
+        return
+
+    yield {"event": "stage", "data": {"agent": "TripFormatter"}}
+    itinerary = await _format_itinerary(plan, destination, duration_days, budget)
+    yield {"event": "summary", "data": itinerary.model_dump()}
+
+
+async def _format_itinerary(
+    plan: str,
+    destination: str,
+    duration_days: int,
+    budget: Optional[float],
+) -> TripItinerary:
+    """Turn a free-text team plan into a TripItinerary."""
     # Create a single agent with structured output for final formatting
     formatter = Agent(
         name="TripFormatter",
-        model=OpenAIChat(id="gpt-4o"),
+        model=OpenAIChat(id=FORMATTER_MODEL_ID),
         response_model=TripItinerary,
-        instructions=[
-            "Format the trip plan into a structured itinerary",
-            "Include all days with detailed activities",
-            "Ensure cost estimates are realistic",
-        ],
+        instructions=FORMATTER_INSTRUCTIONS,
     )
 
-    # First get the detailed plan from the team
-    team_result = await plan_trip(
-        destination=destination,
-        duration_days=duration_days,
-        budget=budget,
-        interests=interests,
-        travel_style=travel_style,
-    )
-
-    # Then format it
     format_prompt = f"""
     Based on this trip plan, create a structured itinerary:
 
-    {team_result['plan']}
+    {plan}
 
     Destination: {destination}
     Duration: {duration_days} days
@@ -215,4 +321,29 @@ async def plan_trip_structured(
     """
 
     response = await formatter.arun(format_prompt)
+    record_usage(response)
     return response.content
+
+
+# Structured output version for API
+async def plan_trip_structured(
+    destination: str,
+    duration_days: int,
+    budget: Optional[float] = None,
+    interests: Optional[list[str]] = None,
+    travel_style: str = "balanced",
+) -> TripItinerary:
+    """
+    Plan a trip and return structured output.
+    """
+    # First get the detailed plan from the team
+    team_result = await plan_trip(
+        destination=destination,
+        duration_days=duration_days,
+        budget=budget,
+        interests=interests,
+        travel_style=travel_style,
+    )
+
+    # Then format it
+    return await _format_itinerary(team_result["plan"], destination, duration_days, budget)
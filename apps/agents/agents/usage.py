@@ -0,0 +1,109 @@
+"""
+LLM token usage tracking for GoBuddy AI Agents.
+
+Agent helpers call `record_usage(response)` after every `arun`; callers that
+want the total for a unit of work wrap it in `track_usage()`. The accumulator
+is carried in a ContextVar, so usage from nested helpers and child tasks is
+attributed to the request that started them without threading it through
+every signature.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+
+class Usage:
+    """Token totals accumulated for one unit of work."""
+
+    __slots__ = ("input_tokens", "output_tokens", "total_tokens", "responses", "shared", "started")
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_tokens = 0
+        self.responses = 0
+        self.shared = 0
+        # A model call began; tokens may be spent even if no usage is reported
+        self.started = False
+
+    @property
+    def recorded(self) -> bool:
+        """True if token usage is known: reported by a response, or zero because it was shared."""
+        return self.responses > 0 or self.shared > 0
+
+    def to_dict(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+_current_usage: ContextVar[Optional[Usage]] = ContextVar("gobuddy_usage", default=None)
+
+
+def _metric(metrics: dict, name: str) -> int:
+    """Agno reports metrics either as a number or a list with one entry per model call."""
+    value = metrics.get(name, 0)
+    if isinstance(value, (list, tuple)):
+        return int(sum(v for v in value if isinstance(v, (int, float))))
+    if isinstance(value, (int, float)):
+        return int(value)
+    return 0
+
+
+def record_usage(response) -> None:
+    """Add the token metrics of an agent/team response to the current tracker."""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    metrics = getattr(response, "metrics", None)
+    if not isinstance(metrics, dict):
+        return
+
+    input_tokens = _metric(metrics, "input_tokens") or _metric(metrics, "prompt_tokens")
+    output_tokens = _metric(metrics, "output_tokens") or _metric(metrics, "completion_tokens")
+    total_tokens = _metric(metrics, "total_tokens") or input_tokens + output_tokens
+    if not total_tokens:
+        return
+
+    usage.input_tokens += input_tokens
+    usage.output_tokens += output_tokens
+    usage.total_tokens += total_tokens
+    usage.responses += 1
+
+
+def record_shared() -> None:
+    """
+    Note that the current work was answered at no token cost, by reusing
+    another request's model output or without a model at all.
+    """
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.shared += 1
+
+
+def record_tokens(tokens: int) -> None:
+    """Charge the current work `tokens` spent on its behalf by another task's run."""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.total_tokens += tokens
+        usage.responses += 1
+
+
+def record_started() -> None:
+    """Note that the current work is about to call a model."""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.started = True
+
+
+@contextmanager
+def track_usage() -> Iterator[Usage]:
+    """Collect token usage of every agent run inside the block."""
+    usage = Usage()
+    token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(token)
@@ -0,0 +1,267 @@
+"""
+Persisted vector index over the knowledge base.
+
+Every knowledge section is embedded once and kept on disk: a float32 matrix
+(`vectors-<generation>.npy`, memory-mapped on load) plus a JSON manifest
+listing the content hash and section id of each row. On startup only
+sections whose text changed, or that are new, are sent to the embedder;
+everything else is reused from the mapped file, so cold start stays flat
+as the destinations folder grows.
+
+Re-syncing a loaded index builds the new matrix on the side and swaps it in
+as one (sections, vectors) snapshot, so searches running meanwhile see
+either the old knowledge or the new, never a mix.
+
+`VectorKnowledge` exposes the index to agno agents through the same
+`search` / `aload` interface as agno's knowledge bases. It indexes
+heading-aware chunks and packs search results into a token budget (see
+agents.rag_context).
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import numpy as np
+
+from agents.rag_context import (
+    KNOWLEDGE_CANDIDATES,
+    KNOWLEDGE_CHUNK_TOKENS,
+    ContextPacker,
+    chunk_sections,
+    chunk_text,
+)
+from agents.sections import Section, SectionReader
+
+logger = logging.getLogger("gobuddy.vector_index")
+
+KNOWLEDGE_INDEX_DIR = os.getenv("KNOWLEDGE_INDEX_DIR") or os.path.join(
+    tempfile.gettempdir(), "gobuddy-knowledge-index"
+)
+# Sections per embedding request when (re)embedding
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+_MANIFEST = "manifest.json"
+_FORMAT_VERSION = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class VectorIndex:
+    """
+    Content-hashed embedding matrix persisted under `directory`.
+
+    Call `sync(sections)` to bring the index up to date with the current
+    sections; it is also what loads the index.
+    """
+
+    def __init__(self, directory: str, embedder):
+        self.directory = Path(directory)
+        self.embedder = embedder
+        self._snapshot: tuple[list[Section], Optional[np.ndarray]] = ([], None)
+        self._generation = 0
+        self.embedded = 0
+        self.reused = 0
+        self.load_seconds = 0.0
+
+    @property
+    def sections(self) -> list[Section]:
+        return self._snapshot[0]
+
+    @property
+    def embedder_name(self) -> str:
+        return getattr(self.embedder, "name", type(self.embedder).__name__)
+
+    def _read_manifest(self) -> Optional[dict]:
+        try:
+            manifest = json.loads((self.directory / _MANIFEST).read_text())
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != _FORMAT_VERSION or manifest.get("embedder") != self.embedder_name:
+            logger.info("Knowledge index format or embedder changed — re-embedding")
+            return None
+        return manifest
+
+    def _open(self, manifest: dict) -> Optional[np.ndarray]:
+        try:
+            vectors = np.load(self.directory / manifest["vectors"], mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logger.warning("Knowledge index unreadable, re-embedding: %s", e)
+            return None
+        if vectors.shape[0] != len(manifest["rows"]):
+            logger.warning("Knowledge index is inconsistent with its manifest, re-embedding")
+            return None
+        return vectors
+
+    async def _embed(self, texts: list[str]) -> np.ndarray:
+        batches = [
+            await self.embedder.embed(texts[i:i + EMBED_BATCH_SIZE])
+            for i in range(0, len(texts), EMBED_BATCH_SIZE)
+        ]
+        return np.vstack(batches).astype(np.float32)
+
+    async def sync(self, sections: list[Section], recreate: bool = False) -> None:
+        """
+        Index `sections`, embedding only those not already on disk.
+
+        Args:
+            sections: Every section that should be searchable
+            recreate: Ignore the stored index and embed everything again
+        """
+        started = time.monotonic()
+        texts = [chunk_text(section) for section in sections]
+        hashes = [content_hash(text) for text in texts]
+
+        manifest = None if recreate else self._read_manifest()
+        stored = self._open(manifest) if manifest else None
+        rows: dict[str, int] = {}
+        if stored is not None:
+            rows = {row["hash"]: i for i, row in enumerate(manifest["rows"])}
+            self._generation = manifest["generation"]
+
+        missing = [i for i, h in enumerate(hashes) if h not in rows]
+        unchanged = stored is not None and [r["hash"] for r in manifest["rows"]] == hashes
+        if unchanged:
+            vectors = stored
+        else:
+            fresh = await self._embed([texts[i] for i in missing]) if missing else None
+            if fresh is not None:
+                dim = fresh.shape[1]
+            else:
+                dim = stored.shape[1] if stored is not None else 0
+            vectors = np.empty((len(sections), dim), dtype=np.float32)
+            fresh_rows = {index: n for n, index in enumerate(missing)}
+            for i, h in enumerate(hashes):
+                if i in fresh_rows:
+                    vectors[i] = fresh[fresh_rows[i]]
+                else:
+                    vectors[i] = stored[rows[h]]
+            vectors = self._persist(vectors, sections, hashes)
+
+        self._snapshot = (sections, vectors)
+        self.embedded = len(missing)
+        self.reused = len(sections) - len(missing)
+        self.load_seconds = time.monotonic() - started
+        logger.info(
+            "Knowledge index ready: %d sections (%d embedded, %d reused) in %.2fs",
+            len(sections), self.embedded, self.reused, self.load_seconds,
+        )
+
+    def _persist(self, vectors: np.ndarray, sections: list[Section], hashes: list[str]) -> np.ndarray:
+        """Write a new generation, swap the manifest to it and map it back in."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._generation += 1
+        name = f"vectors-{self._generation}.npy"
+        _write_atomic(self.directory / name, lambda f: np.save(f, vectors))
+        manifest = {
+            "version": _FORMAT_VERSION,
+            "embedder": self.embedder_name,
+            "generation": self._generation,
+            "vectors": name,
+            "rows": [{"hash": h, "id": s.id} for h, s in zip(hashes, sections)],
+        }
+        _write_atomic(self.directory / _MANIFEST, lambda f: f.write(json.dumps(manifest).encode()))
+        # Processes that mapped an older generation keep reading it until they reload
+        for old in self.directory.glob("vectors-*.npy"):
+            if old.name != name:
+                old.unlink(missing_ok=True)
+        return np.load(self.directory / name, mmap_mode="r")
+
+    def query(self, vector: np.ndarray, limit: int = 5) -> list[tuple[Section, float]]:
+        """Sections most similar to an (L2-normalized) query vector."""
+        sections, vectors = self._snapshot
+        if vectors is None or not sections:
+            return []
+        scores = vectors @ vector
+        limit = min(limit, len(scores))
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(sections[i], float(scores[i])) for i in top]
+
+    def stats(self) -> dict:
+        return {
+            "sections": len(self.sections),
+            "embedded_on_load": self.embedded,
+            "reused_on_load": self.reused,
+            "load_seconds": round(self.load_seconds, 3),
+            "embedder": self.embedder_name,
+        }
+
+
+class VectorKnowledge:
+    """
+    Knowledge base over markdown files, searchable by agno agents.
+
+    Implements the parts of agno's knowledge interface the agent uses:
+    `aload`/`load` to (re)build the index and `search`/`async_search`
+    returning documents with the chunk text and its id, packed into the
+    context token budget.
+    """
+
+    def __init__(
+        self,
+        paths: list[Path],
+        root: Path,
+        embedder,
+        index_dir: str = KNOWLEDGE_INDEX_DIR,
+        reader: Optional[SectionReader] = None,
+    ):
+        self.paths = paths
+        self.root = root
+        self.num_documents = 5
+        self.reader = reader or SectionReader(root)
+        self.index = VectorIndex(index_dir, embedder)
+        self.packer = ContextPacker()
+
+    def read_sections(self) -> list[Section]:
+        """Chunks of every knowledge file."""
+        return chunk_sections(self.reader.read(self.paths), KNOWLEDGE_CHUNK_TOKENS)
+
+    async def aload(self, recreate: bool = False, **kwargs: Any) -> None:
+        await self.index.sync(self.read_sections(), recreate=recreate)
+
+    def _documents(self, hits: list[tuple[Section, float]]) -> list:
+        from agno.document import Document
+
+        return [
+            Document(
+                id=section.id,
+                name=section.title,
+                content=section.body,
+                meta_data={"source": section.source, "section_id": section.id, "score": score},
+            )
+            for section, score in hits
+        ]
+
+    def _packed(self, vector: np.ndarray, num_documents: Optional[int]) -> list:
+        limit = num_documents or self.num_documents
+        hits = self.index.query(vector, max(limit, KNOWLEDGE_CANDIDATES))
+        return self._documents(self.packer.pack(hits, limit))
+
+    async def async_search(
+        self, query: str, num_documents: Optional[int] = None, filters: Optional[dict] = None
+    ) -> list:
+        vector = (await self.index.embedder.embed([query]))[0]
+        return self._packed(vector, num_documents)
+
+    def search(
+        self, query: str, num_documents: Optional[int] = None, filters: Optional[dict] = None, **kwargs: Any
+    ) -> list:
+        # agno calls this from its synchronous knowledge-search tool
+        vector = self.index.embedder.embed_sync([query])[0]
+        return self._packed(vector, num_documents)
@@ -0,0 +1,215 @@
+"""
+Admission control for agent runs.
+
+Each agent gets a fixed number of concurrent LLM runs and a bounded FIFO wait
+queue. Requests beyond the queue, or that wait longer than the queue timeout,
+fail fast with 503 + Retry-After instead of piling onto an overloaded upstream
+where every run slows down together. Queue depth and wait-time histograms are
+exposed through /api/metrics.
+"""
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+logger = logging.getLogger("gobuddy.admission")
+
+# Upper bounds (seconds) of the wait-time histogram buckets
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+
+def _env_limits(name: str, concurrency: int, queue: int, timeout: float) -> dict:
+    prefix = f"ADMISSION_{name.upper()}"
+    return {
+        "max_concurrent": int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        "max_queue": int(os.getenv(f"{prefix}_QUEUE", str(queue))),
+        "queue_timeout": float(os.getenv(f"{prefix}_QUEUE_TIMEOUT", str(timeout))),
+    }
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO queue and queue timeout.
+
+    Unlike asyncio.Semaphore, waiters are served strictly in arrival order and
+    the queue length is known, so excess load can be shed immediately.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        # Number of queued waiters that count against max_queue
+        self._bounded_waiters = 0
+        self._service_ewma = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.max_queue_seen = 0
+        self._wait_counts = [0] * len(WAIT_BUCKETS)
+        self._wait_sum = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free, from the average run time."""
+        runs_ahead = self.queue_depth + 1
+        estimate = self._service_ewma * runs_ahead / max(1, self.max_concurrent)
+        return max(1, math.ceil(estimate))
+
+    def _shed(self, detail: str) -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail=detail,
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    def _observe_wait(self, seconds: float) -> None:
+        self._wait_sum += seconds
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                self._wait_counts[i] += 1
+                break
+
+    def check_capacity(self) -> None:
+        """
+        Fail fast if a new request would be shed, without taking a slot.
+
+        Raises:
+            HTTPException 503 if the queue is full
+        """
+        if self.active >= self.max_concurrent and self._bounded_waiters >= self.max_queue:
+            self.rejected += 1
+            raise self._shed("Server is busy. Try again shortly.")
+
+    async def acquire(self, patient: bool = False) -> None:
+        """
+        Take a run slot, waiting in the queue if all are busy.
+
+        Args:
+            patient: Wait as long as needed without counting against the queue
+                limit (for background jobs, which are bounded by their own pool)
+
+        Raises:
+            HTTPException 503 if the queue is full or the wait times out
+        """
+        started = time.monotonic()
+        if self.active < self.max_concurrent and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            self._observe_wait(0.0)
+            return
+
+        if not patient and self._bounded_waiters >= self.max_queue:
+            self.rejected += 1
+            logger.warning("%s: queue full (%d waiting) — shedding request", self.name, self.queue_depth)
+            raise self._shed("Server is busy. Try again shortly.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if not patient:
+            self._bounded_waiters += 1
+        self.max_queue_seen = max(self.max_queue_seen, self.queue_depth)
+        try:
+            if patient:
+                await waiter
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we gave up; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise self._shed("Server is busy. Try again shortly.") from None
+            raise
+        finally:
+            if not patient:
+                self._bounded_waiters -= 1
+
+        # release() already counted us in self.active
+        self.admitted += 1
+        self._observe_wait(time.monotonic() - started)
+
+    def _remove(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """Free a slot, handing it directly to the oldest waiter."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, patient: bool = False) -> AsyncIterator[None]:
+        """Hold a run slot for the duration of the block."""
+        await self.acquire(patient)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release()
+            elapsed = time.monotonic() - started
+            self._service_ewma = elapsed if not self._service_ewma else (
+                0.8 * self._service_ewma + 0.2 * elapsed
+            )
+
+    def stats(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(WAIT_BUCKETS, self._wait_counts):
+            cumulative += count
+            buckets["+Inf" if math.isinf(bound) else str(bound)] = cumulative
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "max_queue_seen": self.max_queue_seen,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_run_seconds": round(self._service_ewma, 3),
+            "wait_seconds": {
+                "count": cumulative,
+                "sum": round(self._wait_sum, 3),
+                "buckets": buckets,
+            },
+        }
+
+
+trip_planner_admission = AdmissionController(
+    "trip_planner", **_env_limits("trip_planner", concurrency=4, queue=16, timeout=30.0)
+)
+support_admission = AdmissionController(
+    "support", **_env_limits("support", concurrency=16, queue=64, timeout=10.0)
+)
+recommender_admission = AdmissionController(
+    "recommender", **_env_limits("recommender", concurrency=8, queue=32, timeout=15.0)
+)
@@ -1,8 +1,14 @@
 """
 Authentication middleware for GoBuddy AI Agents.
 Verifies Supabase JWT tokens on incoming requests.
+
+Tokens are verified locally (signature, expiry, audience) against the
+project's JWKS or the legacy shared secret. The Supabase Auth API is only
+called as a fallback when a token is signed with a key we don't know yet.
 """
 import os
+import time
+import asyncio
 import logging
 from typing import Optional
 
@@ -10,6 +16,12 @@ from fastapi import Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 import httpx
+import jwt
+
+from api.circuit_breaker import CircuitBreaker, CircuitOpenError
+from api.http_client import get_http_client
+from api.singleflight import SingleFlight
+from api.token_cache import token_cache, hash_token
 
 logger = logging.getLogger("gobuddy.auth")
 
@@ -18,35 +30,207 @@ security = HTTPBearer(auto_error=False)
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 
+# Local verification settings
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+AUTH_LOCAL_VERIFY = os.getenv("AUTH_LOCAL_VERIFY", "true").lower() == "true"
+JWKS_REFRESH_SECONDS = int(os.getenv("JWKS_REFRESH_SECONDS", "600"))
 
-async def verify_supabase_token(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
-) -> dict:
+# Circuit breaker around the Supabase Auth API
+AUTH_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AUTH_BREAKER_FAILURE_THRESHOLD", "5"))
+AUTH_BREAKER_RECOVERY_SECONDS = float(os.getenv("AUTH_BREAKER_RECOVERY_SECONDS", "30"))
+
+# Algorithms Supabase signs access tokens with
+ALLOWED_ALGORITHMS = {"HS256", "RS256", "ES256"}
+
+# Values shipped in .env.example; anyone can sign HS256 tokens with them
+PLACEHOLDER_JWT_SECRETS = {"your-jwt-secret"}
+
+
+def check_jwt_secret(secret: str) -> None:
     """
-    Verify a Supabase JWT token by calling the Supabase Auth API.
+    Refuse to run with a publicly known HS256 secret.
 
-    Returns the authenticated user's metadata dict.
-    Raises HTTPException 401 if the token is invalid or missing.
+    Raises:
+        RuntimeError if `secret` is a placeholder from .env.example
     """
-    if not credentials:
-        raise HTTPException(status_code=401, detail="Missing authorization header")
+    if secret.strip() in PLACEHOLDER_JWT_SECRETS:
+        raise RuntimeError(
+            "SUPABASE_JWT_SECRET is set to the .env.example placeholder; set the "
+            "project's JWT secret or leave it empty to verify with JWKS/Supabase"
+        )
 
-    token = credentials.credentials
 
-    if not SUPABASE_URL:
-        logger.warning("SUPABASE_URL not set — skipping token verification in dev mode")
-        return {"sub": "dev-user", "email": "dev@localhost", "role": "authenticated"}
+check_jwt_secret(SUPABASE_JWT_SECRET)
+
+
+class UnknownSigningKey(Exception):
+    """Raised when a token is signed with a key that isn't available locally."""
+
+
+class JWKSCache:
+    """
+    In-memory cache of the Supabase JSON Web Key Set.
+
+    Keys are refreshed periodically by a background task. Unknown `kid`s
+    trigger an early refresh, throttled by `min_refresh_interval`.
+    """
+
+    def __init__(
+        self,
+        jwks_url: str,
+        refresh_interval: float = 600,
+        min_refresh_interval: float = 30,
+    ):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._last_fetch = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.Task] = None
+
+    def get(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        """Return the cached key for `kid`, or None if unknown."""
+        if not kid:
+            return None
+        return self._keys.get(kid)
+
+    def load(self, jwks: dict) -> None:
+        """Replace the cached keys with the keys from a JWKS document."""
+        keys = {}
+        for entry in jwks.get("keys", []):
+            kid = entry.get("kid")
+            if not kid:
+                continue
+            try:
+                keys[kid] = jwt.PyJWK.from_dict(entry)
+            except (jwt.PyJWKError, jwt.InvalidKeyError) as e:
+                logger.warning("Skipping unusable JWK kid=%s: %s", kid, e)
+        self._keys = keys
+        self._last_fetch = time.monotonic()
+
+    async def refresh(self) -> None:
+        """Fetch the JWKS document and swap in the new key set."""
+        response = await get_http_client().get(self.jwks_url)
+        response.raise_for_status()
+        self.load(response.json())
+        logger.info("Loaded %d signing keys from JWKS", len(self._keys))
+
+    def request_refresh(self) -> None:
+        """Schedule a background refresh unless one ran recently."""
+        if time.monotonic() - self._last_fetch < self.min_refresh_interval:
+            return
+        if self._pending and not self._pending.done():
+            return
+        try:
+            self._pending = asyncio.get_running_loop().create_task(self._safe_refresh())
+        except RuntimeError:
+            # No running loop (e.g. sync caller) — the periodic task will catch up
+            pass
+
+    async def _safe_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except (httpx.HTTPError, ValueError) as e:
+            # Throttle retries the same way as successful fetches
+            self._last_fetch = time.monotonic()
+            logger.warning("JWKS refresh failed: %s", e)
+
+    async def _run(self) -> None:
+        while True:
+            await self._safe_refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        """Start the periodic background refresh task."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background refresh task."""
+        for task in (self._task, self._pending):
+            if task and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._pending = None
+
+
+jwks_cache = JWKSCache(
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+    refresh_interval=JWKS_REFRESH_SECONDS,
+)
+
+# Concurrent remote verifications of the same token share one upstream call
+remote_verifications = SingleFlight("auth.remote")
+
+auth_breaker = CircuitBreaker(
+    "supabase_auth",
+    failure_threshold=AUTH_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=AUTH_BREAKER_RECOVERY_SECONDS,
+)
+
+
+def _is_upstream_failure(e: Exception) -> bool:
+    """Only outages count against the breaker — a rejected token means Supabase is fine."""
+    return isinstance(e, HTTPException) and e.status_code == 503
+
+
+def verify_token_locally(token: str) -> dict:
+    """
+    Verify a Supabase JWT in-process and return its claims.
+
+    Raises:
+        UnknownSigningKey if the signing key isn't available locally
+        jwt.PyJWTError if the token is malformed, forged or expired
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm not in ALLOWED_ALGORITHMS:
+        raise jwt.InvalidAlgorithmError(f"Unsupported algorithm: {algorithm}")
+
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise UnknownSigningKey("No JWT secret configured")
+        key = SUPABASE_JWT_SECRET
+    else:
+        jwk = jwks_cache.get(header.get("kid"))
+        if jwk is None:
+            jwks_cache.request_refresh()
+            raise UnknownSigningKey(f"Unknown kid: {header.get('kid')}")
+        key = jwk.key
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=SUPABASE_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+
 
+async def verify_token_remotely(token: str) -> dict:
+    """
+    Verify a token by calling the Supabase Auth API.
+
+    Returns the user object. Raises HTTPException 401/503 on failure.
+    """
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{SUPABASE_URL}/auth/v1/user",
-                headers={
-                    "Authorization": f"Bearer {token}",
-                    "apikey": SUPABASE_ANON_KEY,
-                },
-                timeout=10.0,
-            )
+        response = await get_http_client().get(
+            f"{SUPABASE_URL}/auth/v1/user",
+            headers={
+                "Authorization": f"Bearer {token}",
+                "apikey": SUPABASE_ANON_KEY,
+            },
+        )
+
+        if response.status_code >= 500:
+            logger.error("Auth service error: HTTP %d", response.status_code)
+            raise HTTPException(status_code=503, detail="Authentication service unavailable")
 
         if response.status_code != 200:
             logger.warning("Token verification failed: %s", response.text)
@@ -61,6 +245,113 @@ async def verify_supabase_token(
         raise HTTPException(status_code=503, detail="Authentication service unavailable")
 
 
+async def verify_token(token: str) -> dict:
+    """
+    Verify a token without consulting the cache.
+
+    Tries local verification first and falls back to the Supabase Auth API
+    for tokens signed with an unknown key.
+    """
+    if AUTH_LOCAL_VERIFY:
+        try:
+            claims = verify_token_locally(token)
+            logger.debug("Authenticated user locally: %s", claims.get("sub"))
+            return claims
+        except UnknownSigningKey as e:
+            if not SUPABASE_URL:
+                raise HTTPException(status_code=401, detail="Invalid or expired token")
+            logger.debug("Falling back to remote verification: %s", e)
+        except jwt.PyJWTError as e:
+            logger.warning("Token verification failed: %s", e)
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    try:
+        return await remote_verifications.do(
+            hash_token(token),
+            lambda: auth_breaker.call(
+                lambda: verify_token_remotely(token), is_failure=_is_upstream_failure
+            ),
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication service unavailable",
+            headers={"Retry-After": str(max(1, int(e.retry_after)))},
+        )
+
+
+async def verify_supabase_token(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
+) -> dict:
+    """
+    Verify a Supabase JWT token.
+
+    Results are cached per token (see api.token_cache), including short-lived
+    rejections, so a chat session only pays for verification once. While the
+    Supabase Auth API is unavailable, recently verified tokens keep working
+    from the cache for the configured grace window.
+
+    Returns the authenticated user's metadata dict (or JWT claims).
+    Raises HTTPException 401 if the token is invalid or missing.
+    """
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Missing authorization header")
+
+    token = credentials.credentials
+
+    if not SUPABASE_URL and not SUPABASE_JWT_SECRET:
+        logger.warning("SUPABASE_URL not set — skipping token verification in dev mode")
+        return {"sub": "dev-user", "email": "dev@localhost", "role": "authenticated"}
+
+    hit, payload = token_cache.get(token)
+    if hit:
+        if payload is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return payload
+
+    try:
+        payload = await verify_token(token)
+    except HTTPException as e:
+        if e.status_code == 401:
+            token_cache.put_invalid(token)
+        elif e.status_code == 503:
+            stale = token_cache.get_stale(token)
+            if stale is not None:
+                logger.warning("Auth upstream unavailable — serving verified token from grace cache")
+                return stale
+        raise
+
+    token_cache.put(token, payload)
+    return payload
+
+
 def get_user_id(user: dict = Depends(verify_supabase_token)) -> str:
     """Extract user ID from the verified token payload."""
     return user.get("id") or user.get("sub", "anonymous")
+
+
+def get_user_tier(user: dict = Depends(verify_supabase_token)) -> str:
+    """
+    Extract the user's plan tier ("free", "plus", "pro", ...).
+
+    Read from `app_metadata`, which only the service role can write, so users
+    can't promote themselves. Missing or unknown values count as "free".
+    """
+    metadata = user.get("app_metadata") or {}
+    tier = metadata.get("tier") or metadata.get("plan") or "free"
+    return str(tier).lower()
+
+
+def require_admin(user: dict = Depends(verify_supabase_token)) -> str:
+    """
+    Dependency for operator endpoints: the caller's user ID if they are an admin.
+
+    Admins have `role: "admin"` in `app_metadata` (service-role writable only).
+
+    Raises:
+        HTTPException 403 for everyone else
+    """
+    metadata = user.get("app_metadata") or {}
+    if str(metadata.get("role", "")).lower() != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user.get("id") or user.get("sub")
@@ -0,0 +1,134 @@
+"""
+Deadline- and disconnect-aware cancellation of agent runs.
+
+A trip plan keeps calling the model and its tools long after a mobile client
+has given up on it. Agent work started through `run_cancellable` runs as a
+task that is cancelled as soon as the client disconnects or the request's
+deadline passes, releasing its admission and scheduler slots and stopping
+in-flight model and tool calls. Clients may shorten the deadline with an
+`X-Request-Timeout` header (seconds); each endpoint has a default maximum.
+"""
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, Request
+
+logger = logging.getLogger("gobuddy.cancellation")
+
+T = TypeVar("T")
+
+TIMEOUT_HEADER = "X-Request-Timeout"
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+# Default (and maximum) deadline per endpoint, in seconds
+DEADLINES = {
+    "trip_planner": float(os.getenv("DEADLINE_TRIP_PLANNER_SECONDS", "180")),
+    "support": float(os.getenv("DEADLINE_SUPPORT_SECONDS", "30")),
+    "support_batch": float(os.getenv("DEADLINE_SUPPORT_BATCH_SECONDS", "120")),
+    "recommender": float(os.getenv("DEADLINE_RECOMMENDER_SECONDS", "60")),
+}
+
+# Nginx's convention for "client closed request"; the client never sees it
+CLIENT_CLOSED_REQUEST = 499
+
+
+def request_timeout(request: Request, endpoint: str) -> float:
+    """Seconds the request may run: the header value, capped at the endpoint default."""
+    default = DEADLINES[endpoint]
+    value = request.headers.get(TIMEOUT_HEADER)
+    if not value:
+        return default
+    try:
+        timeout = float(value)
+    except ValueError:
+        logger.debug("Ignoring malformed %s header: %r", TIMEOUT_HEADER, value)
+        return default
+    if timeout <= 0:
+        return default
+    return min(timeout, default)
+
+
+class CancellationStats:
+    """Counts of cancelled runs by endpoint and reason."""
+
+    def __init__(self):
+        self.counts: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.seconds_run: dict[str, float] = defaultdict(float)
+
+    def record(self, endpoint: str, reason: str, elapsed: float) -> None:
+        self.counts[endpoint][reason] += 1
+        self.seconds_run[endpoint] += elapsed
+
+    def stats(self) -> dict:
+        return {
+            endpoint: {
+                **reasons,
+                "seconds_run_before_cancel": round(self.seconds_run[endpoint], 3),
+            }
+            for endpoint, reasons in self.counts.items()
+        }
+
+
+cancellations = CancellationStats()
+
+
+async def run_cancellable(
+    request: Request,
+    endpoint: str,
+    fn: Callable[[], Awaitable[T]],
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    Run `fn()` until it finishes, the client disconnects or the deadline passes.
+
+    Args:
+        request: The incoming request, polled for disconnects
+        endpoint: Key into DEADLINES and the cancellation stats
+        fn: Zero-argument coroutine factory for the agent work
+        timeout: Override for the request's deadline (seconds)
+
+    Returns:
+        The result of `fn()`. Re-raises its exception.
+
+    Raises:
+        HTTPException 504 if the deadline passed, 499 if the client went away
+    """
+    if timeout is None:
+        timeout = request_timeout(request, endpoint)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    deadline = started + timeout
+    task = asyncio.ensure_future(fn())
+
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                reason = "deadline"
+                break
+            done, _ = await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                reason = "disconnect"
+                break
+    except asyncio.CancelledError:
+        # The request itself was cancelled (e.g. server shutdown)
+        task.cancel()
+        raise
+
+    task.cancel()
+    try:
+        await task
+    except (asyncio.CancelledError, Exception):
+        pass
+    elapsed = loop.time() - started
+    cancellations.record(endpoint, reason, elapsed)
+    logger.info("Cancelled %s run after %.1fs: %s", endpoint, elapsed, reason)
+
+    if reason == "deadline":
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
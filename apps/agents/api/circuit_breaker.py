@@ -0,0 +1,143 @@
+"""
+Circuit breaker for upstream dependencies of GoBuddy AI Agents.
+Fails fast while an upstream is unhealthy instead of letting requests pile up on timeouts.
+"""
+import time
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+logger = logging.getLogger("gobuddy.circuit_breaker")
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    - closed: calls pass through; `failure_threshold` consecutive failures open it
+    - open: calls fail immediately for `recovery_timeout` seconds
+    - half_open: up to `half_open_max_calls` probes are let through; a success
+      closes the circuit, a failure opens it again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+            logger.info("Circuit '%s' half-open, probing upstream", self.name)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the circuit will allow a probe."""
+        if self._state != OPEN:
+            return 0.0
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Reserve permission for one call."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._state == HALF_OPEN:
+            logger.info("Circuit '%s' closed, upstream recovered", self.name)
+        self._state = CLOSED
+        self._failures = 0
+        self._probes = 0
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.times_opened += 1
+                logger.warning(
+                    "Circuit '%s' opened after %d consecutive failures",
+                    self.name,
+                    self._failures,
+                )
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+            self._probes = 0
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        is_failure: Callable[[Exception], bool] = lambda e: True,
+    ) -> T:
+        """
+        Run `fn()` through the breaker.
+
+        Args:
+            fn: Zero-argument coroutine factory
+            is_failure: Decides whether an exception counts against the upstream
+                (e.g. a 401 means the upstream is healthy)
+
+        Raises:
+            CircuitOpenError if the circuit is open
+        """
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+        half_open = self._state == HALF_OPEN
+        try:
+            result = await fn()
+        except Exception as e:
+            if is_failure(e):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled — free the probe slot without judging the upstream
+            if half_open and self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_after": round(self.retry_after(), 1),
+        }
@@ -3,9 +3,18 @@ Shared dependencies for API routes.
 Database connections, authentication, etc.
 """
 import os
+import logging
 from typing import Optional
-from fastapi import Header, HTTPException
+
 import httpx
+from fastapi import Header, HTTPException
+
+from api import auth
+from api.circuit_breaker import CircuitOpenError
+from api.http_client import get_http_client
+from api.token_cache import token_cache, hash_token
+
+logger = logging.getLogger("gobuddy.dependencies")
 
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -17,7 +26,11 @@ async def verify_user(authorization: Optional[str] = Header(None)) -> Optional[s
     Verify user authentication via Supabase JWT.
 
     Returns user_id if authenticated, None if no auth header.
-    Raises HTTPException if token is invalid.
+    Raises HTTPException 401 if the token is invalid, or 503 if Supabase
+    can't be reached (only rejections are cached, like verify_supabase_token).
+    Remote calls go through the same circuit breaker and per-token
+    single-flight as api.auth, so an outage fails fast instead of every
+    request waiting out the timeout.
     """
     if not authorization:
         return None
@@ -31,21 +44,70 @@ async def verify_user(authorization: Optional[str] = Header(None)) -> Optional[s
         # If Supabase not configured, accept any token (dev mode)
         return "dev_user"
 
-    # Verify token with Supabase
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
+    hit, user_data = token_cache.get(token)
+    if hit:
+        if user_data is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return user_data.get("id") or user_data.get("sub")
+
+    try:
+        user_data = await auth.remote_verifications.do(
+            ("service", hash_token(token)),
+            lambda: auth.auth_breaker.call(
+                lambda: _fetch_user(token), is_failure=auth._is_upstream_failure
+            ),
+        )
+    except CircuitOpenError as e:
+        return _stale_user_id(token, retry_after=e.retry_after)
+    except HTTPException as e:
+        if e.status_code != 401:
+            return _stale_user_id(token)
+        token_cache.put_invalid(token)
+        raise
+
+    token_cache.put(token, user_data)
+    return user_data.get("id")
+
+
+async def _fetch_user(token: str) -> dict:
+    """
+    Look up a token's user with the service key.
+
+    Raises HTTPException 401 if Supabase rejects the token, 503 otherwise.
+    """
+    try:
+        response = await get_http_client().get(
             f"{SUPABASE_URL}/auth/v1/user",
             headers={
                 "Authorization": f"Bearer {token}",
                 "apikey": SUPABASE_SERVICE_KEY,
             },
         )
+    except httpx.RequestError as e:
+        logger.error("Auth service unreachable: %s", str(e))
+        raise HTTPException(status_code=503, detail="Authentication service unavailable")
 
-        if response.status_code != 200:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
+    if response.status_code in (401, 403):
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-        user_data = response.json()
-        return user_data.get("id")
+    if response.status_code != 200:
+        # 5xx, 429 and the like say nothing about the token; don't cache them
+        logger.error("Auth service error: HTTP %d", response.status_code)
+        raise HTTPException(status_code=503, detail="Authentication service unavailable")
+
+    return response.json()
+
+
+def _stale_user_id(token: str, retry_after: Optional[float] = None) -> str:
+    """User of a recently verified token while Supabase is unavailable; 503 if none."""
+    stale = token_cache.get_stale(token)
+    if stale is None:
+        headers = {"Retry-After": str(max(1, int(retry_after)))} if retry_after else None
+        raise HTTPException(
+            status_code=503, detail="Authentication service unavailable", headers=headers
+        )
+    logger.warning("Auth upstream unavailable — serving verified token from grace cache")
+    return stale.get("id") or stale.get("sub")
 
 
 async def get_supabase_client():
@@ -0,0 +1,73 @@
+"""
+GCRA (generic cell rate algorithm) arithmetic shared by the rate-limit stores.
+
+A window of N requests per T seconds has an emission interval I = T/N. Each
+key keeps a "theoretical arrival time" (TAT) per window; a request of cost c
+is admitted when max(TAT, now) + c*I - now <= T, which allows a burst of N
+and then one request every I seconds.
+"""
+import math
+from typing import Optional
+
+# (period seconds, limit, label)
+Window = tuple[float, int, str]
+# (label, used, limit, retry_after seconds)
+Rejection = tuple[str, int, int, int]
+
+
+def charge(
+    tats: Optional[tuple[float, ...]],
+    windows: tuple[Window, ...],
+    now: float,
+    cost: float = 1,
+) -> tuple[Optional[tuple[float, ...]], Optional[Rejection]]:
+    """
+    Charge `cost` against every window.
+
+    Returns (new_tats, None) when admitted, or (None, rejection) naming the
+    first window that would be exceeded. Nothing is charged on rejection.
+    """
+    tats = tats or (now,) * len(windows)
+    new_tats = []
+    for (period, limit, label), tat in zip(windows, tats):
+        interval = period / limit
+        new_tat = max(tat, now) + interval * cost
+        if new_tat - now > period + 1e-9:
+            retry_after = max(1, math.ceil(new_tat - period - now))
+            return None, (label, used(tat, interval, limit, now), limit, retry_after)
+        new_tats.append(new_tat)
+    return tuple(new_tats), None
+
+
+def settle(
+    tats: Optional[tuple[float, ...]],
+    windows: tuple[Window, ...],
+    now: float,
+    cost: float = 1,
+) -> tuple[Optional[tuple[float, ...]], tuple[Optional[tuple[float, ...]], Optional[Rejection]]]:
+    """
+    `charge` in the shape a store's `update` callback returns.
+
+    Returns (new_tats to store or None, (TATs in effect, rejection)); the
+    TATs in effect feed the RateLimit-* headers without another lookup.
+    """
+    new_tats, rejection = charge(tats, windows, now, cost)
+    return new_tats, (new_tats or tats, rejection)
+
+
+def used(tat: float, interval: float, limit: int, now: float) -> int:
+    """Requests currently counted against a window."""
+    return min(limit, max(0, math.ceil((tat - now) / interval - 1e-9)))
+
+
+def usage(
+    tats: Optional[tuple[float, ...]],
+    windows: tuple[Window, ...],
+    now: float,
+) -> list[int]:
+    """Per-window usage for `get_remaining`."""
+    tats = tats or (now,) * len(windows)
+    return [
+        used(tat, period / limit, limit, now)
+        for (period, limit, _label), tat in zip(windows, tats)
+    ]
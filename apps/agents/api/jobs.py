@@ -0,0 +1,420 @@
+"""
+Background jobs for long-running agent work.
+
+Jobs are persisted in SQLite and executed by a fixed pool of asyncio workers,
+so a slow trip plan never holds an HTTP request open and survives the client
+going away. Clients submit a job, poll its status and fetch the result until
+it expires. All database access runs in a thread so the event loop stays
+responsive however many jobs are in flight.
+
+Several worker processes may share one database. A running job records its
+owner (the pid plus a per-start id), so on startup a process only fails the
+jobs whose owner is gone, never those another live worker is running. A job
+cancelled through another worker is only marked cancelled in the database;
+its owner polls for that and stops the run, and a cancelled record is never
+overwritten with the run's outcome.
+"""
+import os
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import tempfile
+import threading
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+
+logger = logging.getLogger("gobuddy.jobs")
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_RESULT_TTL_SECONDS = float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+# How often running jobs are checked for cancellation by other workers
+JOB_CANCEL_POLL_SECONDS = float(os.getenv("JOB_CANCEL_POLL_SECONDS", "2"))
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH") or os.path.join(
+    tempfile.gettempdir(), "gobuddy-jobs.sqlite3"
+)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+# Handler signature: (params, user_id) -> JSON-serializable result
+JobHandler = Callable[[dict, str], Awaitable[Any]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    owner TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at);
+"""
+
+
+class JobStore:
+    """SQLite-backed job records. Methods are blocking; call them via a thread."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "owner" not in columns:
+            # Databases created before jobs recorded their owner
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def _execute(self, sql: str, args: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, args)
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def create(self, kind: str, user_id: str, params: dict) -> dict:
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, user_id, params, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, user_id, json.dumps(params), QUEUED, now, now),
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        job = self._to_dict(row)
+        if job and job["expires_at"] is not None and job["expires_at"] <= time.time():
+            return None
+        return job
+
+    def start(self, job_id: str, owner: str) -> bool:
+        """Mark a queued job running under `owner`. False if it was cancelled meanwhile."""
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+            (RUNNING, owner, time.time(), job_id, QUEUED),
+        )
+        return cursor.rowcount == 1
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        ttl: float,
+        result: Any = None,
+        error: Optional[str] = None,
+    ) -> bool:
+        """Record a job's outcome unless it already finished (e.g. cancelled)."""
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? "
+            "WHERE id = ? AND status IN (?, ?)",
+            (
+                status,
+                json.dumps(result, default=str) if result is not None else None,
+                error,
+                now,
+                now + ttl,
+                job_id,
+                QUEUED,
+                RUNNING,
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def cancelled(self, job_ids: list[str]) -> list[str]:
+        """Which of `job_ids` are marked cancelled (possibly by another worker)."""
+        placeholders = ", ".join("?" * len(job_ids))
+        rows = self._execute(
+            f"SELECT id FROM jobs WHERE status = ? AND id IN ({placeholders})",
+            (CANCELLED, *job_ids),
+        ).fetchall()
+        return [row["id"] for row in rows]
+
+    def requeue(self, job_id: str) -> None:
+        """Put a running job back in the queue (server shutting down)."""
+        self._execute(
+            "UPDATE jobs SET status = ?, owner = NULL, updated_at = ? WHERE id = ? AND status = ?",
+            (QUEUED, time.time(), job_id, RUNNING),
+        )
+
+    def pending(self) -> list[dict]:
+        rows = self._execute(
+            "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            (QUEUED, RUNNING),
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def purge_expired(self) -> int:
+        cursor = self._execute("DELETE FROM jobs WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def _new_owner() -> str:
+    """Owner id for this process: its pid plus a random per-start suffix."""
+    return f"{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+def _owner_alive(owner: Optional[str], current: str) -> bool:
+    """
+    Whether the worker that owns a running job may still be running it.
+
+    `current` is the owner id of this process: a job owned by an earlier
+    start of a process with our pid (common in containers, where the server
+    is always the same pid) is orphaned too.
+    """
+    if not owner:
+        return False
+    pid = int(owner.split(":", 1)[0])
+    if pid == os.getpid():
+        return owner == current
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobManager:
+    """
+    Bounded pool of asyncio workers executing persisted jobs.
+
+    Jobs waiting in the queue count against `max_queued`; submissions beyond
+    it are rejected with 503 rather than piling up unbounded work.
+    """
+
+    def __init__(
+        self,
+        store_path: str = JOBS_DB_PATH,
+        workers: int = JOB_WORKERS,
+        max_queued: int = JOB_MAX_QUEUED,
+        result_ttl: float = JOB_RESULT_TTL_SECONDS,
+        cancel_poll: float = JOB_CANCEL_POLL_SECONDS,
+    ):
+        self.store_path = store_path
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.cancel_poll = cancel_poll
+        self._handlers: dict[str, JobHandler] = {}
+        self._store: Optional[JobStore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._janitor: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self._running: dict[str, asyncio.Task] = {}
+        self._cancel_requested: set[str] = set()
+        # Set on start() rather than here, so forked workers don't share one
+        self.owner: Optional[str] = None
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the coroutine that executes jobs of `kind`."""
+        self._handlers[kind] = handler
+
+    @property
+    def store(self) -> JobStore:
+        if self._store is None:
+            self._store = JobStore(self.store_path)
+        return self._store
+
+    async def start(self) -> None:
+        """Start the workers and resume jobs left over from a previous run."""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue()
+        self.owner = _new_owner()
+        for job in await asyncio.to_thread(self.store.pending):
+            if job["status"] == RUNNING:
+                if _owner_alive(job["owner"], self.owner):
+                    continue  # Another worker process is running it
+                # The process running it is gone; its partial work is lost
+                await asyncio.to_thread(
+                    self.store.finish, job["id"], FAILED, self.result_ttl,
+                    None, "Interrupted by server restart",
+                )
+            else:
+                self._queue.put_nowait(job["id"])
+        loop = asyncio.get_running_loop()
+        self._workers = [loop.create_task(self._work()) for _ in range(self.workers)]
+        self._janitor = loop.create_task(self._purge_periodically())
+        self._watcher = loop.create_task(self._watch_cancellations())
+        logger.info("Job workers started (%d workers, %d resumed)", self.workers, self._queue.qsize())
+
+    async def stop(self) -> None:
+        """Stop the workers. Unfinished jobs stay queued for the next start."""
+        tasks = list(self._workers)
+        for task in (self._janitor, self._watcher):
+            if task:
+                tasks.append(task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._janitor = None
+        self._watcher = None
+        self._running.clear()
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    async def submit(self, kind: str, user_id: str, params: dict) -> dict:
+        """
+        Persist and enqueue a job.
+
+        Raises:
+            HTTPException 503 if the queue is full or workers aren't running
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._queue is None:
+            raise HTTPException(status_code=503, detail="Job workers are not running.")
+        if self._queue.qsize() >= self.max_queued:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many queued jobs. Try again later.",
+                headers={"Retry-After": "30"},
+            )
+        job = await asyncio.to_thread(self.store.create, kind, user_id, params)
+        self._queue.put_nowait(job["id"])
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str, user_id: str) -> Optional[dict]:
+        """A job owned by `user_id`, or None if missing, expired or not theirs."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["user_id"] != user_id:
+            return None
+        return job
+
+    async def cancel(self, job_id: str, user_id: str) -> Optional[dict]:
+        """Cancel a queued or running job. Returns the updated job."""
+        job = await self.get(job_id, user_id)
+        if job is None:
+            return None
+        if job["status"] not in FINISHED:
+            if await asyncio.to_thread(
+                self.store.finish, job_id, CANCELLED, self.result_ttl, None, "Cancelled by user"
+            ):
+                self.cancelled += 1
+            task = self._running.get(job_id)
+            if task is not None:
+                self._cancel_requested.add(job_id)
+                task.cancel()
+            job = await asyncio.to_thread(self.store.get, job_id)
+        return job
+
+    async def _work(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Job worker error for %s: %s", job_id, e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        if not await asyncio.to_thread(self.store.start, job_id, self.owner):
+            return  # Cancelled (or expired) while queued
+        job = await asyncio.to_thread(self.store.get, job_id)
+        handler = self._handlers.get(job["kind"])
+        task = asyncio.ensure_future(handler(job["params"], job["user_id"]))
+        self._running[job_id] = task
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if job_id in self._cancel_requested:
+                # Cancelled through cancel(); the record already says so
+                self._cancel_requested.discard(job_id)
+                return
+            # Server shutting down: leave the job for the next start
+            task.cancel()
+            await asyncio.to_thread(self.store.requeue, job_id)
+            raise
+        except Exception as e:
+            logger.error("Job %s (%s) failed: %s", job_id, job["kind"], e, exc_info=True)
+            if await asyncio.to_thread(
+                self.store.finish, job_id, FAILED, self.result_ttl, None, str(e)
+            ):
+                self.failed += 1
+            return
+        finally:
+            self._running.pop(job_id, None)
+
+        if await asyncio.to_thread(
+            self.store.finish, job_id, SUCCEEDED, self.result_ttl, result
+        ):
+            self.succeeded += 1
+
+    async def _watch_cancellations(self) -> None:
+        """Stop running jobs that another worker process marked cancelled."""
+        while True:
+            await asyncio.sleep(self.cancel_poll)
+            if not self._running:
+                continue
+            for job_id in await asyncio.to_thread(self.store.cancelled, list(self._running)):
+                task = self._running.get(job_id)
+                if task is not None and job_id not in self._cancel_requested:
+                    logger.info("Job %s was cancelled elsewhere; stopping it", job_id)
+                    self._cancel_requested.add(job_id)
+                    task.cancel()
+
+    async def _purge_periodically(self, interval: float = 60.0) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            removed = await asyncio.to_thread(self.store.purge_expired)
+            if removed:
+                logger.debug("Purged %d expired jobs", removed)
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self._workers),
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "rejected": self.rejected,
+        }
+
+
+job_manager = JobManager()
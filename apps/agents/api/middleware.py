@@ -0,0 +1,95 @@
+"""
+ASGI middleware for GoBuddy AI Agents.
+
+RateLimitMiddleware applies a cheap edge limit before routing, so abusive
+clients are turned away before `Depends(get_user_id)` spends a Supabase
+round-trip on them. Requests are keyed by client IP: the bearer token is not
+verified yet at this point, so keying on it would hand every made-up token a
+fresh budget. The per-user limits checked later in the routes still apply.
+Every API response carries RateLimit-* headers describing the tightest limit
+the request was checked against, taken from the checks themselves so they
+cost no extra store lookup.
+"""
+import logging
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.rate_limit import RateLimiter, general_limiter, get_client_key
+
+logger = logging.getLogger("gobuddy.middleware")
+
+# Never limited: liveness probes must keep working under load
+EXEMPT_PATHS = ("/api/health",)
+
+
+def edge_key(request: Request) -> str:
+    """Key a request by client IP, whatever credentials it carries."""
+    return get_client_key(request)
+
+
+def rate_limit_headers(checks: list[tuple[int, int, int]]) -> Optional[dict]:
+    """RateLimit-* headers for the tightest of the (limit, remaining, reset) checks of a request."""
+    if not checks:
+        return None
+    limit, remaining, reset = min(checks, key=lambda check: check[1])
+    return {
+        "RateLimit-Limit": str(limit),
+        "RateLimit-Remaining": str(max(0, remaining)),
+        "RateLimit-Reset": str(reset),
+    }
+
+
+class RateLimitMiddleware:
+    """Pre-auth rate limiting and RateLimit-* headers for /api routes."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: RateLimiter = general_limiter,
+        prefix: str = "/api/",
+        exempt_paths: tuple[str, ...] = EXEMPT_PATHS,
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.prefix = prefix
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] == "OPTIONS"
+            or not scope["path"].startswith(self.prefix)
+            or scope["path"] in self.exempt_paths
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        # Routes add their own (limit, remaining, reset) here via RateLimiter.check(key, request)
+        checks: list[tuple[int, int, int]] = []
+        scope.setdefault("state", {})["rate_limits"] = checks
+
+        request = Request(scope)
+        key = edge_key(request)
+        try:
+            await self.limiter.check(key, request)
+        except HTTPException as e:
+            headers = dict(e.headers or {})
+            headers.update(rate_limit_headers(checks) or {})
+            response = JSONResponse({"detail": e.detail}, status_code=e.status_code, headers=headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = rate_limit_headers(checks)
+                if headers:
+                    response_headers = MutableHeaders(scope=message)
+                    for name, value in headers.items():
+                        response_headers[name] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
@@ -0,0 +1,276 @@
+"""
+Token-weighted LLM quotas for GoBuddy AI Agents.
+
+Request-count limits treat a one-line support question the same as a 30-day
+structured trip plan. Quotas here are charged in LLM tokens instead: each AI
+call reserves an estimate up front (rejected with 429 if the user's or the
+global daily budget can't cover it) and is reconciled with the tokens the
+model actually reported once the response is back. Counters use the rate
+limiter's backend, so with RATE_LIMIT_BACKEND=shm all workers on a host
+share one set of budgets.
+"""
+import os
+import time
+import logging
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+
+from agents.usage import Usage, track_usage
+from api.rate_limit import RATE_LIMIT_BACKEND, RATE_LIMIT_SHM_DIR, TATStore
+
+logger = logging.getLogger("gobuddy.quota")
+
+# Daily token budgets (0 disables a budget)
+USER_DAILY_TOKENS = int(os.getenv("USER_DAILY_TOKENS", "200000"))
+GLOBAL_DAILY_TOKENS = int(os.getenv("GLOBAL_DAILY_TOKENS", "5000000"))
+# Blended price used to report spend in dollars
+TOKEN_PRICE_PER_1K_USD = float(os.getenv("TOKEN_PRICE_PER_1K_USD", "0.005"))
+QUOTA_MAX_KEYS = int(os.getenv("QUOTA_MAX_KEYS", "100000"))
+
+_GLOBAL_KEY = "global"
+
+# Rough per-operation token estimates, used until actual usage is known
+ESTIMATES = {
+    "support": {"base": 1500, "per_char": 0.25},
+    "trip_planner": {"base": 4000, "per_day": 2500, "structured_factor": 1.6},
+    "recommend": {"base": 3000, "per_item": 600},
+    "preferences": {"base": 800},
+    "feedback": {"base": 1000},
+}
+
+
+def estimate_tokens(operation: str, **params) -> int:
+    """
+    Estimate the LLM tokens an operation will consume.
+
+    Args:
+        operation: One of the ESTIMATES keys
+        **params: Request parameters that drive the cost (message, duration_days,
+            structured, num_recommendations)
+    """
+    spec = ESTIMATES[operation]
+    tokens = spec["base"]
+    if operation == "support":
+        tokens += len(params.get("message") or "") * spec["per_char"]
+    elif operation == "trip_planner":
+        tokens += spec["per_day"] * params.get("duration_days", 1)
+        if params.get("structured"):
+            tokens *= spec["structured_factor"]
+    elif operation == "recommend":
+        tokens += spec["per_item"] * params.get("num_recommendations", 3)
+    return int(tokens)
+
+
+def _seconds_until_utc_midnight(now: float) -> int:
+    return int(86400 - now % 86400) or 1
+
+
+class Reservation:
+    """Tokens reserved for one in-progress AI call."""
+
+    __slots__ = ("key", "day", "tokens")
+
+    def __init__(self, key: str, day: int, tokens: int):
+        self.key = key
+        self.day = day
+        self.tokens = tokens
+
+
+class TokenQuota:
+    """
+    Per-user and global daily token budgets (UTC days).
+
+    Counters reset at UTC midnight, matching how upstream providers reset
+    daily quotas. They live in stores with the `TATStore.update` contract,
+    holding (end of the UTC day, tokens used) per key: pass SharedTATStores
+    so every worker process on a host draws on the same budgets. With
+    per-process stores each worker enforces the budgets on its own.
+    """
+
+    def __init__(
+        self,
+        user_daily_tokens: int = 200000,
+        global_daily_tokens: int = 5000000,
+        max_keys: int = 100000,
+        store=None,
+        global_store=None,
+    ):
+        self.user_daily_tokens = user_daily_tokens
+        self.global_daily_tokens = global_daily_tokens
+        self.max_keys = max_keys
+        # Kept apart so a spray of user keys can never evict the global count
+        self._users = store if store is not None else TATStore(max_keys=max_keys)
+        self._global = global_store if global_store is not None else TATStore(max_keys=1)
+        self.rejected = 0
+        self.reconciled_delta = 0
+
+    @staticmethod
+    def _used(entry: Optional[tuple[float, float]], now: float) -> int:
+        """Tokens used today according to a stored (day end, used) entry."""
+        if entry is None or entry[0] <= now:
+            return 0
+        return int(entry[1])
+
+    def _charge(self, store, key: str, tokens: int, budget: int, now: float) -> tuple[bool, int]:
+        """Add `tokens` to a counter unless that exceeds `budget`. Returns (charged, used before)."""
+        day_end = (now // 86400 + 1) * 86400
+
+        def apply(entry):
+            used = self._used(entry, now)
+            if budget and used + tokens > budget:
+                return None, (False, used)
+            return (day_end, used + tokens), (True, used)
+
+        return store.update(key, apply, now)
+
+    def _adjust(self, store, key: str, delta: int, day: int, now: float) -> None:
+        """Add `delta` to a counter if it still belongs to `day`."""
+        day_end = (day + 1) * 86400
+
+        def apply(entry):
+            if entry is None or entry[0] != day_end:
+                return None, None
+            return (day_end, max(0, entry[1] + delta)), None
+
+        store.update(key, apply, now)
+
+    def reserve(self, key: str, estimate: int) -> Reservation:
+        """
+        Reserve `estimate` tokens for `key`.
+
+        Raises:
+            HTTPException 429 if the user's or the global budget is exhausted
+        """
+        now = time.time()
+        day = int(now // 86400)
+
+        exceeded = None
+        charged, user_used = self._charge(self._users, key, estimate, self.user_daily_tokens, now)
+        if not charged:
+            exceeded = "Daily AI usage limit reached."
+        else:
+            charged, global_used = self._charge(
+                self._global, _GLOBAL_KEY, estimate, self.global_daily_tokens, now
+            )
+            if not charged:
+                self._adjust(self._users, key, -estimate, day, now)
+                exceeded = "AI capacity for today is exhausted."
+        if exceeded:
+            self.rejected += 1
+            retry_after = _seconds_until_utc_midnight(now)
+            logger.warning(
+                "Token quota exceeded for key=%s (user %d, global %d, estimate %d)",
+                key[0:8] + "...",
+                user_used,
+                self._used(self._global.get(_GLOBAL_KEY), now),
+                estimate,
+            )
+            raise HTTPException(
+                status_code=429,
+                detail=f"{exceeded} Try again in {retry_after} seconds.",
+                headers={"Retry-After": str(retry_after)},
+            )
+        return Reservation(key, day, estimate)
+
+    def reconcile(self, reservation: Reservation, actual_tokens: Optional[int]) -> None:
+        """
+        Replace the reserved estimate with the tokens actually used.
+
+        `actual_tokens=None` (usage unknown) keeps the estimate. Overruns are
+        charged even past the budget — the tokens are already spent.
+        """
+        if actual_tokens is None:
+            return
+        now = time.time()
+        if reservation.day != int(now // 86400):
+            return
+        delta = actual_tokens - reservation.tokens
+        reservation.tokens = actual_tokens
+        self.reconciled_delta += delta
+        self._adjust(self._global, _GLOBAL_KEY, delta, reservation.day, now)
+        self._adjust(self._users, reservation.key, delta, reservation.day, now)
+
+    @contextmanager
+    def metered(self, key: str, estimate: int) -> Iterator[Usage]:
+        """Reserve `estimate` tokens, run the block, then charge actual usage."""
+        with self.track(self.reserve(key, estimate)) as usage:
+            yield usage
+
+    @contextmanager
+    def track(self, reservation: Reservation) -> Iterator[Usage]:
+        """
+        Reconcile an existing reservation with the usage recorded in the block.
+
+        If the block fails before any model call started (e.g. it was shed by
+        admission control), the reservation is refunded. Once a call started,
+        a failure or cancellation keeps at least the estimate charged: agents
+        only report usage when a run returns, but the upstream tokens are
+        spent either way. If the block succeeds without usage data, the
+        estimate stands.
+        """
+        with track_usage() as usage:
+            try:
+                yield usage
+            except BaseException:
+                if usage.started:
+                    self.reconcile(reservation, max(usage.total_tokens, reservation.tokens))
+                else:
+                    self.reconcile(reservation, usage.total_tokens)
+                raise
+        self.reconcile(reservation, usage.total_tokens if usage.recorded else None)
+
+    def get_remaining(self, key: str) -> dict:
+        """Remaining token budget for a key."""
+        now = time.time()
+        return {
+            "day": {"used": self._used(self._users.get(key), now), "limit": self.user_daily_tokens},
+            "global": {
+                "used": self._used(self._global.get(_GLOBAL_KEY), now),
+                "limit": self.global_daily_tokens,
+            },
+        }
+
+    def stats(self) -> dict:
+        global_used = self._used(self._global.get(_GLOBAL_KEY), time.time())
+        return {
+            "global_tokens_used": global_used,
+            "global_daily_tokens": self.global_daily_tokens,
+            "estimated_spend_usd": round(global_used / 1000 * TOKEN_PRICE_PER_1K_USD, 4),
+            "tracked_keys": len(self._users),
+            "rejected": self.rejected,
+            "reconciled_delta": self.reconciled_delta,
+        }
+
+
+def create_quota_stores() -> tuple:
+    """
+    (per-user store, global store) for the token quota.
+
+    Shared across worker processes with RATE_LIMIT_BACKEND=shm. The quota is
+    checked synchronously, so with the redis backend (and with memory) the
+    counters stay per process: divide the budgets by the number of workers.
+    """
+    if RATE_LIMIT_BACKEND == "shm":
+        from api.shm_store import SharedTATStore, default_shm_dir
+
+        directory = RATE_LIMIT_SHM_DIR or default_shm_dir()
+        return (
+            SharedTATStore(os.path.join(directory, "gobuddy-quota-users"), slots=QUOTA_MAX_KEYS),
+            SharedTATStore(os.path.join(directory, "gobuddy-quota-global"), slots=16),
+        )
+    if RATE_LIMIT_BACKEND == "redis":
+        logger.info("Token quota counters are per process with RATE_LIMIT_BACKEND=redis")
+    return TATStore(max_keys=QUOTA_MAX_KEYS), TATStore(max_keys=1)
+
+
+_user_store, _global_store = create_quota_stores()
+
+token_quota = TokenQuota(
+    user_daily_tokens=USER_DAILY_TOKENS,
+    global_daily_tokens=GLOBAL_DAILY_TOKENS,
+    max_keys=QUOTA_MAX_KEYS,
+    store=_user_store,
+    global_store=_global_store,
+)
@@ -2,21 +2,54 @@
 Rate limiting middleware for GoBuddy AI Agents.
 Prevents API abuse and protects upstream LLM quota (e.g., Gemini 1,500 req/day).
 """
+import os
+import math
 import time
+import asyncio
+import inspect
 import logging
-from collections import defaultdict
+import ipaddress
+from collections import OrderedDict, defaultdict
 from typing import Optional
 
 from fastapi import Request, HTTPException
 
+from api import gcra
+
 logger = logging.getLogger("gobuddy.rate_limit")
 
+# Hard cap on tracked keys per limiter, and how often idle keys are swept
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+RATE_LIMIT_SWEEP_SECONDS = float(os.getenv("RATE_LIMIT_SWEEP_SECONDS", "60"))
 
-class RateLimiter:
+# "memory" (per process), "shm" (shared by all workers on the host)
+# or "redis" (shared by all nodes)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_SHM_DIR = os.getenv("RATE_LIMIT_SHM_DIR", "")
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "65536"))
+# Slots the shm sweeper inspects per pass (the lock is held for one pass)
+RATE_LIMIT_SHM_SWEEP_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SWEEP_SLOTS", "4096"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+RATE_LIMIT_REDIS_TIMEOUT = float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", "0.25"))
+RATE_LIMIT_REDIS_LEASE = int(os.getenv("RATE_LIMIT_REDIS_LEASE", "1"))
+RATE_LIMIT_REDIS_LEASE_TTL = float(os.getenv("RATE_LIMIT_REDIS_LEASE_TTL", "1"))
+
+# Proxies (IPs or CIDRs, comma-separated) whose X-Forwarded-For is believed.
+# Empty: the header is ignored and requests are keyed by the peer address.
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in os.getenv("TRUSTED_PROXIES", "").split(",")
+    if proxy.strip()
+]
+
+
+class SlidingWindowRateLimiter:
     """
     In-memory sliding window rate limiter.
 
-    For production with multiple workers, replace with Redis-backed implementation.
+    Keeps every request timestamp inside the window, so memory and check cost
+    grow with the limit. Superseded by the GCRA `RateLimiter`; kept for
+    comparison (see benchmarks/bench_rate_limit.py).
     """
 
     def __init__(
@@ -33,7 +66,7 @@ class RateLimiter:
         """Remove expired entries from a time window."""
         return [t for t in window if t > cutoff]
 
-    def check(self, key: str) -> None:
+    async def check(self, key: str) -> None:
         """
         Check if a request is allowed for the given key.
 
@@ -96,12 +129,291 @@ class RateLimiter:
         }
 
 
+class TATStore:
+    """
+    Bounded LRU map of rate-limit key -> per-window TATs.
+
+    A key whose TATs are all in the past is indistinguishable from an unseen
+    key, so `sweep` can drop it without changing any limiting decision. When
+    `max_keys` is reached the least recently charged key is evicted (it
+    regains a full quota), which keeps memory flat under IP-spray traffic.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._entries: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.evictions = 0
+        self.swept = 0
+
+    def get(self, key: str) -> Optional[tuple[float, float]]:
+        return self._entries.get(key)
+
+    def put(self, key: str, tats: tuple[float, float]) -> None:
+        self._entries[key] = tats
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, key: str, fn, now: float):
+        """
+        Read a key's TATs, let `fn` compute new ones and store them.
+
+        `fn(tats)` returns (new_tats or None, result); `result` is returned.
+        Atomic by virtue of running on the event loop thread.
+        """
+        new_tats, result = fn(self._entries.get(key))
+        if new_tats is not None:
+            self.put(key, new_tats)
+        return result
+
+    def charge(self, key: str, windows, now: float, cost: float = 1):
+        """Charge a request; returns (TATs in effect, None or a gcra.Rejection)."""
+        return self.update(key, lambda tats: gcra.settle(tats, windows, now, cost), now)
+
+    def sweep(self, now: float) -> int:
+        """Drop keys whose TATs have all passed. Returns the number removed."""
+        idle = [key for key, tats in self._entries.items() if max(tats) <= now]
+        for key in idle:
+            del self._entries[key]
+        self.swept += len(idle)
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RateLimiter:
+    """
+    In-memory GCRA (generic cell rate algorithm) rate limiter.
+
+    Each window stores a single "theoretical arrival time" (TAT) per key, so a
+    check is O(1) in time and memory regardless of the limit. A window of N
+    requests per T seconds admits a burst of N and then one request every T/N
+    seconds, matching the per-minute / per-hour semantics of the sliding window.
+
+    State lives in a TATStore by default; pass `store` to share it, e.g. a
+    SharedTATStore so every worker process on the host enforces one limit, or
+    a RedisTATStore to share it across nodes. A store provides
+    `charge(key, windows, now, cost)` returning (TATs in effect, rejection),
+    `get(key)`, `sweep(now)` and `len()`; `charge` and `get` are coroutines
+    for stores that talk to a server, so checks never block the event loop.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 10,
+        requests_per_hour: int = 100,
+        max_keys: int = RATE_LIMIT_MAX_KEYS,
+        store=None,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.requests_per_hour = requests_per_hour
+        # (period seconds, limit, label) — checked in order
+        self._windows = (
+            (60.0, requests_per_minute, "per-minute"),
+            (3600.0, requests_per_hour, "per-hour"),
+        )
+        # key -> (minute TAT, hour TAT)
+        self._tats = store if store is not None else TATStore(max_keys=max_keys)
+        self._async_store = inspect.iscoroutinefunction(self._tats.charge)
+
+    async def check(self, key: str, request: Optional[Request] = None, cost: float = 1) -> None:
+        """
+        Check if a request is allowed for the given key.
+
+        Args:
+            key: Identifier for rate limiting (user_id or IP address)
+            request: If given, the check is reported in the response's
+                RateLimit-* headers (see api.middleware)
+            cost: Weight of the request in requests (e.g. for batches)
+
+        Raises:
+            HTTPException 413 if `cost` exceeds the per-minute limit, since
+                such a request could never be admitted
+            HTTPException 429 if rate limit exceeded
+        """
+        if cost > self.requests_per_minute:
+            logger.warning(
+                "Request cost %.2f exceeds the burst of %d for key=%s",
+                cost,
+                self.requests_per_minute,
+                key[0:8] + "...",
+            )
+            raise HTTPException(
+                status_code=413,
+                detail=f"Request too large: it counts as {cost:g} requests, "
+                f"above the limit of {self.requests_per_minute} per minute.",
+            )
+        now = time.time()
+        result = self._tats.charge(key, self._windows, now, cost)
+        if self._async_store:
+            result = await result
+        tats, rejection = result
+        if request is not None:
+            checks = getattr(request.state, "rate_limits", None)
+            if checks is not None:
+                checks.append(self._status(tats, now))
+        if rejection is None:
+            return
+
+        label, used, limit, retry_after = rejection
+        logger.warning(
+            "Rate limit exceeded (%s) for key=%s (%d/%d)",
+            label,
+            key[0:8] + "...",
+            used,
+            limit,
+        )
+        if label == "per-minute":
+            detail = f"Rate limit exceeded. Try again in {retry_after} seconds."
+        else:
+            detail = f"Hourly rate limit exceeded. Try again in {retry_after} seconds."
+        raise HTTPException(
+            status_code=429,
+            detail=detail,
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    def get_remaining(self, key: str) -> dict:
+        """Get remaining quota for a key (in-process and shm stores)."""
+        if self._async_store:
+            raise TypeError("get_remaining needs a synchronous store; use aget_remaining")
+        return self._remaining(self._tats.get(key))
+
+    async def aget_remaining(self, key: str) -> dict:
+        """Get remaining quota for a key from any store, including Redis."""
+        tats = self._tats.get(key)
+        if self._async_store:
+            tats = await tats
+        return self._remaining(tats)
+
+    def _remaining(self, tats: Optional[tuple[float, ...]]) -> dict:
+        minute_used, hour_used = gcra.usage(tats, self._windows, time.time())
+        return {
+            "minute": {"used": minute_used, "limit": self.requests_per_minute},
+            "hour": {"used": hour_used, "limit": self.requests_per_hour},
+        }
+
+    def _status(self, tats: Optional[tuple[float, ...]], now: float) -> tuple[int, int, int]:
+        """
+        (limit, remaining, reset seconds) of the tightest window, given a key's TATs.
+
+        Used for the RateLimit-Limit / -Remaining / -Reset response headers.
+        """
+        tats = tats or (now,) * len(self._windows)
+        tightest = None
+        for (period, limit, _label), tat in zip(self._windows, tats):
+            remaining = limit - gcra.used(tat, period / limit, limit, now)
+            if tightest is None or remaining < tightest[1]:
+                tightest = (limit, remaining, max(0, math.ceil(tat - now)))
+        return tightest
+
+    def sweep(self) -> int:
+        """Forget keys with no outstanding usage."""
+        return self._tats.sweep(time.time())
+
+    def stats(self) -> dict:
+        """Key-count gauge and eviction counters for the metrics endpoint."""
+        return {
+            "keys": len(self._tats),
+            "max_keys": self._tats.max_keys,
+            "evictions": self._tats.evictions,
+            "swept": self._tats.swept,
+        }
+
+
+_redis_client = None
+
+
+def _get_redis_client():
+    global _redis_client
+    if _redis_client is None:
+        import redis.asyncio as redis
+
+        _redis_client = redis.Redis.from_url(
+            RATE_LIMIT_REDIS_URL,
+            socket_timeout=RATE_LIMIT_REDIS_TIMEOUT,
+            socket_connect_timeout=RATE_LIMIT_REDIS_TIMEOUT,
+        )
+    return _redis_client
+
+
+def create_store(name: str):
+    """Build the TAT store for a limiter according to RATE_LIMIT_BACKEND."""
+    if RATE_LIMIT_BACKEND == "redis":
+        from api.redis_store import RedisTATStore
+
+        return RedisTATStore(
+            _get_redis_client(),
+            f"gobuddy:ratelimit:{name}",
+            lease_size=RATE_LIMIT_REDIS_LEASE,
+            lease_ttl=RATE_LIMIT_REDIS_LEASE_TTL,
+            fallback=TATStore(max_keys=RATE_LIMIT_MAX_KEYS),
+        )
+    if RATE_LIMIT_BACKEND == "shm":
+        from api.shm_store import SharedTATStore, default_shm_dir
+
+        directory = RATE_LIMIT_SHM_DIR or default_shm_dir()
+        return SharedTATStore(
+            os.path.join(directory, f"gobuddy-ratelimit-{name}"),
+            slots=RATE_LIMIT_SHM_SLOTS,
+            sweep_slots=RATE_LIMIT_SHM_SWEEP_SLOTS,
+        )
+    if RATE_LIMIT_BACKEND != "memory":
+        logger.warning("Unknown RATE_LIMIT_BACKEND=%s — using memory", RATE_LIMIT_BACKEND)
+    return TATStore(max_keys=RATE_LIMIT_MAX_KEYS)
+
+
 # Default limiter instances
 # AI chat endpoints: stricter limits (LLM calls are expensive)
-ai_limiter = RateLimiter(requests_per_minute=5, requests_per_hour=60)
+ai_limiter = RateLimiter(
+    requests_per_minute=5, requests_per_hour=60, store=create_store("ai")
+)
+
+# General endpoints: more generous limits. Also the pre-auth edge limit
+# applied to every API request by api.middleware.RateLimitMiddleware.
+general_limiter = RateLimiter(
+    requests_per_minute=30, requests_per_hour=500, store=create_store("general")
+)
+
+_sweeper_task: Optional[asyncio.Task] = None
+
+
+async def _sweep_periodically(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        for name, limiter in (("ai", ai_limiter), ("general", general_limiter)):
+            removed = limiter.sweep()
+            if removed:
+                logger.debug("Swept %d idle %s rate-limit keys", removed, name)
 
-# General endpoints: more generous limits
-general_limiter = RateLimiter(requests_per_minute=30, requests_per_hour=500)
+
+def start_sweeper(interval: float = RATE_LIMIT_SWEEP_SECONDS) -> None:
+    """Start the idle-key sweep task. Called on server startup."""
+    global _sweeper_task
+    if _sweeper_task is None or _sweeper_task.done():
+        _sweeper_task = asyncio.get_running_loop().create_task(_sweep_periodically(interval))
+
+
+async def stop_sweeper() -> None:
+    """Stop the idle-key sweep task. Called on shutdown."""
+    global _sweeper_task
+    if _sweeper_task and not _sweeper_task.done():
+        _sweeper_task.cancel()
+        try:
+            await _sweeper_task
+        except asyncio.CancelledError:
+            pass
+    _sweeper_task = None
+
+
+async def close_redis_client() -> None:
+    """Close the shared Redis connection pool, if one was opened. Called on shutdown."""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
 
 
 def get_client_key(request: Request, user_id: Optional[str] = None) -> str:
@@ -112,11 +424,32 @@ def get_client_key(request: Request, user_id: Optional[str] = None) -> str:
     if user_id:
         return f"user:{user_id}"
 
-    # Get real IP (handle proxies)
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        ip = forwarded.split(",")[0].strip()
-    else:
-        ip = request.client.host if request.client else "unknown"
+    return f"ip:{client_ip(request)}"
+
+
+def _is_trusted_proxy(host: str) -> bool:
+    try:
+        address = ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return any(address in network for network in TRUSTED_PROXIES)
+
+
+def client_ip(request: Request) -> str:
+    """
+    Address of the client behind any trusted proxies.
+
+    X-Forwarded-For is only honored when the peer is a trusted proxy, and is
+    read right to left up to the first untrusted hop: entries further left are
+    whatever the client chose to send.
+    """
+    ip = request.client.host if request.client else "unknown"
+    if not _is_trusted_proxy(ip):
+        return ip
 
-    return f"ip:{ip}"
+    forwarded = request.headers.get("X-Forwarded-For", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        ip = hop
+        if not _is_trusted_proxy(hop):
+            break
+    return ip
@@ -0,0 +1,185 @@
+"""
+Redis-backed rate-limit state for multi-node deployments.
+
+Every check runs one Lua script that reads the key's TATs, applies GCRA to
+the minute and hour windows against the Redis server clock, and records the
+charge — a single atomic round-trip, made with the asyncio client so a slow
+Redis never stalls the event loop. The script also returns the TATs in
+effect, which is all the RateLimit-* headers need. Idle keys expire on their
+own via PEXPIRE.
+
+To amortize the round-trip, a node may lease a small batch of permits per key
+(`lease_size`) and hand them out locally until they run out or the lease
+expires. Leased-but-unused permits are forfeited, so larger leases trade a
+slightly stricter effective limit for fewer network calls.
+"""
+import math
+import logging
+from typing import Optional
+
+from redis.exceptions import RedisError
+
+logger = logging.getLogger("gobuddy.rate_limit.redis")
+
+# KEYS[1] = state hash
+# ARGV = want, need, period_1, limit_1, ..., period_n, limit_n
+# Returns {granted, retry_after, window_index, used, now, tat_1, ..., tat_n};
+# granted = 0 means rejected, and the TATs are those in effect after the call
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local want = tonumber(ARGV[1])
+local need = tonumber(ARGV[2])
+local windows = (#ARGV - 2) / 2
+local base = {}
+local grant = want
+local rejected = 0
+local retry_after = 0
+local used = 0
+for i = 1, windows do
+  local period = tonumber(ARGV[1 + 2 * i])
+  local limit = tonumber(ARGV[2 + 2 * i])
+  local interval = period / limit
+  local tat = tonumber(redis.call('HGET', KEYS[1], tostring(i))) or now
+  if tat < now then tat = now end
+  base[i] = tat
+  if rejected == 0 then
+    local fit = (period - (tat - now)) / interval + 1e-9
+    if fit < need then
+      rejected = i
+      retry_after = tat + need * interval - period - now
+      used = (tat - now) / interval
+    else
+      local whole = math.floor(fit)
+      if whole < need then whole = need end
+      if whole < grant then grant = whole end
+    end
+  end
+end
+local result
+if rejected > 0 then
+  result = {'0', tostring(retry_after), rejected, tostring(used), tostring(now)}
+  for i = 1, windows do result[5 + i] = tostring(base[i]) end
+  return result
+end
+result = {tostring(grant), '0', 0, '0', tostring(now)}
+local horizon = 0
+for i = 1, windows do
+  local period = tonumber(ARGV[1 + 2 * i])
+  local limit = tonumber(ARGV[2 + 2 * i])
+  local new_tat = base[i] + grant * period / limit
+  redis.call('HSET', KEYS[1], tostring(i), tostring(new_tat))
+  result[5 + i] = tostring(new_tat)
+  if new_tat - now > horizon then horizon = new_tat - now end
+end
+redis.call('PEXPIRE', KEYS[1], math.ceil(horizon * 1000) + 1)
+return result
+"""
+
+
+class RedisTATStore:
+    """
+    Rate-limit store shared by every node through Redis.
+
+    Same interface as `api.rate_limit.TATStore`, with `charge` and `get` as
+    coroutines; `client` is a `redis.asyncio` client. If Redis is
+    unreachable, checks fall back to `fallback` (a local store) so the API
+    keeps serving with per-node limits instead of failing.
+    """
+
+    def __init__(
+        self,
+        client,
+        prefix: str,
+        lease_size: int = 1,
+        lease_ttl: float = 1.0,
+        fallback=None,
+    ):
+        self.prefix = prefix
+        self.lease_size = max(1, lease_size)
+        self.lease_ttl = lease_ttl
+        self.max_keys = None
+        self.evictions = 0
+        self.swept = 0
+        self.round_trips = 0
+        self.leased_hits = 0
+        self.errors = 0
+        self._client = client
+        self._script = client.register_script(GCRA_SCRIPT)
+        self._fallback = fallback
+        # key -> [permits left, lease expiry, TATs when leased]
+        self._leases: dict[str, list] = {}
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def charge(self, key: str, windows, now: float, cost: float = 1):
+        """Charge a request; returns (TATs in effect, None or a gcra.Rejection)."""
+        lease = self._leases.get(key)
+        if lease is not None:
+            if lease[1] > now and lease[0] >= cost:
+                lease[0] -= cost
+                self.leased_hits += 1
+                # The lease was charged up front, so its TATs are still accurate
+                return lease[2], None
+            del self._leases[key]
+
+        args = [cost * self.lease_size, cost]
+        for period, limit, _label in windows:
+            args.extend((period, limit))
+
+        try:
+            reply = await self._script(keys=[self._redis_key(key)], args=args)
+            self.round_trips += 1
+        except RedisError as e:
+            return self._degrade(e, "charge", key, windows, now, cost)
+
+        granted, retry_after, window, used, server_now, *server_tats = reply
+        # Move the TATs from the Redis clock to ours for the RateLimit-* headers
+        offset = now - float(server_now)
+        tats = tuple(float(tat) + offset for tat in server_tats)
+        granted = float(granted)
+        if granted <= 0:
+            _period, limit, label = windows[int(window) - 1]
+            return tats, (
+                label,
+                min(limit, max(0, math.ceil(float(used) - 1e-9))),
+                limit,
+                max(1, math.ceil(float(retry_after))),
+            )
+
+        if granted > cost:
+            self._leases[key] = [granted - cost, now + self.lease_ttl, tats]
+        return tats, None
+
+    async def get(self, key: str) -> Optional[tuple[float, ...]]:
+        """Current TATs for a key (None if idle)."""
+        try:
+            fields = await self._client.hgetall(self._redis_key(key))
+        except RedisError as e:
+            return self._degrade(e, "get", key)
+        if not fields:
+            return None
+        ordered = sorted((int(k), float(v)) for k, v in fields.items())
+        return tuple(tat for _index, tat in ordered)
+
+    def sweep(self, now: float) -> int:
+        """Drop expired local leases; Redis expires idle keys itself."""
+        expired = [key for key, lease in self._leases.items() if lease[1] <= now]
+        for key in expired:
+            del self._leases[key]
+        if self._fallback is not None:
+            self.swept += self._fallback.sweep(now)
+        return len(expired)
+
+    def __len__(self) -> int:
+        """Keys tracked by this node (open leases plus fallback state)."""
+        return len(self._leases) + (len(self._fallback) if self._fallback is not None else 0)
+
+    def _degrade(self, error: RedisError, op: str, key: str, *args):
+        self.errors += 1
+        if self._fallback is None:
+            raise error
+        if self.errors == 1 or self.errors % 100 == 0:
+            logger.warning("Redis rate limiting unavailable (%s), using local limits: %s", op, error)
+        return getattr(self._fallback, op)(key, *args)
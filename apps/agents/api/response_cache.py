@@ -0,0 +1,225 @@
+"""
+Tiered response cache for GoBuddy AI Agents.
+
+Generic trip plans and non-personalized recommendations are reused instead of
+paying for the same LLM run again. Entries live in a small in-memory LRU in
+front of a zlib-compressed SQLite store that survives restarts and is shared
+by every worker on the host. Callers build keys from normalized request
+parameters plus a signature of the agents' instructions and models, so
+changing a prompt or model invalidates old entries without a manual flush.
+"""
+import os
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import tempfile
+import threading
+import logging
+from collections import OrderedDict, defaultdict
+from typing import Any, Optional
+
+logger = logging.getLogger("gobuddy.response_cache")
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "86400"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH") or os.path.join(
+    tempfile.gettempdir(), "gobuddy-response-cache.sqlite3"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at);
+"""
+
+
+class DiskStore:
+    """SQLite table of compressed responses. Methods are blocking."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def get(self, key: str, now: float) -> Optional[tuple[bytes, float]]:
+        """(uncompressed JSON, expires_at) for a live entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+        if row is None:
+            return None
+        return zlib.decompress(row[0]), row[1]
+
+    def put(self, key: str, endpoint: str, data: bytes, expires_at: float) -> int:
+        """Store an entry; returns its compressed size."""
+        blob = zlib.compress(data, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, endpoint, value, size, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, endpoint, blob, len(data), expires_at),
+            )
+        return len(blob)
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (now,)
+            ).rowcount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class _EndpointStats:
+    __slots__ = ("memory_hits", "disk_hits", "misses", "stores", "bytes_saved", "bytes_stored")
+
+    def __init__(self):
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.bytes_saved = 0
+        self.bytes_stored = 0
+
+    def to_dict(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "bytes_saved": self.bytes_saved,
+            "compressed_bytes_stored": self.bytes_stored,
+        }
+
+
+class ResponseCache:
+    """
+    In-memory LRU backed by a compressed on-disk store, both with a TTL.
+
+    Values must be JSON-serializable; every hit returns a fresh copy, so
+    callers may modify what they get back.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+        ttl: float = RESPONSE_CACHE_TTL_SECONDS,
+        enabled: bool = RESPONSE_CACHE_ENABLED,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        # key -> (JSON bytes, expires_at)
+        self._memory: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+        self._disk: Optional[DiskStore] = None
+        self._stats: dict[str, _EndpointStats] = defaultdict(_EndpointStats)
+        self._stores_since_purge = 0
+
+    @property
+    def disk(self) -> DiskStore:
+        if self._disk is None:
+            self._disk = DiskStore(self.path)
+        return self._disk
+
+    def _remember(self, key: str, data: bytes, expires_at: float) -> None:
+        self._memory[key] = (data, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, endpoint: str, key: str) -> Optional[Any]:
+        """Cached value for `key`, or None on a miss."""
+        if not self.enabled:
+            return None
+        stats = self._stats[endpoint]
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._memory.move_to_end(key)
+                stats.memory_hits += 1
+                stats.bytes_saved += len(entry[0])
+                return json.loads(entry[0])
+            del self._memory[key]
+
+        try:
+            entry = await asyncio.to_thread(self.disk.get, key, now)
+        except sqlite3.Error as e:
+            logger.warning("Response cache read failed: %s", e)
+            entry = None
+        if entry is None:
+            stats.misses += 1
+            return None
+
+        data, expires_at = entry
+        self._remember(key, data, expires_at)
+        stats.disk_hits += 1
+        stats.bytes_saved += len(data)
+        return json.loads(data)
+
+    async def put(self, endpoint: str, key: str, value: Any) -> None:
+        """Store a value in both tiers."""
+        if not self.enabled:
+            return
+        data = json.dumps(value, default=str).encode()
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, data, expires_at)
+        try:
+            compressed = await asyncio.to_thread(self.disk.put, key, endpoint, data, expires_at)
+        except sqlite3.Error as e:
+            logger.warning("Response cache write failed: %s", e)
+            return
+        stats = self._stats[endpoint]
+        stats.stores += 1
+        stats.bytes_stored += compressed
+
+        self._stores_since_purge += 1
+        if self._stores_since_purge >= 100:
+            self._stores_since_purge = 0
+            await asyncio.to_thread(self.disk.purge_expired, now)
+
+    async def clear(self) -> None:
+        self._memory.clear()
+        if self.enabled:
+            await asyncio.to_thread(self.disk.clear)
+
+    def close(self) -> None:
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "endpoints": {name: s.to_dict() for name, s in self._stats.items()},
+        }
+
+
+response_cache = ResponseCache()
@@ -1,25 +1,63 @@
 """
 API Routes for GoBuddy AI Agents
 """
+import os
+import json
+import asyncio
 import logging
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
-from agents.trip_planner import plan_trip, plan_trip_structured
-from agents.support_bot import answer_question, get_quick_response
+from agents.fingerprint import request_fingerprint
+from agents.trip_planner import (
+    plan_trip,
+    plan_trip_structured,
+    stream_plan_trip,
+    trip_plan_fingerprint,
+    trip_plan_signature,
+)
+from agents.usage import record_shared, record_started, record_tokens, track_usage
+from agents.support_bot import answer_question, get_quick_response, knowledge_watcher
 from agents.recommender import (
     get_recommendations,
     update_preferences,
     provide_feedback,
+    recommendation_signature,
 )
-from api.auth import verify_supabase_token, get_user_id
+from api.auth import verify_supabase_token, get_user_id, get_user_tier, require_admin
 from api.rate_limit import ai_limiter, general_limiter, get_client_key
+from api.quota import token_quota, estimate_tokens
+from api.jobs import job_manager
+from api.singleflight import SingleFlight
+from api.response_cache import response_cache
+from api.admission import (
+    AdmissionController,
+    recommender_admission,
+    support_admission,
+    trip_planner_admission,
+)
+from api.scheduler import llm_scheduler
+from api.cancellation import cancellations, request_timeout, run_cancellable
 
 logger = logging.getLogger("gobuddy.routes")
 
 router = APIRouter()
 
+# Batch support questions: max items per request, items answered at once, and
+# the rate-limit weight of each agent-answered item after the first. The
+# defaults keep a full batch (1 + 16 * 0.25 = 5) within ai_limiter's burst;
+# a batch weighing more than the burst is rejected with 413.
+SUPPORT_BATCH_MAX_ITEMS = int(os.getenv("SUPPORT_BATCH_MAX_ITEMS", "17"))
+SUPPORT_BATCH_CONCURRENCY = int(os.getenv("SUPPORT_BATCH_CONCURRENCY", "4"))
+SUPPORT_BATCH_ITEM_WEIGHT = float(os.getenv("SUPPORT_BATCH_ITEM_WEIGHT", "0.25"))
+
+# Share one agent run between concurrent identical trip-plan requests
+TRIP_PLAN_COALESCING = os.getenv("TRIP_PLAN_COALESCING", "true").lower() == "true"
+trip_plan_runs = SingleFlight("trip_planner")
+
 
 # Request/Response Models
 class TripPlanRequest(BaseModel):
@@ -38,6 +76,11 @@ class TripPlanRequest(BaseModel):
     structured: bool = Field(
         default=False, description="Return structured JSON output"
     )
+    stream: bool = Field(
+        default=False,
+        description="Stream progress as Server-Sent Events (also enabled by "
+        "'Accept: text/event-stream')",
+    )
 
 
 class ChatMessage(BaseModel):
@@ -49,6 +92,16 @@ class ChatMessage(BaseModel):
     )
 
 
+class SupportBatchRequest(BaseModel):
+    """Several support questions answered in one request."""
+
+    questions: list[ChatMessage] = Field(
+        min_length=1,
+        max_length=SUPPORT_BATCH_MAX_ITEMS,
+        description="Questions to answer; results are returned in the same order",
+    )
+
+
 class RecommendationRequest(BaseModel):
     """Request for destination recommendations."""
 
@@ -60,6 +113,11 @@ class RecommendationRequest(BaseModel):
     num_recommendations: int = Field(
         default=3, ge=1, le=10, description="Number of recommendations"
     )
+    personalize: bool = Field(
+        default=True,
+        description="Use the user's learned preferences. Non-personalized "
+        "results are cached and shared between users.",
+    )
 
 
 class PreferenceUpdate(BaseModel):
@@ -79,12 +137,222 @@ class FeedbackRequest(BaseModel):
     rating: Optional[int] = Field(None, ge=1, le=5, description="Rating 1-5")
 
 
+@asynccontextmanager
+async def _llm_slot(
+    admission: AdmissionController,
+    user_id: str,
+    tier: str,
+    cost: float,
+    patient: bool = False,
+) -> AsyncIterator[None]:
+    """
+    Take the agent's admission slot, then a fairly scheduled global LLM slot.
+
+    Patient (background job) runs are scheduled in the lowest priority class.
+    Once both are held the model call counts as started for quota purposes.
+    """
+    async with admission.slot(patient):
+        priority = "background" if patient else admission.name
+        async with llm_scheduler.slot(user_id, priority, tier, cost):
+            record_started()
+            yield
+
+
+def _sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class _ReservedStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse that refunds a token reservation its body never used.
+
+    The quota is reserved before headers go out so an exhausted budget is
+    still a 429, and the body generator reconciles it once running. A
+    generator that is never iterated never runs its cleanup though, so if the
+    client is gone before the first chunk the reservation is refunded here.
+    """
+
+    def __init__(self, content: AsyncIterator[str], reservation, **kwargs):
+        self.reservation = reservation
+        self.body_started = False
+        super().__init__(self._mark_started(content), **kwargs)
+
+    async def _mark_started(self, content: AsyncIterator[str]) -> AsyncIterator[str]:
+        self.body_started = True
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            await content.aclose()
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if not self.body_started:
+                token_quota.reconcile(self.reservation, 0)
+
+
+async def _stream_trip_plan(
+    events: AsyncIterator[dict], reservation, user_id: str, tier: str, timeout: float
+) -> AsyncIterator[str]:
+    """
+    Relay trip planner events as SSE, charging the quota as the run completes.
+
+    The run is abandoned once `timeout` seconds have passed, or when the
+    client disconnects (Starlette then cancels the response while it waits
+    for the next event); either way the planner stream is closed.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    try:
+        with token_quota.track(reservation):
+            async with _llm_slot(trip_planner_admission, user_id, tier, reservation.tokens):
+                while True:
+                    remaining = started + timeout - loop.time()
+                    try:
+                        event = await asyncio.wait_for(events.__anext__(), max(remaining, 0))
+                    except StopAsyncIteration:
+                        break
+                    yield _sse(event["event"], event["data"])
+    except asyncio.TimeoutError:
+        cancellations.record("trip_planner", "deadline", loop.time() - started)
+        logger.info("Cancelled streaming trip plan: deadline")
+        yield _sse("error", {"detail": "Request deadline exceeded", "status_code": 504})
+    except asyncio.CancelledError:
+        cancellations.record("trip_planner", "disconnect", loop.time() - started)
+        logger.info("Cancelled streaming trip plan: disconnect")
+        raise
+    except HTTPException as e:
+        yield _sse("error", {"detail": e.detail, "status_code": e.status_code})
+    except Exception as e:
+        # Headers are already sent; report the failure in-band
+        logger.error("Trip plan stream failed: %s", str(e), exc_info=True)
+        yield _sse("error", {"detail": str(e)})
+    finally:
+        await events.aclose()
+
+
+async def _plan_trip(
+    request: TripPlanRequest,
+    user_id: str,
+    tier: str = "free",
+    patient: bool = False,
+) -> dict:
+    """
+    Run a trip plan and return the response payload.
+
+    Plans don't depend on who asks, so results are served from the response
+    cache when possible. On a miss, concurrent requests with the same
+    fingerprint (normalized destination, days, exact budget, interests,
+    style) await one shared run. Only the caller that ran it is charged its
+    tokens, and only that run takes a trip planner admission slot
+    (`patient` waits for one without a queue limit or timeout) and is
+    scheduled under that caller's user and tier. If that caller went away
+    (and was refunded) before the run started, the first follower to receive
+    the result is charged instead.
+    """
+    fingerprint = trip_plan_fingerprint(
+        destination=request.destination,
+        duration_days=request.duration_days,
+        budget=request.budget,
+        interests=request.interests,
+        travel_style=request.travel_style,
+        structured=request.structured,
+    )
+    cache_key = f"{fingerprint}:{trip_plan_signature(request.structured)}"
+    endpoint = "trip_plan_structured" if request.structured else "trip_plan"
+
+    cached = await response_cache.get(endpoint, cache_key)
+    if cached is not None:
+        record_shared()
+        return _echo_trip_request(cached, request)
+
+    led = False
+    leader_gone = False
+
+    async def call_planner() -> dict:
+        if request.structured:
+            result = await plan_trip_structured(
+                destination=request.destination,
+                duration_days=request.duration_days,
+                budget=request.budget,
+                interests=request.interests,
+                travel_style=request.travel_style,
+            )
+            return result.model_dump()
+        return await plan_trip(
+            destination=request.destination,
+            duration_days=request.duration_days,
+            budget=request.budget,
+            interests=request.interests,
+            travel_style=request.travel_style,
+            user_id=user_id,
+        )
+
+    async def run() -> tuple[dict, dict]:
+        nonlocal led
+        led = True
+        estimate = estimate_tokens(
+            "trip_planner",
+            duration_days=request.duration_days,
+            structured=request.structured,
+        )
+        # Tokens for a follower to pay, when nobody else will
+        unpaid = {}
+        async with _llm_slot(trip_planner_admission, user_id, tier, estimate, patient):
+            if leader_gone:
+                with track_usage() as usage:
+                    result = await call_planner()
+                unpaid["tokens"] = usage.total_tokens or estimate
+            else:
+                result = await call_planner()
+        await response_cache.put(endpoint, cache_key, result)
+        return result, unpaid
+
+    if not TRIP_PLAN_COALESCING:
+        result, _ = await run()
+        return result
+
+    try:
+        result, unpaid = await trip_plan_runs.do(cache_key, run)
+    except asyncio.CancelledError:
+        leader_gone = True
+        raise
+    if led:
+        return result
+    tokens = unpaid.pop("tokens", 0)
+    if tokens:
+        record_tokens(tokens)
+    else:
+        record_shared()
+    return _echo_trip_request(result, request)
+
+
+def _echo_trip_request(result: dict, request: TripPlanRequest) -> dict:
+    """
+    A shared plan with this caller's spelling of its text fields echoed back.
+
+    Requests only share a plan when they normalize to the same destination
+    and style and ask for the same budget, so only the formatting differs.
+    """
+    if request.structured:
+        return result
+    return {
+        **result,
+        "destination": request.destination,
+        "travel_style": request.travel_style,
+    }
+
+
 # Trip Planner Endpoints
 @router.post("/chat/trip-planner")
 async def chat_trip_planner(
     request: TripPlanRequest,
     raw_request: Request,
     user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
 ):
     """
     Plan a trip using the multi-agent Trip Planner team.
@@ -93,41 +361,146 @@ async def chat_trip_planner(
     - Researcher: Gathers destination information
     - Planner: Creates day-by-day itinerary
     - Budgeter: Optimizes costs and estimates expenses
+
+    With `stream` (or `Accept: text/event-stream`) the response is an SSE
+    stream of `stage` and `delta` events ending with a `summary` event whose
+    data is the same payload as the non-streaming `data` field.
     """
     try:
-        ai_limiter.check(get_client_key(raw_request, user_id))
+        client_key = get_client_key(raw_request, user_id)
+        await ai_limiter.check(client_key, raw_request)
         logger.info("Trip plan request: %s for %d days by user %s",
                      request.destination, request.duration_days, user_id)
-        if request.structured:
-            result = await plan_trip_structured(
-                destination=request.destination,
-                duration_days=request.duration_days,
-                budget=request.budget,
-                interests=request.interests,
-                travel_style=request.travel_style,
-            )
-            return {"success": True, "data": result.model_dump()}
-        else:
-            result = await plan_trip(
+        estimate = estimate_tokens(
+            "trip_planner",
+            duration_days=request.duration_days,
+            structured=request.structured,
+        )
+        if request.stream or "text/event-stream" in raw_request.headers.get("Accept", ""):
+            # Shed before headers go out; the stream itself waits for its slot
+            trip_planner_admission.check_capacity()
+            reservation = token_quota.reserve(client_key, estimate)
+            events = stream_plan_trip(
                 destination=request.destination,
                 duration_days=request.duration_days,
                 budget=request.budget,
                 interests=request.interests,
                 travel_style=request.travel_style,
                 user_id=user_id,
+                structured=request.structured,
+            )
+            return _ReservedStreamingResponse(
+                _stream_trip_plan(
+                    events,
+                    reservation,
+                    user_id,
+                    tier,
+                    request_timeout(raw_request, "trip_planner"),
+                ),
+                reservation,
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
             )
-            return {"success": True, "data": result}
+        with token_quota.metered(client_key, estimate):
+            result = await run_cancellable(
+                raw_request, "trip_planner", lambda: _plan_trip(request, user_id, tier)
+            )
+        return {"success": True, "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Trip planning failed: %s", str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Trip Planner Jobs
+async def _run_trip_plan_job(params: dict, user_id: str) -> dict:
+    """Job handler: run a trip plan request submitted through the jobs API."""
+    request = TripPlanRequest(**params)
+    tier = params.get("tier", "free")
+    estimate = estimate_tokens(
+        "trip_planner",
+        duration_days=request.duration_days,
+        structured=request.structured,
+    )
+    with token_quota.metered(f"user:{user_id}", estimate):
+        # The job pool already bounds this work; wait for a slot rather than fail
+        return await _plan_trip(request, user_id, tier, patient=True)
+
+
+job_manager.register("trip_plan", _run_trip_plan_job)
+
+
+def _job_view(job: dict) -> dict:
+    """Public fields of a job record."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "expires_at": job["expires_at"],
+    }
+
+
+@router.post("/chat/trip-planner/jobs", status_code=202)
+async def submit_trip_plan_job(
+    request: TripPlanRequest,
+    raw_request: Request,
+    user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
+):
+    """
+    Submit a trip plan to run in the background.
+
+    Poll `GET /chat/trip-planner/jobs/{job_id}` for its status and fetch the
+    plan from `.../result` once it has succeeded. Results are kept for
+    JOB_RESULT_TTL_SECONDS.
+    """
+    await ai_limiter.check(get_client_key(raw_request, user_id), raw_request)
+    job = await job_manager.submit(
+        "trip_plan", user_id, {**request.model_dump(exclude={"stream"}), "tier": tier}
+    )
+    logger.info("Trip plan job %s queued for user %s", job["id"], user_id)
+    return {"success": True, "data": _job_view(job)}
+
+
+@router.get("/chat/trip-planner/jobs/{job_id}")
+async def get_trip_plan_job(job_id: str, user_id: str = Depends(get_user_id)):
+    """Get the status of a trip plan job."""
+    job = await job_manager.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": _job_view(job)}
+
+
+@router.get("/chat/trip-planner/jobs/{job_id}/result")
+async def get_trip_plan_job_result(job_id: str, user_id: str = Depends(get_user_id)):
+    """Fetch the plan produced by a succeeded job."""
+    job = await job_manager.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    return {"success": True, "data": job["result"]}
+
+
+@router.delete("/chat/trip-planner/jobs/{job_id}")
+async def cancel_trip_plan_job(job_id: str, user_id: str = Depends(get_user_id)):
+    """Cancel a queued or running trip plan job."""
+    job = await job_manager.cancel(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True, "data": _job_view(job)}
+
+
 # Support Bot Endpoints
 @router.post("/chat/support")
 async def chat_support(
     request: ChatMessage,
     raw_request: Request,
     user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
 ):
     """
     Chat with the Support Bot agent.
@@ -136,7 +509,8 @@ async def chat_support(
     Handles FAQs, policies, booking questions, and general support.
     """
     try:
-        ai_limiter.check(get_client_key(raw_request, user_id))
+        client_key = get_client_key(raw_request, user_id)
+        await ai_limiter.check(client_key, raw_request)
         # Check for quick response first
         quick = get_quick_response(request.message)
         if quick:
@@ -150,23 +524,114 @@ async def chat_support(
             }
 
         # Use the full agent
-        result = await answer_question(
-            question=request.message,
-            context=request.context,
-            user_id=user_id,
-        )
+        estimate = estimate_tokens("support", message=request.message)
+
+        async def run() -> dict:
+            async with _llm_slot(support_admission, user_id, tier, estimate):
+                return await answer_question(
+                    question=request.message,
+                    context=request.context,
+                    user_id=user_id,
+                )
+
+        with token_quota.metered(client_key, estimate):
+            result = await run_cancellable(raw_request, "support", run)
         return {"success": True, "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Support chat failed: %s", str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/chat/support/batch")
+async def chat_support_batch(
+    request: SupportBatchRequest,
+    raw_request: Request,
+    user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
+):
+    """
+    Answer several support questions in one request.
+
+    Quick responses are resolved first; the remaining questions go to the
+    Support Bot concurrently, at most SUPPORT_BATCH_CONCURRENCY at a time.
+    The batch is rate limited and charged against the token quota as one
+    weighted operation. Each result carries its own `success` flag, so one
+    failed question doesn't fail the batch.
+    """
+    try:
+        client_key = get_client_key(raw_request, user_id)
+        results: list[Optional[dict]] = [None] * len(request.questions)
+        pending = []
+        for index, question in enumerate(request.questions):
+            quick = get_quick_response(question.message)
+            if quick:
+                results[index] = {
+                    "success": True,
+                    "data": {"answer": quick, "quick_response": True, "agent": "SupportBot"},
+                }
+            else:
+                pending.append(index)
+
+        cost = 1 + max(0, len(pending) - 1) * SUPPORT_BATCH_ITEM_WEIGHT
+        await ai_limiter.check(client_key, raw_request, cost=cost)
+        if pending:
+            estimates = {
+                index: estimate_tokens("support", message=request.questions[index].message)
+                for index in pending
+            }
+            fan_out = asyncio.Semaphore(SUPPORT_BATCH_CONCURRENCY)
+
+            async def answer(index: int) -> None:
+                question = request.questions[index]
+                try:
+                    async with fan_out:
+                        async with _llm_slot(support_admission, user_id, tier, estimates[index]):
+                            data = await answer_question(
+                                question=question.message,
+                                context=question.context,
+                                user_id=user_id,
+                            )
+                    results[index] = {"success": True, "data": data}
+                except HTTPException as e:
+                    results[index] = {
+                        "success": False,
+                        "error": e.detail,
+                        "status_code": e.status_code,
+                    }
+                except Exception as e:
+                    logger.warning("Batch support question %d failed: %s", index, e)
+                    results[index] = {"success": False, "error": str(e), "status_code": 500}
+
+            async def run() -> None:
+                await asyncio.gather(*(answer(index) for index in pending))
+
+            with token_quota.metered(client_key, sum(estimates.values())):
+                await run_cancellable(raw_request, "support_batch", run)
+
+        return {
+            "success": True,
+            "data": {
+                "results": results,
+                "quick_responses": len(request.questions) - len(pending),
+                "failed": sum(1 for result in results if not result["success"]),
+            },
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Batch support chat failed: %s", str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # Recommender Endpoints
 @router.post("/chat/recommend")
 async def chat_recommend(
     request: RecommendationRequest,
     raw_request: Request,
     user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
 ):
     """
     Get personalized destination recommendations.
@@ -175,14 +640,42 @@ async def chat_recommend(
     provides increasingly personalized suggestions.
     """
     try:
-        ai_limiter.check(get_client_key(raw_request, user_id))
-        result = await get_recommendations(
-            user_id=user_id,
-            query=request.query,
-            preferences=request.preferences,
-            num_recommendations=request.num_recommendations,
+        client_key = get_client_key(raw_request, user_id)
+        await ai_limiter.check(client_key, raw_request)
+        cache_key = None
+        if not request.personalize:
+            cache_key = request_fingerprint(
+                "recommend",
+                query=request.query,
+                preferences=request.preferences,
+                num_recommendations=request.num_recommendations,
+                signature=recommendation_signature(),
+            )
+            cached = await response_cache.get("recommend", cache_key)
+            if cached is not None:
+                return {"success": True, "data": {**cached, "user_id": user_id}}
+
+        estimate = estimate_tokens(
+            "recommend", num_recommendations=request.num_recommendations
         )
+
+        async def run() -> dict:
+            async with _llm_slot(recommender_admission, user_id, tier, estimate):
+                return await get_recommendations(
+                    user_id=user_id,
+                    query=request.query,
+                    preferences=request.preferences,
+                    num_recommendations=request.num_recommendations,
+                    personalize=request.personalize,
+                )
+
+        with token_quota.metered(client_key, estimate):
+            result = await run_cancellable(raw_request, "recommender", run)
+        if cache_key is not None:
+            await response_cache.put("recommend", cache_key, result)
         return {"success": True, "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Recommendation failed: %s", str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -191,18 +684,29 @@ async def chat_recommend(
 @router.post("/recommend/preferences")
 async def update_user_preferences(
     request: PreferenceUpdate,
+    raw_request: Request,
     user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
 ):
     """
     Update user preferences for better recommendations.
     """
     try:
-        result = await update_preferences(
-            user_id=user_id,
-            preference_type=request.preference_type,
-            preference_value=request.preference_value,
-        )
+        estimate = estimate_tokens("preferences")
+
+        async def run() -> dict:
+            async with _llm_slot(recommender_admission, user_id, tier, estimate):
+                return await update_preferences(
+                    user_id=user_id,
+                    preference_type=request.preference_type,
+                    preference_value=request.preference_value,
+                )
+
+        with token_quota.metered(f"user:{user_id}", estimate):
+            result = await run_cancellable(raw_request, "recommender", run)
         return {"success": True, "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Preference update failed: %s", str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -211,24 +715,58 @@ async def update_user_preferences(
 @router.post("/recommend/feedback")
 async def submit_feedback(
     request: FeedbackRequest,
+    raw_request: Request,
     user_id: str = Depends(get_user_id),
+    tier: str = Depends(get_user_tier),
 ):
     """
     Submit feedback about a destination for learning.
     """
     try:
-        result = await provide_feedback(
-            user_id=user_id,
-            destination=request.destination,
-            feedback=request.feedback,
-            rating=request.rating,
-        )
+        estimate = estimate_tokens("feedback")
+
+        async def run() -> dict:
+            async with _llm_slot(recommender_admission, user_id, tier, estimate):
+                return await provide_feedback(
+                    user_id=user_id,
+                    destination=request.destination,
+                    feedback=request.feedback,
+                    rating=request.rating,
+                )
+
+        with token_quota.metered(f"user:{user_id}", estimate):
+            result = await run_cancellable(raw_request, "recommender", run)
         return {"success": True, "data": result}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("Feedback submission failed: %s", str(e), exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Knowledge base hot reload
+@router.post("/admin/knowledge/reload")
+async def reload_knowledge_base(admin_id: str = Depends(require_admin)):
+    """
+    Rescan the knowledge directory now instead of waiting for the watcher.
+
+    Changed files are re-indexed and swapped in; unchanged files are untouched.
+    """
+    try:
+        changes = await knowledge_watcher.rescan()
+    except Exception as e:
+        logger.error("Knowledge reload failed: %s", str(e), exc_info=True)
+        raise HTTPException(status_code=500, detail="Knowledge reload failed; the previous version is still served")
+    logger.info("Knowledge rescan requested by %s: %s", admin_id, changes.to_dict())
+    return {
+        "success": True,
+        "data": {
+            "reloaded": bool(changes),
+            "changes": changes.to_dict(),
+        },
+    }
+
+
 # Conversation History (optional endpoint)
 @router.get("/conversations/{user_id}")
 async def get_conversations(
@@ -0,0 +1,246 @@
+"""
+Weighted fair scheduling of LLM runs for GoBuddy AI Agents.
+
+Admission control bounds each agent separately, but all agents share one
+upstream model budget: a user firing trip plans back to back can still keep
+every LLM slot busy while support chats wait. The scheduler owns the global
+pool of concurrent LLM runs and, when it is contended, hands the next free
+slot to the waiting run with the earliest virtual finish time (start-time
+fair queueing). Each user is a flow; a run costs its token estimate divided
+by a weight from its priority class (support > recommender > trip planner >
+background jobs) and the user's tier (paid > free). A user's share of LLM
+throughput is therefore proportional to their weight, no matter how many
+requests they queue.
+"""
+import os
+import math
+import time
+import heapq
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+logger = logging.getLogger("gobuddy.scheduler")
+
+
+def _parse_weights(value: str) -> dict[str, float]:
+    """'support=8,trip_planner=2' -> {'support': 8.0, 'trip_planner': 2.0}"""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() and weight.strip():
+            weights[name.strip()] = float(weight)
+    return weights
+
+
+# Concurrent LLM runs across all agents (0 disables the scheduler)
+LLM_MAX_CONCURRENT = int(os.getenv("LLM_MAX_CONCURRENT", "16"))
+SCHEDULER_CLASS_WEIGHTS = _parse_weights(
+    os.getenv("SCHEDULER_CLASS_WEIGHTS", "support=8,recommender=4,trip_planner=2,background=1")
+)
+SCHEDULER_TIER_WEIGHTS = _parse_weights(
+    os.getenv("SCHEDULER_TIER_WEIGHTS", "free=1,plus=2,pro=4")
+)
+# Service shares in /api/metrics decay with this half-life
+SCHEDULER_SHARE_HALF_LIFE_SECONDS = float(os.getenv("SCHEDULER_SHARE_HALF_LIFE_SECONDS", "300"))
+SCHEDULER_MAX_FLOWS = int(os.getenv("SCHEDULER_MAX_FLOWS", "10000"))
+
+
+class _DecayingCounter:
+    """Sum of recent service, halving every `half_life` seconds."""
+
+    __slots__ = ("value", "updated")
+
+    def __init__(self):
+        self.value = 0.0
+        self.updated = 0.0
+
+    def read(self, now: float, half_life: float) -> float:
+        return self.value * 0.5 ** ((now - self.updated) / half_life)
+
+    def add(self, amount: float, now: float, half_life: float) -> None:
+        self.value = self.read(now, half_life) + amount
+        self.updated = now
+
+
+class FairScheduler:
+    """
+    Global LLM concurrency limit with weighted fair queueing across users.
+
+    Runs start immediately while slots are free. Once all are busy, waiters
+    are ordered by virtual finish tag, so a flow that has recently been
+    served a lot (relative to its weight) yields to lighter flows.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = LLM_MAX_CONCURRENT,
+        class_weights: dict[str, float] = SCHEDULER_CLASS_WEIGHTS,
+        tier_weights: dict[str, float] = SCHEDULER_TIER_WEIGHTS,
+        share_half_life: float = SCHEDULER_SHARE_HALF_LIFE_SECONDS,
+        max_flows: int = SCHEDULER_MAX_FLOWS,
+    ):
+        self.max_concurrent = max_concurrent
+        self.class_weights = class_weights
+        self.tier_weights = tier_weights
+        self.share_half_life = share_half_life
+        self.max_flows = max_flows
+        self.active = 0
+        self._virtual_time = 0.0
+        # flow -> virtual finish tag of its latest run
+        self._finish: dict[str, float] = {}
+        # (finish tag, arrival seq, future)
+        self._waiters: list[tuple[float, int, asyncio.Future]] = []
+        self._seq = 0
+        self.dispatched = 0
+        self.queued = 0
+        self._wait_sum: dict[str, float] = defaultdict(float)
+        self._wait_count: dict[str, int] = defaultdict(int)
+        self._service: dict[str, dict[str, _DecayingCounter]] = {
+            "flow": {}, "class": {}, "tier": {},
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(1 for _, _, waiter in self._waiters if not waiter.done())
+
+    def weight(self, priority: str, tier: str) -> float:
+        """Share weight of a run: class weight x tier weight."""
+        return self.class_weights.get(priority, 1.0) * self.tier_weights.get(tier, 1.0)
+
+    def _tag(self, flow: str, cost: float, weight: float) -> tuple[float, float]:
+        start = max(self._virtual_time, self._finish.get(flow, 0.0))
+        finish = start + max(cost, 1.0) / weight
+        self._finish[flow] = finish
+        return start, finish
+
+    def _prune(self) -> None:
+        # Flows whose tags are behind virtual time have no backlog; max() in
+        # _tag treats them the same as unknown flows
+        if len(self._finish) > self.max_flows:
+            self._finish = {f: t for f, t in self._finish.items() if t > self._virtual_time}
+        for table in self._service.values():
+            if len(table) > self.max_flows:
+                now = time.time()
+                cutoff = 1e-3
+                for key in [k for k, c in table.items() if c.read(now, self.share_half_life) < cutoff]:
+                    del table[key]
+
+    def _charge(self, flow: str, priority: str, tier: str, cost: float) -> None:
+        now = time.time()
+        for table, key in (
+            (self._service["flow"], flow),
+            (self._service["class"], priority),
+            (self._service["tier"], tier),
+        ):
+            counter = table.get(key)
+            if counter is None:
+                counter = table[key] = _DecayingCounter()
+            counter.add(cost, now, self.share_half_life)
+
+    async def acquire(self, flow: str, priority: str, tier: str = "free", cost: float = 1.0) -> None:
+        """
+        Wait for a global LLM slot.
+
+        Args:
+            flow: Fairness key, normally the user id
+            priority: Priority class (an agent name or "background")
+            tier: The user's plan tier
+            cost: Expected work, e.g. the token estimate
+        """
+        start, finish = self._tag(flow, cost, self.weight(priority, tier))
+        self._charge(flow, priority, tier, cost)
+        self._prune()
+
+        if self.active < self.max_concurrent and not self.queue_depth:
+            self.active += 1
+            self._virtual_time = max(self._virtual_time, start)
+            self.dispatched += 1
+            self._observe_wait(priority, 0.0)
+            return
+
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        heapq.heappush(self._waiters, (finish, self._seq, waiter))
+        self.queued += 1
+        try:
+            virtual_start = await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Slot was handed over just as we were cancelled; pass it on
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        # release() already counted us in self.active
+        self._virtual_time = max(self._virtual_time, virtual_start, start)
+        self.dispatched += 1
+        self._observe_wait(priority, time.monotonic() - started)
+
+    def release(self) -> None:
+        """Free a slot, handing it to the waiter with the earliest finish tag."""
+        while self._waiters:
+            finish, _, waiter = heapq.heappop(self._waiters)
+            if not waiter.done():
+                waiter.set_result(finish)
+                return
+        self.active -= 1
+
+    def _observe_wait(self, priority: str, seconds: float) -> None:
+        self._wait_sum[priority] += seconds
+        self._wait_count[priority] += 1
+
+    @asynccontextmanager
+    async def slot(
+        self, flow: str, priority: str, tier: str = "free", cost: float = 1.0
+    ) -> AsyncIterator[None]:
+        """Hold a global LLM slot for the duration of the block."""
+        if not self.enabled:
+            yield
+            return
+        await self.acquire(flow, priority, tier, cost)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _shares(self, table: dict[str, _DecayingCounter], now: float) -> dict[str, float]:
+        values = {k: c.read(now, self.share_half_life) for k, c in table.items()}
+        total = sum(values.values())
+        if not total:
+            return {}
+        return {k: round(v / total, 4) for k, v in values.items() if v / total >= 1e-4}
+
+    def stats(self) -> dict:
+        now = time.time()
+        flow_shares = self._shares(self._service["flow"], now)
+        top = sorted(flow_shares.values(), reverse=True)
+        return {
+            "enabled": self.enabled,
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "queue_depth": self.queue_depth,
+            "dispatched": self.dispatched,
+            "queued": self.queued,
+            "avg_wait_seconds": {
+                name: round(self._wait_sum[name] / count, 4)
+                for name, count in self._wait_count.items()
+            },
+            "service_share": {
+                "class": self._shares(self._service["class"], now),
+                "tier": self._shares(self._service["tier"], now),
+                "active_users": len(flow_shares),
+                "top_user": top[0] if top else 0.0,
+                "top_10_users": round(math.fsum(top[:10]), 4),
+            },
+        }
+
+
+llm_scheduler = FairScheduler()
@@ -0,0 +1,207 @@
+"""
+Shared-memory rate-limit state for multi-worker deployments.
+
+All uvicorn workers on a host map the same file (under /dev/shm by default)
+holding a fixed-size open-addressing hash table of key -> per-window TATs.
+Every read-modify-write takes an exclusive flock on the file, so a check and
+its charge are atomic across processes and the configured limits hold no
+matter how many workers run. A header keeps the number of occupied slots and
+a shared sweep cursor, so neither the key-count gauge nor a sweep scans the
+whole table while holding the lock.
+
+flock locks belong to the open file description, which a forked child shares
+with its parent (e.g. workers forked by `gunicorn --preload` after the app
+module created its store), so a store reopens the file in every process that
+uses it.
+"""
+import os
+import time
+import mmap
+import fcntl
+import struct
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Callable, Optional, TypeVar
+
+from api import gcra
+
+logger = logging.getLogger("gobuddy.rate_limit.shm")
+
+T = TypeVar("T")
+
+# Header layout: magic, slot count, occupied slots, next slot to sweep
+_HEADER = struct.Struct("<8sQQQ")
+_MAGIC = b"GBTAT\x00\x00\x01"
+# Slot layout: key hash (u64, 0 = empty), minute TAT (f64), hour TAT (f64)
+_SLOT = struct.Struct("<Qdd")
+# Slots inspected per lookup; entries can live anywhere in this window
+_PROBE = 16
+
+
+def default_shm_dir() -> str:
+    """Prefer tmpfs so the table never touches disk."""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def _key_hash(key: str) -> int:
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+    return value or 1
+
+
+class SharedTATStore:
+    """
+    Process-shared LRU-ish map of rate-limit key -> (minute TAT, hour TAT).
+
+    Drop-in replacement for `api.rate_limit.TATStore`. Lookups scan a short
+    probe window instead of stopping at the first empty slot, so freeing an
+    idle slot never breaks another key's chain. When a window is full the
+    entry with the earliest TAT is evicted — the one closest to idle anyway.
+    """
+
+    def __init__(self, path: str, slots: int = 65536, sweep_slots: int = 4096):
+        self.path = path
+        self.slots = slots
+        self.max_keys = slots
+        self.sweep_slots = sweep_slots
+        self.evictions = 0
+        self.swept = 0
+        self._size = _HEADER.size + slots * _SLOT.size
+        self._open()
+        logger.info("Shared rate-limit table at %s (%d slots)", path, slots)
+
+    def _open(self) -> None:
+        """Open and map the table for the current process."""
+        self._pid = os.getpid()
+        self._thread_lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            # The first worker sizes the file; later workers see it already sized
+            if os.fstat(self._fd).st_size < self._size:
+                os.ftruncate(self._fd, self._size)
+            self._map = mmap.mmap(self._fd, self._size)
+            magic, file_slots, _count, _cursor = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC or file_slots != self.slots:
+                if magic != bytes(len(_MAGIC)):
+                    logger.warning("Resetting shared rate-limit table %s (layout changed)", self.path)
+                self._map[:] = bytes(self._size)
+                _HEADER.pack_into(self._map, 0, _MAGIC, self.slots, 0, 0)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _locked(self, fn: Callable[[], T]) -> T:
+        if self._pid != os.getpid():
+            # Forked: drop the parent's descriptor, whose flock would not exclude it
+            self._map.close()
+            os.close(self._fd)
+            self._open()
+        with self._thread_lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                return fn()
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _window(self, key_hash: int):
+        start = key_hash % self.slots
+        for i in range(min(_PROBE, self.slots)):
+            index = (start + i) % self.slots
+            yield index, _SLOT.unpack_from(self._map, _HEADER.size + index * _SLOT.size)
+
+    def _find(self, key_hash: int) -> Optional[tuple[float, float]]:
+        for _index, (slot_hash, tat_m, tat_h) in self._window(key_hash):
+            if slot_hash == key_hash:
+                return tat_m, tat_h
+        return None
+
+    def _add_occupied(self, delta: int) -> None:
+        magic, slots, count, cursor = _HEADER.unpack_from(self._map, 0)
+        _HEADER.pack_into(self._map, 0, magic, slots, max(0, count + delta), cursor)
+
+    def _write(self, key_hash: int, tats: tuple[float, float], now: float) -> None:
+        target = None
+        empty = False
+        oldest = None
+        for index, (slot_hash, tat_m, tat_h) in self._window(key_hash):
+            if slot_hash == key_hash:
+                target = index
+                empty = False
+                break
+            if target is None and (slot_hash == 0 or max(tat_m, tat_h) <= now):
+                target = index
+                empty = slot_hash == 0
+            if oldest is None or max(tat_m, tat_h) < oldest[1]:
+                oldest = (index, max(tat_m, tat_h))
+        if target is None:
+            target = oldest[0]
+            self.evictions += 1
+        _SLOT.pack_into(self._map, _HEADER.size + target * _SLOT.size, key_hash, tats[0], tats[1])
+        if empty:
+            self._add_occupied(1)
+
+    def get(self, key: str) -> Optional[tuple[float, float]]:
+        key_hash = _key_hash(key)
+        return self._locked(lambda: self._find(key_hash))
+
+    def put(self, key: str, tats: tuple[float, float]) -> None:
+        key_hash = _key_hash(key)
+        self._locked(lambda: self._write(key_hash, tats, time.time()))
+
+    def update(
+        self,
+        key: str,
+        fn: Callable[[Optional[tuple[float, float]]], tuple[Optional[tuple[float, float]], T]],
+        now: float,
+    ) -> T:
+        """Atomically read a key's TATs, compute new ones and write them back."""
+        key_hash = _key_hash(key)
+
+        def apply():
+            new_tats, result = fn(self._find(key_hash))
+            if new_tats is not None:
+                self._write(key_hash, new_tats, now)
+            return result
+
+        return self._locked(apply)
+
+    def charge(self, key: str, windows, now: float, cost: float = 1):
+        """Charge a request; returns (TATs in effect, None or a gcra.Rejection)."""
+        return self.update(key, lambda tats: gcra.settle(tats, windows, now, cost), now)
+
+    def sweep(self, now: float, max_slots: Optional[int] = None) -> int:
+        """
+        Free idle slots among the next `max_slots` (default `sweep_slots`).
+
+        Sweeps resume where the last one, from any process, stopped, so the
+        lock is only held for a bounded batch while the table is covered
+        over successive calls. Returns the number of slots freed.
+        """
+        batch = min(self.slots, max_slots or self.sweep_slots)
+
+        def apply():
+            magic, slots, count, cursor = _HEADER.unpack_from(self._map, 0)
+            freed = 0
+            for i in range(batch):
+                offset = _HEADER.size + (cursor + i) % self.slots * _SLOT.size
+                slot_hash, tat_m, tat_h = _SLOT.unpack_from(self._map, offset)
+                if slot_hash and max(tat_m, tat_h) <= now:
+                    _SLOT.pack_into(self._map, offset, 0, 0.0, 0.0)
+                    freed += 1
+            _HEADER.pack_into(
+                self._map, 0, magic, slots, max(0, count - freed), (cursor + batch) % self.slots
+            )
+            return freed
+
+        freed = self._locked(apply)
+        self.swept += freed
+        return freed
+
+    def __len__(self) -> int:
+        """Occupied slots, idle ones not yet swept included."""
+        return self._locked(lambda: _HEADER.unpack_from(self._map, 0)[2])
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
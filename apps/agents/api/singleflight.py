@@ -0,0 +1,90 @@
+"""
+Single-flight call coalescing for GoBuddy AI Agents.
+Concurrent callers asking for the same key share one in-flight result.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+logger = logging.getLogger("gobuddy.singleflight")
+
+T = TypeVar("T")
+
+
+class _Call:
+    """One in-flight call and the number of callers awaiting it."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls by key.
+
+    The first caller for a key starts the work as a task; callers that arrive
+    while it is running await the same task. Results and exceptions are
+    delivered to every waiter. A cancelled waiter only stops waiting — the
+    shared task is cancelled once its last waiter has gone.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn()` for `key`, or join the call already in flight.
+
+        Args:
+            key: Coalescing key; callers with equal keys share one call
+            fn: Zero-argument coroutine factory, only invoked by the leader
+
+        Returns:
+            The shared result. Re-raises the shared exception.
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda task: self._finish(key, call))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller gave up — stop the work and let the next caller restart it
+                logger.debug("%s: cancelling abandoned call", self.name)
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _finish(self, key: Hashable, call: _Call) -> None:
+        self._forget(key, call)
+        if not call.task.cancelled():
+            # Mark the exception as retrieved even if every waiter left
+            call.task.exception()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
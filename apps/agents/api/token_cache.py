@@ -0,0 +1,168 @@
+"""
+Verified-token cache for GoBuddy AI Agents.
+Avoids re-verifying the same bearer token on every request of a chat session.
+"""
+import os
+import time
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+
+logger = logging.getLogger("gobuddy.token_cache")
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+TOKEN_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_NEGATIVE_TTL_SECONDS", "30"))
+# How long past its TTL a verified token may still be served while Supabase is down
+AUTH_GRACE_SECONDS = float(os.getenv("AUTH_GRACE_SECONDS", "900"))
+
+
+def hash_token(token: str) -> str:
+    """Hash a bearer token so raw credentials never sit in memory as keys."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Read the `exp` claim without verifying the signature (None if absent)."""
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        return None
+    return float(exp) if exp is not None else None
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of token verification results.
+
+    Positive entries expire at the token's `exp` claim or after `ttl`,
+    whichever comes first. Rejected tokens are remembered for `negative_ttl`
+    so a client retrying a bad token doesn't hit the verifier every time.
+
+    Positive entries are kept for up to `grace` seconds past their TTL (never
+    past `exp`) so `get_stale` can keep recent sessions working while the
+    upstream verifier is unavailable.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 300,
+        negative_ttl: float = 30,
+        grace: float = 0,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.grace = grace
+        # token hash -> (payload or None for rejected, expires_at, stale_until)
+        self._entries: OrderedDict[str, tuple[Optional[dict], float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_hits = 0
+
+    def get(self, token: str) -> tuple[bool, Optional[dict]]:
+        """
+        Look up a token.
+
+        Returns:
+            (hit, payload) — payload is None for a cached rejection.
+        """
+        key = hash_token(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None and entry[2] <= now:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            if entry[0] is None:
+                self.negative_hits += 1
+            else:
+                self.hits += 1
+            return True, entry[0]
+
+    def get_stale(self, token: str) -> Optional[dict]:
+        """
+        Return a verified payload that is past its TTL but within the grace window.
+
+        Only meant for when the verifier is unavailable. Never returns a
+        payload for a token past its `exp` claim.
+        """
+        key = hash_token(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] is None or entry[2] <= now:
+                return None
+            self.stale_hits += 1
+            return entry[0]
+
+    def put(self, token: str, payload: dict) -> None:
+        """Cache a verified payload until the token expires or the TTL elapses."""
+        now = time.time()
+        expires_at = now + self.ttl
+        stale_until = expires_at + self.grace
+        exp = payload.get("exp") or token_expiry(token)
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+            stale_until = min(stale_until, float(exp))
+        self._store(hash_token(token), payload, expires_at, stale_until)
+
+    def put_invalid(self, token: str) -> None:
+        """Remember that a token was rejected."""
+        expires_at = time.time() + self.negative_ttl
+        self._store(hash_token(token), None, expires_at, expires_at)
+
+    def invalidate(self, token: str) -> None:
+        """Drop any cached result for a token."""
+        with self._lock:
+            self._entries.pop(hash_token(token), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _store(
+        self, key: str, payload: Optional[dict], expires_at: float, stale_until: float
+    ) -> None:
+        if stale_until <= time.time():
+            return
+        with self._lock:
+            self._entries[key] = (payload, expires_at, stale_until)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters for the metrics endpoint."""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round((self.hits + self.negative_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Shared by api.auth and api.dependencies
+token_cache = TokenCache(
+    max_entries=TOKEN_CACHE_MAX_ENTRIES,
+    ttl=TOKEN_CACHE_TTL_SECONDS,
+    negative_ttl=TOKEN_CACHE_NEGATIVE_TTL_SECONDS,
+    grace=AUTH_GRACE_SECONDS,
+)
@@ -0,0 +1 @@
+"""Performance microbenchmarks for GoBuddy AI Agents."""
@@ -0,0 +1,91 @@
+"""
+Microbenchmark: compiled IntentMatcher vs. substring scanning over every intent.
+
+Run from apps/agents:
+    python -m benchmarks.bench_intents
+"""
+import random
+import time
+
+from agents.intents import IntentMatcher, load_intents
+
+INTENTS = 1000
+KEYWORDS_PER_INTENT = 5
+MESSAGES = 2000
+
+_SYLLABLES = "ba ko ri ta mu ne sa lo pi de gu va".split()
+# Filler words share no letters with the keyword syllables
+_FILLER = "why hey fly wry xyz shh hmm psst zzz cwm".split()
+# Fraction of messages that mention an intent keyword
+HIT_RATE = 0.3
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def build_intents(rng: random.Random) -> dict:
+    intents = {}
+    for i in range(INTENTS):
+        keywords = []
+        for _ in range(KEYWORDS_PER_INTENT):
+            keyword = " ".join(_word(rng) for _ in range(rng.choice((1, 1, 2))))
+            keywords.append(keyword + "*" if rng.random() < 0.2 else keyword)
+        intents[f"intent{i}"] = {
+            "keywords": keywords,
+            "negative": [_word(rng)] if rng.random() < 0.1 else [],
+            "priority": rng.randint(0, 3),
+            "response": f"Answer {i}",
+        }
+    return intents
+
+
+def build_messages(rng: random.Random, intents: dict) -> list[str]:
+    keywords = [k.rstrip("*") for data in intents.values() for k in data["keywords"]]
+    messages = []
+    for _ in range(MESSAGES):
+        words = [rng.choice(_FILLER) for _ in range(rng.randint(6, 20))]
+        if rng.random() < HIT_RATE:
+            words.insert(rng.randrange(len(words)), rng.choice(keywords))
+        messages.append(" ".join(words))
+    return messages
+
+
+def substring_scan(intents: dict, message: str):
+    """The previous get_quick_response: first intent with any keyword as a substring."""
+    lower = message.lower()
+    for data in intents.values():
+        if any(keyword.rstrip("*") in lower for keyword in data["keywords"]):
+            return data["response"]
+    return None
+
+
+def bench(fn, messages: list[str]) -> float:
+    """Microseconds per message."""
+    start = time.perf_counter()
+    for message in messages:
+        fn(message)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    intents = build_intents(rng)
+    messages = build_messages(rng, intents)
+
+    start = time.perf_counter()
+    matcher = IntentMatcher(load_intents(intents))
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    print(
+        f"{INTENTS} intents x {KEYWORDS_PER_INTENT} keywords, {MESSAGES} messages "
+        f"({HIT_RATE:.0%} mention a keyword)"
+    )
+    print(f"matcher build: {build_ms:.1f} ms")
+    print(f"{'implementation':<16}{'us/message':>12}")
+    print(f"{'substring-scan':<16}{bench(lambda m: substring_scan(intents, m), messages):>12.1f}")
+    print(f"{'intent-matcher':<16}{bench(matcher.match, messages):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
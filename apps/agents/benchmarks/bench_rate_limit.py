@@ -0,0 +1,57 @@
+"""
+Microbenchmark: GCRA RateLimiter vs. the sliding-window list implementation.
+
+Run from apps/agents:
+    python -m benchmarks.bench_rate_limit
+"""
+import time
+import asyncio
+import tracemalloc
+
+from api.rate_limit import RateLimiter, SlidingWindowRateLimiter
+
+KEYS = 1000
+REQUESTS_PER_KEY = 499  # just under general_limiter's 500/hour
+
+
+async def bench_checks(limiter_cls) -> float:
+    """Average microseconds per check with windows filled close to the limit."""
+    limiter = limiter_cls(requests_per_minute=500, requests_per_hour=500)
+    keys = [f"ip:10.0.{i // 256}.{i % 256}" for i in range(KEYS)]
+    start = time.perf_counter()
+    for _ in range(REQUESTS_PER_KEY):
+        for key in keys:
+            await limiter.check(key)
+    elapsed = time.perf_counter() - start
+    return elapsed / (KEYS * REQUESTS_PER_KEY) * 1e6
+
+
+async def bench_memory(limiter_cls) -> float:
+    """Bytes of limiter state per tracked key."""
+    tracemalloc.start()
+    limiter = limiter_cls(requests_per_minute=500, requests_per_hour=500)
+    before = tracemalloc.take_snapshot()
+    for i in range(KEYS):
+        key = f"ip:10.1.{i // 256}.{i % 256}"
+        for _ in range(100):
+            await limiter.check(key)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    grown = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    return grown / KEYS
+
+
+def main():
+    print(f"{KEYS} keys x {REQUESTS_PER_KEY} checks, 500 req/min + 500 req/hour")
+    print(f"{'implementation':<16}{'us/check':>12}{'bytes/key':>14}")
+    for name, cls in (
+        ("sliding-window", SlidingWindowRateLimiter),
+        ("gcra", RateLimiter),
+    ):
+        checks = asyncio.run(bench_checks(cls))
+        memory = asyncio.run(bench_memory(cls))
+        print(f"{name:<16}{checks:>12.2f}{memory:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
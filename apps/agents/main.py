@@ -6,7 +6,7 @@ import os
 import logging
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 # Load environment variables
@@ -22,14 +22,29 @@ logger = logging.getLogger("gobuddy")
 
 # Import agents
 from agents.trip_planner import trip_planner_team
-from agents.support_bot import support_agent
+from agents.support_bot import support_agent, answer_cache, knowledge, knowledge_watcher
+from agents.knowledge_watcher import KNOWLEDGE_WATCH_ENABLED
 from agents.recommender import recommender_agent
-from api.routes import router
+from api.routes import router, trip_plan_runs
+from api import auth
+from api.http_client import start_http_client, close_http_client
+from api import rate_limit
+from api.token_cache import token_cache
+from api.quota import token_quota
+from api.middleware import RateLimitMiddleware
+from api.jobs import job_manager
+from api.response_cache import response_cache
+from api import admission
+from api.scheduler import llm_scheduler
+from api.cancellation import cancellations
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup/shutdown events."""
+    # Startup: Shared pooled HTTP client for Supabase calls
+    await start_http_client()
+
     # Startup: Load knowledge base for RAG
     logger.info("Loading knowledge base...")
     try:
@@ -39,10 +54,31 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("Could not load knowledge base: %s", e)
 
+    # Startup: Pick up knowledge edits without a restart
+    if KNOWLEDGE_WATCH_ENABLED:
+        knowledge_watcher.start()
+
+    # Startup: Keep Supabase signing keys cached for local JWT verification
+    if auth.SUPABASE_URL and auth.AUTH_LOCAL_VERIFY:
+        auth.jwks_cache.start()
+
+    # Startup: Periodically forget idle rate-limit keys
+    rate_limit.start_sweeper()
+
+    # Startup: Background job workers (resumes jobs queued before a restart)
+    await job_manager.start()
+
     yield
 
     # Shutdown
     logger.info("Shutting down AI agents...")
+    await job_manager.stop()
+    await knowledge_watcher.stop()
+    response_cache.close()
+    await auth.jwks_cache.stop()
+    await rate_limit.stop_sweeper()
+    await rate_limit.close_redis_client()
+    await close_http_client()
 
 
 # Create FastAPI app
@@ -61,12 +97,16 @@ _allowed_origins = list(filter(None, [
 if os.getenv("ENV", "development") == "development":
     _allowed_origins += ["http://localhost:3000", "http://localhost:8081"]
 
+# Pre-auth edge rate limit; added first so CORS headers still wrap its 429s
+app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=_allowed_origins,
     allow_credentials=True,
     allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type", "X-Client-Info", "apikey"],
+    allow_headers=["Authorization", "Content-Type", "X-Client-Info", "apikey", "X-Request-Timeout"],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
 )
 
 # Include API routes
@@ -91,13 +131,45 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint."""
+    auth_state = auth.auth_breaker.stats()
     return {
-        "status": "healthy",
+        "status": "healthy" if auth_state["state"] == "closed" else "degraded",
         "agents": {
             "trip_planner": "ready",
             "support_bot": "ready",
             "recommender": "ready",
         },
+        "dependencies": {
+            "supabase_auth": auth_state,
+        },
+    }
+
+
+@app.get("/api/metrics")
+async def metrics(admin_id: str = Depends(auth.require_admin)):
+    """In-process performance counters (admins only)."""
+    return {
+        "auth_token_cache": token_cache.stats(),
+        "auth_remote_verifications": auth.remote_verifications.stats(),
+        "rate_limit": {
+            "ai": rate_limit.ai_limiter.stats(),
+            "general": rate_limit.general_limiter.stats(),
+        },
+        "token_quota": token_quota.stats(),
+        "jobs": job_manager.stats(),
+        "trip_plan_coalescing": trip_plan_runs.stats(),
+        "response_cache": response_cache.stats(),
+        "support_answer_cache": answer_cache.stats(),
+        "knowledge_index": knowledge.index.stats() if knowledge else None,
+        "knowledge_context": knowledge.packer.stats() if knowledge else None,
+        "knowledge_watcher": knowledge_watcher.stats(),
+        "admission": {
+            "trip_planner": admission.trip_planner_admission.stats(),
+            "support": admission.support_admission.stats(),
+            "recommender": admission.recommender_admission.stats(),
+        },
+        "llm_scheduler": llm_scheduler.stats(),
+        "cancellations": cancellations.stats(),
     }
 
 
@@ -8,6 +8,45 @@ from unittest.mock import AsyncMock, MagicMock, patch
 # Set test environment
 os.environ["ENV"] = "test"
 os.environ["OPENAI_API_KEY"] = "test-key"
+# Keep API tests independent of responses cached on disk by earlier runs
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+os.environ["SEMANTIC_CACHE_ENABLED"] = "false"
+# Exercise the agent path unless a test opts into direct knowledge answers
+os.environ["KNOWLEDGE_DIRECT_ANSWERS"] = "false"
+
+
+class FakeClock:
+    """Controllable replacement for time.time()."""
+
+    def __init__(self, start=1_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    """FakeClock patched in as time.time() for the duration of a test."""
+    fake = FakeClock()
+    with patch("time.time", fake):
+        yield fake
+
+
+@pytest.fixture
+def raw_request():
+    """Factory for the starlette Request a route receives as `raw_request`."""
+
+    def make(headers=None, disconnected=False):
+        request = MagicMock()
+        request.headers = headers or {}
+        request.is_disconnected = AsyncMock(return_value=disconnected)
+        return request
+
+    return make
 
 
 @pytest.fixture
@@ -0,0 +1,138 @@
+"""
+Tests for per-agent admission control.
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+
+def _controller(**overrides):
+    from api.admission import AdmissionController
+
+    params = {"max_concurrent": 1, "max_queue": 1, "queue_timeout": 1.0}
+    params.update(overrides)
+    return AdmissionController("test", **params)
+
+
+class TestAdmissionController:
+    """Tests for AdmissionController."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        """Test no more than max_concurrent blocks run at once."""
+        controller = _controller(max_concurrent=2, max_queue=10)
+        running = 0
+        peak = 0
+
+        async def work():
+            nonlocal running, peak
+            async with controller.slot():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(work() for _ in range(6)))
+
+        assert peak == 2
+        assert controller.stats()["admitted"] == 6
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_sheds_when_queue_full(self):
+        """Test requests beyond the queue get an immediate 503 with Retry-After."""
+        controller = _controller()
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.slot():
+                await release.wait()
+
+        holder = asyncio.ensure_future(hold())
+        queued = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+
+        with pytest.raises(HTTPException) as exc:
+            await controller.acquire()
+
+        assert exc.value.status_code == 503
+        assert int(exc.value.headers["Retry-After"]) >= 1
+        assert controller.stats()["rejected"] == 1
+        release.set()
+        await asyncio.gather(holder, queued)
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout(self):
+        """Test a queued request gives up with 503 after the queue timeout."""
+        controller = _controller(queue_timeout=0.05)
+        await controller.acquire()
+
+        with pytest.raises(HTTPException) as exc:
+            await controller.acquire()
+
+        assert exc.value.status_code == 503
+        assert controller.stats()["timed_out"] == 1
+        assert controller.queue_depth == 0
+        controller.release()
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_fifo_order(self):
+        """Test waiters are admitted in arrival order."""
+        controller = _controller(max_queue=5)
+        order = []
+        await controller.acquire()
+
+        async def wait(i):
+            async with controller.slot():
+                order.append(i)
+
+        tasks = [asyncio.ensure_future(wait(i)) for i in range(3)]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*tasks)
+
+        assert order == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_patient_waiters_bypass_queue_limit(self):
+        """Test patient (background) waiters neither count against nor hit the queue cap."""
+        controller = _controller(max_queue=0, queue_timeout=0.01)
+        await controller.acquire()
+
+        patient = asyncio.ensure_future(controller.acquire(patient=True))
+        await asyncio.sleep(0.05)
+        assert not patient.done()
+
+        controller.release()
+        await patient
+        assert controller.active == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test a cancelled waiter doesn't hold a queue position or leak a slot."""
+        controller = _controller()
+        await controller.acquire()
+        waiter = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert controller.queue_depth == 0
+        controller.release()
+        assert controller.active == 0
+
+    @pytest.mark.asyncio
+    async def test_wait_histogram(self):
+        """Test wait times land in cumulative histogram buckets."""
+        controller = _controller()
+        async with controller.slot():
+            pass
+
+        wait = controller.stats()["wait_seconds"]
+        assert wait["count"] == 1
+        assert wait["buckets"]["0.01"] == 1
+        assert wait["buckets"]["+Inf"] == 1
@@ -37,6 +37,26 @@ class TestHealthEndpoint:
         assert "version" in data
 
 
+class TestMetricsEndpoint:
+    """Tests for the metrics endpoint."""
+
+    def test_requires_admin(self, client):
+        """Test metrics are only served to admins."""
+        from api.auth import verify_supabase_token
+
+        assert client.get("/api/metrics").status_code in (401, 403)
+
+        client.app.dependency_overrides[verify_supabase_token] = lambda: {
+            "id": "admin-1", "app_metadata": {"role": "admin"}
+        }
+        try:
+            response = client.get("/api/metrics")
+        finally:
+            client.app.dependency_overrides.clear()
+        assert response.status_code == 200
+        assert "rate_limit" in response.json()
+
+
 class TestTripPlannerEndpoint:
     """Tests for trip planner API endpoint."""
 
@@ -0,0 +1,313 @@
+"""
+Tests for Supabase token verification.
+"""
+import time
+import pytest
+import jwt
+from unittest.mock import AsyncMock, patch
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+TEST_SECRET = "test-jwt-secret-with-enough-length-for-hs256"
+
+
+def make_token(secret=TEST_SECRET, algorithm="HS256", headers=None, **overrides):
+    """Build a Supabase-style access token."""
+    claims = {
+        "sub": "user-123",
+        "email": "user@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "exp": int(time.time()) + 3600,
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, secret, algorithm=algorithm, headers=headers)
+
+
+def bearer(token):
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.fixture
+def local_auth():
+    """Configure auth for local verification with a shared secret."""
+    from api.token_cache import token_cache
+
+    token_cache.clear()
+    with patch("api.auth.SUPABASE_URL", "https://example.supabase.co"), \
+         patch("api.auth.SUPABASE_JWT_SECRET", TEST_SECRET), \
+         patch("api.auth.AUTH_LOCAL_VERIFY", True):
+        yield
+    token_cache.clear()
+
+
+class TestLocalVerification:
+    """Tests for in-process JWT verification."""
+
+    @pytest.mark.asyncio
+    async def test_valid_token(self, local_auth):
+        """Test a valid HS256 token is accepted without a remote call."""
+        from api.auth import verify_supabase_token
+
+        with patch("api.auth.verify_token_remotely") as mock_remote:
+            claims = await verify_supabase_token(bearer(make_token()))
+
+        assert claims["sub"] == "user-123"
+        mock_remote.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_expired_token(self, local_auth):
+        """Test expired tokens are rejected."""
+        from api.auth import verify_supabase_token
+
+        token = make_token(exp=int(time.time()) - 60)
+        with pytest.raises(HTTPException) as exc:
+            await verify_supabase_token(bearer(token))
+        assert exc.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_wrong_audience(self, local_auth):
+        """Test tokens for another audience are rejected."""
+        from api.auth import verify_supabase_token
+
+        with pytest.raises(HTTPException) as exc:
+            await verify_supabase_token(bearer(make_token(aud="anon")))
+        assert exc.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_forged_signature(self, local_auth):
+        """Test tokens signed with another secret are rejected."""
+        from api.auth import verify_supabase_token
+
+        token = make_token(secret="some-other-secret-that-is-long-enough")
+        with pytest.raises(HTTPException) as exc:
+            await verify_supabase_token(bearer(token))
+        assert exc.value.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_missing_credentials(self, local_auth):
+        """Test missing authorization header is rejected."""
+        from api.auth import verify_supabase_token
+
+        with pytest.raises(HTTPException) as exc:
+            await verify_supabase_token(None)
+        assert exc.value.status_code == 401
+
+    def test_placeholder_secret_refused(self):
+        """Test the .env.example placeholder secret stops the server from starting."""
+        from api.auth import check_jwt_secret
+
+        with pytest.raises(RuntimeError):
+            check_jwt_secret("your-jwt-secret")
+        check_jwt_secret("")
+        check_jwt_secret(TEST_SECRET)
+
+
+class TestJWKSVerification:
+    """Tests for asymmetric tokens verified against the cached JWKS."""
+
+    @pytest.fixture
+    def rsa_key(self):
+        return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    @pytest.fixture
+    def jwks(self, rsa_key):
+        public_jwk = jwt.algorithms.RSAAlgorithm.to_jwk(
+            rsa_key.public_key(), as_dict=True
+        )
+        public_jwk.update({"kid": "key-1", "alg": "RS256", "use": "sig"})
+        return {"keys": [public_jwk]}
+
+    @pytest.mark.asyncio
+    async def test_known_kid(self, local_auth, rsa_key, jwks):
+        """Test RS256 tokens with a cached kid verify locally."""
+        from api.auth import jwks_cache, verify_supabase_token
+
+        jwks_cache.load(jwks)
+        token = make_token(rsa_key, algorithm="RS256", headers={"kid": "key-1"})
+
+        with patch("api.auth.verify_token_remotely") as mock_remote:
+            claims = await verify_supabase_token(bearer(token))
+
+        assert claims["sub"] == "user-123"
+        mock_remote.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unknown_kid_falls_back_to_remote(self, local_auth, rsa_key, jwks):
+        """Test unknown kids are verified through the Supabase Auth API."""
+        from api.auth import jwks_cache, verify_supabase_token
+
+        jwks_cache.load(jwks)
+        token = make_token(rsa_key, algorithm="RS256", headers={"kid": "rotated"})
+
+        with patch("api.auth.verify_token_remotely", new=AsyncMock(
+            return_value={"id": "user-123"}
+        )) as mock_remote, patch.object(jwks_cache, "request_refresh") as mock_refresh:
+            user = await verify_supabase_token(bearer(token))
+
+        assert user["id"] == "user-123"
+        mock_remote.assert_awaited_once_with(token)
+        mock_refresh.assert_called_once()
+
+    def test_jwks_skips_unusable_keys(self, jwks):
+        """Test malformed JWKs are skipped rather than failing the refresh."""
+        from api.auth import JWKSCache
+
+        cache = JWKSCache("https://example.supabase.co/jwks")
+        cache.load({"keys": jwks["keys"] + [{"kid": "broken", "kty": "RSA"}]})
+
+        assert cache.get("key-1") is not None
+        assert cache.get("broken") is None
+
+
+class TestTokenCache:
+    """Tests for the verified-token cache."""
+
+    def test_hit_and_miss(self):
+        """Test cached payloads are returned and counted."""
+        from api.token_cache import TokenCache
+
+        cache = TokenCache()
+        token = make_token()
+
+        assert cache.get(token) == (False, None)
+        cache.put(token, {"sub": "user-123"})
+        assert cache.get(token) == (True, {"sub": "user-123"})
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_negative_entry(self):
+        """Test rejected tokens are cached as negative results."""
+        from api.token_cache import TokenCache
+
+        cache = TokenCache()
+        cache.put_invalid("garbage")
+
+        assert cache.get("garbage") == (True, None)
+        assert cache.stats()["negative_hits"] == 1
+
+    def test_expires_at_token_exp(self):
+        """Test entries don't outlive the token's exp claim."""
+        from api.token_cache import TokenCache
+
+        cache = TokenCache(ttl=3600)
+        token = make_token(exp=int(time.time()) + 1)
+        cache.put(token, {"sub": "user-123"})
+
+        with patch("api.token_cache.time.time", return_value=time.time() + 5):
+            assert cache.get(token) == (False, None)
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted at capacity."""
+        from api.token_cache import TokenCache
+
+        cache = TokenCache(max_entries=2)
+        cache.put("a", {"sub": "a"})
+        cache.put("b", {"sub": "b"})
+        cache.get("a")
+        cache.put("c", {"sub": "c"})
+
+        assert cache.get("b") == (False, None)
+        assert cache.get("a")[0] is True
+        assert cache.stats()["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_repeat_verification_uses_cache(self, local_auth):
+        """Test a token is only verified once per cache lifetime."""
+        from api import auth
+
+        token = make_token()
+        with patch("api.auth.verify_token_locally", wraps=auth.verify_token_locally) as spy:
+            await auth.verify_supabase_token(bearer(token))
+            await auth.verify_supabase_token(bearer(token))
+
+        assert spy.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_rejection_is_cached(self, local_auth):
+        """Test an invalid token is rejected from cache on retry."""
+        from api import auth
+
+        token = make_token(aud="anon")
+        with patch("api.auth.verify_token_locally", wraps=auth.verify_token_locally) as spy:
+            for _ in range(2):
+                with pytest.raises(HTTPException):
+                    await auth.verify_supabase_token(bearer(token))
+
+        assert spy.call_count == 1
+
+
+class TestVerifyUser:
+    """Tests for the optional-auth verify_user dependency."""
+
+    @pytest.fixture
+    def remote_auth(self):
+        from api.circuit_breaker import CircuitBreaker
+        from api.token_cache import token_cache
+
+        token_cache.clear()
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+        with patch("api.dependencies.SUPABASE_URL", "https://example.supabase.co"), \
+             patch("api.dependencies.SUPABASE_SERVICE_KEY", "service-key"), \
+             patch("api.auth.auth_breaker", breaker):
+            yield breaker
+        token_cache.clear()
+
+    def _client(self, *responses):
+        import httpx
+
+        client = AsyncMock()
+        client.get = AsyncMock(side_effect=[
+            r if isinstance(r, Exception) else httpx.Response(r[0], json=r[1]) for r in responses
+        ])
+        return client
+
+    @pytest.mark.asyncio
+    async def test_upstream_errors_are_503_and_not_cached(self, remote_auth):
+        """Test a Supabase outage doesn't mark a valid token invalid."""
+        import httpx
+        from api.dependencies import verify_user
+
+        client = self._client(
+            (502, {}), httpx.ConnectError("refused"), (200, {"id": "user-123"})
+        )
+        with patch("api.dependencies.get_http_client", return_value=client):
+            for _ in range(2):
+                with pytest.raises(HTTPException) as exc:
+                    await verify_user("Bearer good-token")
+                assert exc.value.status_code == 503
+            assert await verify_user("Bearer good-token") == "user-123"
+
+    @pytest.mark.asyncio
+    async def test_rejection_is_cached(self, remote_auth):
+        """Test 401/403 from Supabase is cached as an invalid token."""
+        from api.dependencies import verify_user
+
+        client = self._client((403, {"msg": "bad jwt"}))
+        with patch("api.dependencies.get_http_client", return_value=client):
+            for _ in range(2):
+                with pytest.raises(HTTPException) as exc:
+                    await verify_user("Bearer bad-token")
+                assert exc.value.status_code == 401
+
+        assert client.get.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_open_breaker_fails_fast(self, remote_auth):
+        """Test an outage opens the shared auth breaker and later calls skip Supabase."""
+        import httpx
+        from api.dependencies import verify_user
+
+        client = self._client(*[httpx.ConnectError("refused")] * 3)
+        with patch("api.dependencies.get_http_client", return_value=client):
+            for n in range(4):
+                with pytest.raises(HTTPException) as exc:
+                    await verify_user(f"Bearer token-{n}")
+                assert exc.value.status_code == 503
+
+        assert remote_auth.state == "open"
+        assert client.get.await_count == 3
+        assert "Retry-After" in exc.value.headers
@@ -0,0 +1,176 @@
+"""
+Tests for deadline- and disconnect-aware cancellation of agent runs.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+
+
+class TestRequestTimeout:
+    """Tests for request_timeout."""
+
+    def test_header_shortens_deadline(self, raw_request):
+        from api.cancellation import request_timeout
+
+        assert request_timeout(raw_request({"X-Request-Timeout": "5"}), "support") == 5.0
+
+    def test_header_cannot_extend_deadline(self, raw_request):
+        from api.cancellation import DEADLINES, request_timeout
+
+        request = raw_request({"X-Request-Timeout": "99999"})
+        assert request_timeout(request, "support") == DEADLINES["support"]
+
+    def test_malformed_header_uses_default(self, raw_request):
+        from api.cancellation import DEADLINES, request_timeout
+
+        for value in ("soon", "-1", "0"):
+            request = raw_request({"X-Request-Timeout": value})
+            assert request_timeout(request, "trip_planner") == DEADLINES["trip_planner"]
+
+
+class TestRunCancellable:
+    """Tests for run_cancellable."""
+
+    @pytest.mark.asyncio
+    async def test_returns_result(self, raw_request):
+        """Test a run that finishes in time returns its result."""
+        from api.cancellation import run_cancellable
+
+        async def work():
+            return "done"
+
+        assert await run_cancellable(raw_request(), "support", work) == "done"
+
+    @pytest.mark.asyncio
+    async def test_propagates_errors(self, raw_request):
+        """Test the run's own exception reaches the caller."""
+        from api.cancellation import run_cancellable
+
+        async def work():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await run_cancellable(raw_request(), "support", work)
+
+    @pytest.mark.asyncio
+    async def test_deadline_cancels_run(self, raw_request):
+        """Test the run is cancelled with 504 once the deadline passes."""
+        from api.cancellation import cancellations, run_cancellable
+
+        cancelled = asyncio.Event()
+        before = cancellations.counts["support"]["deadline"]
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with pytest.raises(HTTPException) as exc:
+            await run_cancellable(raw_request(), "support", work, timeout=0.05)
+
+        assert exc.value.status_code == 504
+        assert cancelled.is_set()
+        assert cancellations.counts["support"]["deadline"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_disconnect_cancels_run(self, raw_request):
+        """Test the run is cancelled when the client goes away."""
+        from api.cancellation import cancellations, run_cancellable
+
+        cancelled = asyncio.Event()
+        before = cancellations.counts["trip_planner"]["disconnect"]
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with patch("api.cancellation.DISCONNECT_POLL_SECONDS", 0.01):
+            with pytest.raises(HTTPException) as exc:
+                await run_cancellable(raw_request(disconnected=True), "trip_planner", work)
+
+        assert exc.value.status_code == 499
+        assert cancelled.is_set()
+        assert cancellations.counts["trip_planner"]["disconnect"] == before + 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_run_releases_slots_and_keeps_charge(self, raw_request):
+        """Test cancelling a started support run frees its slot but stays charged."""
+        from api.admission import support_admission
+        from api.quota import estimate_tokens, token_quota
+        from api.routes import ChatMessage, chat_support
+
+        async def slow_answer(**kwargs):
+            await asyncio.sleep(10)
+
+        request = ChatMessage(message="Can you explain the baggage allowance for my trip?")
+        raw = raw_request({"X-Request-Timeout": "0.05"})
+        used_before = token_quota.get_remaining("user:u-cancel")["day"]["used"]
+
+        with patch("api.routes.answer_question", side_effect=slow_answer), \
+             patch("api.routes.get_client_key", return_value="user:u-cancel"), \
+             patch("api.routes.ai_limiter.check", new_callable=AsyncMock):
+            with pytest.raises(HTTPException) as exc:
+                await chat_support(request, raw, user_id="u-cancel", tier="free")
+
+        assert exc.value.status_code == 504
+        assert support_admission.active == 0
+        # The model call had started, so the tokens it spent upstream still count
+        estimate = estimate_tokens("support", message=request.message)
+        assert token_quota.get_remaining("user:u-cancel")["day"]["used"] == used_before + estimate
+
+    @pytest.mark.asyncio
+    async def test_stream_deadline_closes_planner_stream(self):
+        """Test a streaming plan past its deadline ends with an error event."""
+        from api.quota import Reservation
+        from api.routes import _stream_trip_plan
+
+        closed = asyncio.Event()
+
+        async def events():
+            try:
+                yield {"event": "stage", "data": {"stage": "Researcher"}}
+                await asyncio.sleep(10)
+                yield {"event": "summary", "data": {}}
+            finally:
+                closed.set()
+
+        chunks = [
+            chunk async for chunk in _stream_trip_plan(
+                events(), Reservation("user:u-stream", 0, 100), "u-stream", "free", 0.05
+            )
+        ]
+
+        assert chunks[0].startswith("event: stage")
+        assert chunks[-1].startswith("event: error")
+        assert '"status_code": 504' in chunks[-1]
+        assert closed.is_set()
+
+    @pytest.mark.asyncio
+    async def test_stream_never_started_refunds_reservation(self):
+        """Test a stream whose client is gone before the body starts is refunded."""
+        from api.quota import token_quota
+        from api.routes import _ReservedStreamingResponse, _stream_trip_plan
+
+        async def events():
+            yield {"event": "summary", "data": {}}
+
+        used_before = token_quota.get_remaining("user:u-gone")["day"]["used"]
+        reservation = token_quota.reserve("user:u-gone", 500)
+        response = _ReservedStreamingResponse(
+            _stream_trip_plan(events(), reservation, "u-gone", "free", 5), reservation
+        )
+
+        async def send(message):
+            raise OSError("client gone")
+
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        with pytest.raises(Exception):
+            await response(scope, None, send)
+
+        assert token_quota.get_remaining("user:u-gone")["day"]["used"] == used_before
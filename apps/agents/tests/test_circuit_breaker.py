@@ -0,0 +1,155 @@
+"""
+Tests for the circuit breaker and auth grace mode.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+
+async def failing():
+    raise ConnectionError("upstream down")
+
+
+async def succeeding():
+    return "ok"
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    @pytest.mark.asyncio
+    async def test_opens_after_threshold(self):
+        """Test consecutive failures open the circuit and calls fail fast."""
+        from api.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+        breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=60)
+        for _ in range(3):
+            with pytest.raises(ConnectionError):
+                await breaker.call(failing)
+
+        assert breaker.state == "open"
+        fn = AsyncMock()
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(fn)
+        fn.assert_not_called()
+        assert breaker.stats()["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_success_resets_failures(self):
+        """Test a success in between keeps the circuit closed."""
+        from api.circuit_breaker import CircuitBreaker
+
+        breaker = CircuitBreaker("test", failure_threshold=2)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        await breaker.call(succeeding)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes(self):
+        """Test a successful probe after the recovery timeout closes the circuit."""
+        from api.circuit_breaker import CircuitBreaker
+
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        await asyncio.sleep(0.02)
+
+        assert breaker.state == "half_open"
+        assert await breaker.call(succeeding) == "ok"
+        assert breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_failure_reopens(self):
+        """Test a failed probe opens the circuit again."""
+        from api.circuit_breaker import CircuitBreaker
+
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0.01)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+        await asyncio.sleep(0.02)
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing)
+
+        assert breaker.state == "open"
+
+    @pytest.mark.asyncio
+    async def test_ignored_exceptions_do_not_trip(self):
+        """Test exceptions classified as non-failures don't count."""
+        from api.circuit_breaker import CircuitBreaker
+
+        breaker = CircuitBreaker("test", failure_threshold=1)
+        with pytest.raises(ValueError):
+            await breaker.call(AsyncMock(side_effect=ValueError), is_failure=lambda e: False)
+
+        assert breaker.state == "closed"
+
+
+class TestAuthGraceMode:
+    """Tests for serving recently verified tokens while Supabase is down."""
+
+    @pytest.fixture
+    def remote_auth(self):
+        from api import auth
+        from api.circuit_breaker import CircuitBreaker
+        from api.token_cache import TokenCache
+
+        cache = TokenCache(ttl=0.01, grace=60)
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=60)
+        with patch("api.auth.SUPABASE_URL", "https://example.supabase.co"), \
+             patch("api.auth.AUTH_LOCAL_VERIFY", False), \
+             patch("api.auth.token_cache", cache), \
+             patch("api.auth.auth_breaker", breaker):
+            yield auth, breaker
+
+    @pytest.mark.asyncio
+    async def test_stale_token_served_during_outage(self, remote_auth):
+        """Test a previously verified token keeps working when upstream fails."""
+        auth, breaker = remote_auth
+        creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="session-token")
+
+        with patch("api.auth.verify_token_remotely", new=AsyncMock(
+            return_value={"id": "user-123"}
+        )):
+            await auth.verify_supabase_token(creds)
+
+        await asyncio.sleep(0.02)  # cache TTL elapsed
+        outage = HTTPException(status_code=503, detail="Authentication service unavailable")
+        with patch("api.auth.verify_token_remotely", new=AsyncMock(side_effect=outage)):
+            user = await auth.verify_supabase_token(creds)
+
+        assert user["id"] == "user-123"
+        assert breaker.state == "open"
+
+    @pytest.mark.asyncio
+    async def test_unknown_token_fails_fast_when_open(self, remote_auth):
+        """Test new tokens get a fast 503 with Retry-After while the circuit is open."""
+        auth, breaker = remote_auth
+        breaker.record_failure()
+        creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="new-token")
+
+        with patch("api.auth.verify_token_remotely") as mock_remote:
+            with pytest.raises(HTTPException) as exc:
+                await auth.verify_supabase_token(creds)
+
+        assert exc.value.status_code == 503
+        assert "Retry-After" in exc.value.headers
+        mock_remote.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejected_token_does_not_trip_breaker(self, remote_auth):
+        """Test 401s from Supabase are not counted as outages."""
+        auth, breaker = remote_auth
+        creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials="bad-token")
+        rejected = HTTPException(status_code=401, detail="Invalid or expired token")
+
+        with patch("api.auth.verify_token_remotely", new=AsyncMock(side_effect=rejected)):
+            with pytest.raises(HTTPException):
+                await auth.verify_supabase_token(creds)
+
+        assert breaker.state == "closed"
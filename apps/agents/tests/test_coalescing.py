@@ -0,0 +1,131 @@
+"""
+Tests for coalescing concurrent identical trip-plan requests.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+def _request(**overrides):
+    from api.routes import TripPlanRequest
+
+    params = {"destination": "Bali", "duration_days": 5, "budget": 2000, "interests": ["food"]}
+    params.update(overrides)
+    return TripPlanRequest(**params)
+
+
+class TestTripPlanCoalescing:
+    """Tests for sharing one agent run between identical requests."""
+
+    @pytest.mark.asyncio
+    async def test_identical_concurrent_requests_share_one_run(self):
+        """Test equivalent concurrent requests trigger a single team run."""
+        release = asyncio.Event()
+
+        async def slow_run(prompt):
+            await release.wait()
+            return MagicMock(content="Shared plan")
+
+        with patch("agents.trip_planner.trip_planner_team") as mock_team:
+            mock_team.arun = AsyncMock(side_effect=slow_run)
+
+            from api.routes import _plan_trip
+
+            tasks = [
+                asyncio.ensure_future(_plan_trip(
+                    _request(interests=["food", "temples"]), "u1"
+                )),
+                asyncio.ensure_future(_plan_trip(
+                    _request(destination="bali", budget=2000.0, interests=["Temples", "Food"]), "u2"
+                )),
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            first, second = await asyncio.gather(*tasks)
+
+        assert mock_team.arun.call_count == 1
+        assert first["plan"] == second["plan"] == "Shared plan"
+        # Each caller still gets its own spelling echoed back
+        assert second["destination"] == "bali"
+
+    @pytest.mark.asyncio
+    async def test_different_requests_run_separately(self):
+        """Test requests with different fingerprints are not coalesced."""
+        with patch("api.routes.plan_trip", AsyncMock(return_value={"plan": "p"})) as mock_plan:
+            from api.routes import _plan_trip
+
+            await asyncio.gather(
+                _plan_trip(_request(duration_days=5), "u1"),
+                _plan_trip(_request(duration_days=6), "u1"),
+                _plan_trip(_request(budget=2050), "u1"),
+            )
+
+        assert mock_plan.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_followers_are_not_charged_tokens(self):
+        """Test only the request that ran the team records token usage."""
+        from agents.usage import track_usage
+
+        release = asyncio.Event()
+
+        async def slow_run(prompt):
+            await release.wait()
+            return MagicMock(content="Plan", metrics={"total_tokens": 900})
+
+        async def tracked():
+            from api.routes import _plan_trip
+
+            with track_usage() as usage:
+                await _plan_trip(_request(destination="Rome"), "u1")
+            return usage
+
+        with patch("agents.trip_planner.trip_planner_team") as mock_team:
+            mock_team.arun = AsyncMock(side_effect=slow_run)
+            tasks = [asyncio.ensure_future(tracked()) for _ in range(2)]
+            await asyncio.sleep(0)
+            release.set()
+            leader, follower = await asyncio.gather(*tasks)
+
+        assert leader.total_tokens == 900
+        assert follower.recorded and follower.total_tokens == 0
+
+    @pytest.mark.asyncio
+    async def test_follower_pays_when_leader_leaves_before_run(self):
+        """Test a run started after its leader was cancelled is charged to a follower."""
+        from contextlib import asynccontextmanager
+        from agents.usage import track_usage
+        from api.scheduler import llm_scheduler
+
+        admitted = asyncio.Event()
+
+        @asynccontextmanager
+        async def gated_slot(*args):
+            await admitted.wait()
+            yield
+
+        async def tracked():
+            from api.routes import _plan_trip
+
+            with track_usage() as usage:
+                await _plan_trip(_request(destination="Lisbon"), "u1")
+            return usage
+
+        with patch("agents.trip_planner.trip_planner_team") as mock_team, \
+                patch.object(llm_scheduler, "slot", gated_slot):
+            mock_team.arun = AsyncMock(
+                return_value=MagicMock(content="Plan", metrics={"total_tokens": 900})
+            )
+            leader = asyncio.ensure_future(tracked())
+            followers = [asyncio.ensure_future(tracked()) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0)
+            admitted.set()
+            first, second = await asyncio.gather(*followers)
+
+        assert leader.cancelled()
+        assert mock_team.arun.call_count == 1
+        # Exactly one follower takes over the run's tokens
+        assert sorted([first.total_tokens, second.total_tokens]) == [0, 900]
+        assert first.recorded and second.recorded
@@ -0,0 +1,40 @@
+"""
+Tests for request fingerprints.
+"""
+
+
+class TestRequestFingerprint:
+    """Tests for request_fingerprint and its normalizers."""
+
+    def test_equivalent_requests_match(self):
+        """Test casing, punctuation and list order don't change the fingerprint."""
+        from agents.fingerprint import request_fingerprint
+
+        a = request_fingerprint(
+            "trip_plan", destination="Bali, Indonesia", interests=["Food", "temples"]
+        )
+        b = request_fingerprint(
+            "trip_plan", destination="  bali indonesia", interests=["temples", "food", "FOOD"]
+        )
+
+        assert a == b
+
+    def test_different_requests_differ(self):
+        """Test meaningful differences and request kinds produce new fingerprints."""
+        from agents.fingerprint import request_fingerprint
+
+        base = request_fingerprint("trip_plan", destination="Bali", duration_days=5)
+
+        assert base != request_fingerprint("trip_plan", destination="Bali", duration_days=6)
+        assert base != request_fingerprint("trip_plan", destination="Lombok", duration_days=5)
+        assert base != request_fingerprint("recommend", destination="Bali", duration_days=5)
+
+    def test_budgets_match_exactly(self):
+        """Test budgets only match when they are the same amount."""
+        from agents.trip_planner import trip_plan_fingerprint
+
+        base = trip_plan_fingerprint("Bali", 5, budget=2000)
+
+        assert base == trip_plan_fingerprint("Bali", 5, budget=2000.0)
+        assert base != trip_plan_fingerprint("Bali", 5, budget=2050)
+        assert base != trip_plan_fingerprint("Bali", 5)
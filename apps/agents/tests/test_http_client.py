@@ -0,0 +1,58 @@
+"""
+Tests for the shared HTTP client.
+"""
+import pytest
+import httpx
+import respx
+
+
+class TestSharedHttpClient:
+    """Tests for the app-scoped httpx client lifecycle."""
+
+    @pytest.mark.asyncio
+    async def test_client_is_reused(self):
+        """Test every caller gets the same pooled client."""
+        from api.http_client import start_http_client, get_http_client, close_http_client
+
+        client = await start_http_client()
+        try:
+            assert get_http_client() is client
+            assert get_http_client() is client
+        finally:
+            await close_http_client()
+
+        assert client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_client_configuration(self):
+        """Test per-phase timeouts are applied."""
+        from api import http_client
+
+        client = http_client.create_http_client()
+        try:
+            assert client.timeout.connect == http_client.HTTP_CONNECT_TIMEOUT
+            assert client.timeout.read == http_client.HTTP_READ_TIMEOUT
+            assert client.timeout.pool == http_client.HTTP_POOL_TIMEOUT
+        finally:
+            await client.aclose()
+
+    @pytest.mark.asyncio
+    async def test_remote_verification_uses_shared_client(self):
+        """Test Supabase calls go through the shared client."""
+        from unittest.mock import patch
+        from api import auth
+        from api.http_client import start_http_client, close_http_client
+
+        await start_http_client()
+        try:
+            with patch("api.auth.SUPABASE_URL", "https://example.supabase.co"), \
+                 respx.mock:
+                route = respx.get("https://example.supabase.co/auth/v1/user").mock(
+                    return_value=httpx.Response(200, json={"id": "user-123"})
+                )
+                user = await auth.verify_token_remotely("token")
+
+            assert user["id"] == "user-123"
+            assert route.called
+        finally:
+            await close_http_client()
@@ -0,0 +1,112 @@
+"""
+Tests for the compiled quick-response intent matcher.
+"""
+import json
+import pytest
+
+
+def _matcher(intents):
+    from agents.intents import IntentMatcher, load_intents
+
+    return IntentMatcher(load_intents(intents))
+
+
+class TestIntentMatcher:
+    """Tests for IntentMatcher."""
+
+    def test_whole_word_matching(self):
+        """Test keywords don't match inside other words."""
+        matcher = _matcher({"contact": {"keywords": ["call"], "response": "Call us"}})
+
+        assert matcher.match("Can I call you?").name == "contact"
+        assert matcher.match("Is there a product recall?") is None
+        assert matcher.match("Callbacks please") is None
+
+    def test_prefix_keywords(self):
+        """Test `word*` matches any word starting with it."""
+        matcher = _matcher({"cancel": {"keywords": ["cancel*"], "response": "Policy"}})
+
+        for message in ("cancel my trip", "Cancellation fees?", "I CANCELLED it"):
+            assert matcher.match(message).name == "cancel"
+        assert matcher.match("can I go?") is None
+
+    def test_phrases(self):
+        """Test multi-word keywords need their words in a row."""
+        matcher = _matcher({
+            "change": {"keywords": ["change booking", "change my book*"], "response": "x"},
+        })
+
+        assert matcher.match("How do I change booking dates?") is not None
+        assert matcher.match("Can I change my bookings?") is not None
+        assert matcher.match("Change the date of my booking") is None
+
+    def test_priority_and_declaration_order(self):
+        """Test the highest priority wins, then the first declared intent."""
+        matcher = _matcher({
+            "contact": {"keywords": ["email"], "response": "contact", "priority": 1},
+            "refund": {"keywords": ["refund"], "response": "refund", "priority": 5},
+            "billing": {"keywords": ["refund"], "response": "billing", "priority": 5},
+        })
+
+        assert matcher.match("email me my refund").name == "refund"
+        assert [i.name for i in matcher.match_all("email me my refund")] == [
+            "refund", "billing", "contact",
+        ]
+
+    def test_negative_keywords(self):
+        """Test a negative keyword vetoes only its own intent."""
+        matcher = _matcher({
+            "contact": {
+                "keywords": ["contact*"],
+                "negative": ["contact lens*"],
+                "response": "contact",
+            },
+            "packing": {"keywords": ["lens*"], "response": "packing"},
+        })
+
+        assert matcher.match("How do I contact you?").name == "contact"
+        assert matcher.match("Can I pack contact lens solution?").name == "packing"
+
+    def test_many_intents(self):
+        """Test matching stays correct with hundreds of intents loaded."""
+        intents = {
+            f"intent{i}": {"keywords": [f"topic{i}", f"area{i} faq*"], "response": str(i)}
+            for i in range(500)
+        }
+        matcher = _matcher(intents)
+
+        assert matcher.match("question about topic321").response == "321"
+        assert matcher.match("see area42 faqs").response == "42"
+        assert matcher.match("topic5000") is None
+
+    def test_load_from_file(self, tmp_path):
+        """Test intents load from a JSON data file."""
+        from agents.intents import load_intents
+
+        path = tmp_path / "intents.json"
+        path.write_text(json.dumps({"hi": {"keywords": ["hello"], "response": "Hi!"}}))
+
+        intents = load_intents(path)
+        assert intents[0].name == "hi"
+        assert intents[0].priority == 0
+        assert intents[0].negative == []
+
+    def test_rejects_empty_keyword(self):
+        with pytest.raises(ValueError):
+            _matcher({"bad": {"keywords": ["*"], "response": "x"}})
+
+
+class TestQuickResponseIntents:
+    """Tests for the shipped quick responses."""
+
+    def test_cancellation_beats_contact(self):
+        from agents.support_bot import QUICK_RESPONSES, get_quick_response
+
+        answer = get_quick_response("I want to cancel, who should I email?")
+        assert answer == QUICK_RESPONSES["cancellation"]["response"]
+
+    def test_no_substring_false_positives(self):
+        from agents.support_bot import get_quick_response
+
+        assert get_quick_response("Is there a recall on the rental scooters?") is None
+        assert get_quick_response("Can I bring contact lenses on the flight?") is None
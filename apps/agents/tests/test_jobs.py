@@ -0,0 +1,249 @@
+"""
+Tests for the background job manager.
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+
+async def _wait_for(manager, job_id, user_id, statuses, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await manager.get(job_id, user_id)
+        if job and job["status"] in statuses:
+            return job
+        assert asyncio.get_running_loop().time() < deadline, f"job stuck in {job and job['status']}"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "jobs.sqlite3")
+
+
+class TestJobManager:
+    """Tests for JobManager."""
+
+    @pytest.mark.asyncio
+    async def test_runs_job_and_stores_result(self, db_path):
+        """Test a submitted job runs and its result can be fetched."""
+        from api.jobs import JobManager
+
+        manager = JobManager(store_path=db_path, workers=1)
+
+        async def handler(params, user_id):
+            return {"plan": f"{params['destination']} for {user_id}"}
+
+        manager.register("trip_plan", handler)
+        await manager.start()
+        try:
+            job = await manager.submit("trip_plan", "u1", {"destination": "Bali"})
+            assert job["status"] == "queued"
+
+            done = await _wait_for(manager, job["id"], "u1", ("succeeded",))
+            assert done["result"] == {"plan": "Bali for u1"}
+            assert done["expires_at"] is not None
+            assert manager.stats()["succeeded"] == 1
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_records_failure(self, db_path):
+        """Test handler exceptions mark the job failed with the error."""
+        from api.jobs import JobManager
+
+        manager = JobManager(store_path=db_path, workers=1)
+
+        async def handler(params, user_id):
+            raise RuntimeError("model unavailable")
+
+        manager.register("trip_plan", handler)
+        await manager.start()
+        try:
+            job = await manager.submit("trip_plan", "u1", {})
+            failed = await _wait_for(manager, job["id"], "u1", ("failed",))
+            assert failed["error"] == "model unavailable"
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_job(self, db_path):
+        """Test cancelling a running job stops it and keeps the worker alive."""
+        from api.jobs import JobManager
+
+        manager = JobManager(store_path=db_path, workers=1)
+        started = asyncio.Event()
+
+        async def slow(params, user_id):
+            started.set()
+            await asyncio.sleep(30)
+
+        async def fast(params, user_id):
+            return "ok"
+
+        manager.register("slow", slow)
+        manager.register("fast", fast)
+        await manager.start()
+        try:
+            job = await manager.submit("slow", "u1", {})
+            await asyncio.wait_for(started.wait(), 1)
+
+            cancelled = await manager.cancel(job["id"], "u1")
+            assert cancelled["status"] == "cancelled"
+
+            # The single worker is free again
+            next_job = await manager.submit("fast", "u1", {})
+            await _wait_for(manager, next_job["id"], "u1", ("succeeded",))
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_cancel_through_another_worker(self, db_path):
+        """Test a job cancelled by a non-owner worker stops and stays cancelled."""
+        from api.jobs import JobManager
+
+        owner = JobManager(store_path=db_path, workers=1, cancel_poll=0.01)
+        other = JobManager(store_path=db_path, workers=1)
+        started = asyncio.Event()
+        stopped = asyncio.Event()
+
+        async def slow(params, user_id):
+            started.set()
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                stopped.set()
+                raise
+            return "done"
+
+        owner.register("slow", slow)
+        await owner.start()
+        try:
+            job = await owner.submit("slow", "u1", {})
+            await asyncio.wait_for(started.wait(), 1)
+
+            assert (await other.cancel(job["id"], "u1"))["status"] == "cancelled"
+
+            await asyncio.wait_for(stopped.wait(), 1)
+            await asyncio.sleep(0.05)
+            assert (await owner.get(job["id"], "u1"))["status"] == "cancelled"
+            assert owner.stats()["running"] == 0
+        finally:
+            await owner.stop()
+            other.store.close()
+
+    def test_cancelled_record_is_never_overwritten(self, db_path):
+        """Test a run finishing after a cancel can't replace the cancelled record."""
+        from api.jobs import CANCELLED, SUCCEEDED, JobStore
+
+        store = JobStore(db_path)
+        job = store.create("trip_plan", "u1", {})
+        store.start(job["id"], "1:owner")
+        assert store.finish(job["id"], CANCELLED, 60, None, "Cancelled by user")
+
+        assert not store.finish(job["id"], SUCCEEDED, 60, {"plan": "late"})
+        assert store.get(job["id"])["status"] == CANCELLED
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_jobs_are_private_to_their_owner(self, db_path):
+        """Test other users can neither see nor cancel a job."""
+        from api.jobs import JobManager
+
+        manager = JobManager(store_path=db_path, workers=0)
+        manager.register("trip_plan", lambda params, user_id: None)
+        await manager.start()
+        try:
+            job = await manager.submit("trip_plan", "u1", {})
+            assert await manager.get(job["id"], "u2") is None
+            assert await manager.cancel(job["id"], "u2") is None
+            assert (await manager.get(job["id"], "u1"))["status"] == "queued"
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_rejects_when_queue_full(self, db_path):
+        """Test submissions beyond max_queued get a 503."""
+        from api.jobs import JobManager
+
+        manager = JobManager(store_path=db_path, workers=0, max_queued=2)
+        manager.register("trip_plan", lambda params, user_id: None)
+        await manager.start()
+        try:
+            await manager.submit("trip_plan", "u1", {})
+            await manager.submit("trip_plan", "u1", {})
+            with pytest.raises(HTTPException) as exc:
+                await manager.submit("trip_plan", "u1", {})
+            assert exc.value.status_code == 503
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_resumes_queued_jobs_after_restart(self, db_path):
+        """Test jobs still queued at shutdown run after the next start."""
+        from api.jobs import JobManager
+
+        first = JobManager(store_path=db_path, workers=0)
+        first.register("trip_plan", lambda params, user_id: None)
+        await first.start()
+        job = await first.submit("trip_plan", "u1", {"destination": "Lisbon"})
+        await first.stop()
+
+        async def handler(params, user_id):
+            return params["destination"]
+
+        second = JobManager(store_path=db_path, workers=1)
+        second.register("trip_plan", handler)
+        await second.start()
+        try:
+            done = await _wait_for(second, job["id"], "u1", ("succeeded",))
+            assert done["result"] == "Lisbon"
+        finally:
+            await second.stop()
+
+    @pytest.mark.asyncio
+    async def test_restart_only_reaps_orphaned_jobs(self, db_path):
+        """Test startup fails jobs of dead owners but not those of live workers."""
+        import os
+        from api.jobs import JobManager, JobStore
+
+        store = JobStore(db_path)
+        orphaned = store.create("trip_plan", "u1", {})
+        elsewhere = store.create("trip_plan", "u1", {})
+        # An earlier start of this same pid, and a worker that is still alive
+        store.start(orphaned["id"], f"{os.getpid()}:previous")
+        store.start(elsewhere["id"], f"{os.getppid()}:live")
+        store.close()
+
+        manager = JobManager(store_path=db_path, workers=1)
+        manager.register("trip_plan", lambda params, user_id: None)
+        await manager.start()
+        try:
+            reaped = await manager.get(orphaned["id"], "u1")
+            assert reaped["status"] == "failed"
+            assert reaped["error"] == "Interrupted by server restart"
+            assert (await manager.get(elsewhere["id"], "u1"))["status"] == "running"
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_results_expire(self, db_path):
+        """Test finished jobs disappear after the result TTL."""
+        from api.jobs import JobManager
+
+        manager = JobManager(store_path=db_path, workers=1, result_ttl=0.05)
+
+        async def handler(params, user_id):
+            return "ok"
+
+        manager.register("trip_plan", handler)
+        await manager.start()
+        try:
+            job = await manager.submit("trip_plan", "u1", {})
+            await _wait_for(manager, job["id"], "u1", ("succeeded",))
+            await asyncio.sleep(0.1)
+
+            assert await manager.get(job["id"], "u1") is None
+            assert manager.store.purge_expired() == 1
+        finally:
+            await manager.stop()
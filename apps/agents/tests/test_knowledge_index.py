@@ -0,0 +1,155 @@
+"""
+Tests for knowledge sections and the BM25 direct-answer index.
+"""
+import pytest
+from unittest.mock import AsyncMock, patch
+
+FAQ = """# FAQ
+
+Intro text before any section.
+
+## Payments
+
+### Do you offer gift cards?
+Yes! Gift cards are available from $50 to $5,000.
+
+### Can I pay in installments?
+Trips over $1,000 can be paid over 3 or 6 months.
+
+## Drivers
+
+### Are drivers English-speaking?
+Most destinations have English-speaking drivers.
+
+### Payments
+Drivers accept cash tips.
+"""
+
+
+def _sections():
+    from agents.sections import split_sections
+
+    return split_sections(FAQ, "faq.md")
+
+
+class TestSplitSections:
+    """Tests for split_sections."""
+
+    def test_splits_at_headings(self):
+        sections = _sections()
+
+        assert [s.heading for s in sections] == [
+            "FAQ",
+            "Do you offer gift cards?",
+            "Can I pay in installments?",
+            "Are drivers English-speaking?",
+            "Payments",
+        ]
+        assert sections[1].body == "Yes! Gift cards are available from $50 to $5,000."
+        assert sections[1].level == 3
+
+    def test_ids_and_titles(self):
+        sections = _sections()
+
+        assert sections[1].id == "faq.md#do-you-offer-gift-cards"
+        assert sections[1].title == "Payments > Do you offer gift cards?"
+        # "## Payments" has no body of its own, so the id is still free
+        assert sections[-1].id == "faq.md#payments"
+
+    def test_repeated_headings_get_unique_ids(self):
+        from agents.sections import split_sections
+
+        sections = split_sections("### Tips\none\n### Tips\ntwo\n", "x.md")
+        assert [s.id for s in sections] == ["x.md#tips", "x.md#tips-2"]
+
+    def test_ignores_headings_in_code_blocks(self):
+        from agents.sections import split_sections
+
+        sections = split_sections("## Tips\n```\n# not a heading\n```\n", "x.md")
+        assert len(sections) == 1
+        assert "# not a heading" in sections[0].body
+
+
+class TestBM25Index:
+    """Tests for BM25Index."""
+
+    def test_ranks_matching_section_first(self):
+        from agents.bm25 import BM25Index
+
+        index = BM25Index(_sections())
+        hits = index.search("gift card")
+
+        assert hits[0][0].id == "faq.md#do-you-offer-gift-cards"
+        assert hits[0][2] == 1.0
+
+    def test_direct_answer_when_confident(self):
+        from agents.bm25 import BM25Index
+
+        index = BM25Index(_sections())
+        section, score = index.direct_answer("Do you offer gift cards?", min_score=1.0)
+
+        assert section.id == "faq.md#do-you-offer-gift-cards"
+        assert score > 1.0
+
+    def test_no_direct_answer_when_ambiguous(self):
+        from agents.bm25 import BM25Index
+
+        index = BM25Index(_sections())
+        # "payments" and "drivers" each appear in two sections
+        assert index.direct_answer("driver payments", min_score=0.1) is None
+
+    def test_no_direct_answer_for_unknown_terms(self):
+        from agents.bm25 import BM25Index
+
+        index = BM25Index(_sections())
+        assert index.direct_answer("Can I bring my dog?", min_score=0.1) is None
+        assert BM25Index([]).direct_answer("gift cards") is None
+
+    def test_shipped_faq(self):
+        """Test FAQ questions asked verbatim are answered from their section."""
+        from agents.support_bot import knowledge_index
+
+        section, _ = knowledge_index.direct_answer("Can I pay in installments?")
+        assert section.id == "faq.md#can-i-pay-in-installments"
+        assert knowledge_index.direct_answer("What's the status of my booking?") is None
+
+
+class TestDirectAnswers:
+    """Tests for direct knowledge answers in answer_question."""
+
+    @pytest.mark.asyncio
+    async def test_answers_without_agent(self, mock_user_id):
+        with patch("agents.support_bot.KNOWLEDGE_DIRECT_ANSWERS", True), \
+             patch("agents.support_bot.support_agent") as mock_agent:
+            mock_agent.arun = AsyncMock()
+
+            from agents.support_bot import answer_question
+            from agents.usage import track_usage
+
+            with track_usage() as usage:
+                result = await answer_question("Do you offer gift cards?", user_id=mock_user_id)
+
+        mock_agent.arun.assert_not_called()
+        assert result["direct_answer"] is True
+        assert result["sources_used"] is True
+        assert result["section_id"] == "faq.md#do-you-offer-gift-cards"
+        assert "Gift cards" in result["answer"]
+        # Charged nothing against the token quota
+        assert usage.recorded and usage.total_tokens == 0
+
+    @pytest.mark.asyncio
+    async def test_context_questions_use_agent(self, mock_user_id, mock_conversation_context):
+        with patch("agents.support_bot.KNOWLEDGE_DIRECT_ANSWERS", True), \
+             patch("agents.support_bot.support_agent") as mock_agent:
+            mock_agent.arun = AsyncMock(return_value=AsyncMock(content="From the agent"))
+
+            from agents.support_bot import answer_question
+
+            result = await answer_question(
+                "Do you offer gift cards?",
+                context=mock_conversation_context,
+                user_id=mock_user_id,
+            )
+
+        mock_agent.arun.assert_called_once()
+        assert "direct_answer" not in result
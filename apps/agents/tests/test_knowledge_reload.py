@@ -0,0 +1,175 @@
+"""
+Tests for hot reload of the knowledge directory.
+"""
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+def _touch_later(path):
+    """Bump a file's mtime without changing its content."""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+class TestKnowledgeWatcher:
+    """Tests for KnowledgeWatcher."""
+
+    @pytest.mark.asyncio
+    async def test_no_changes_no_reload(self, tmp_path):
+        from agents.knowledge_watcher import KnowledgeWatcher
+
+        (tmp_path / "faq.md").write_text("# FAQ\n")
+        on_change = AsyncMock()
+        watcher = KnowledgeWatcher(tmp_path, on_change=on_change)
+
+        _touch_later(tmp_path / "faq.md")
+        changes = await watcher.rescan()
+
+        assert not changes
+        on_change.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_reports_added_modified_removed(self, tmp_path):
+        from agents.knowledge_watcher import KnowledgeWatcher
+
+        (tmp_path / "faq.md").write_text("# FAQ\n")
+        (tmp_path / "old.md").write_text("# Old\n")
+        on_change = AsyncMock()
+        watcher = KnowledgeWatcher(tmp_path, on_change=on_change)
+
+        (tmp_path / "faq.md").write_text("# FAQ\n\nNew answer.\n")
+        (tmp_path / "old.md").unlink()
+        (tmp_path / "destinations").mkdir()
+        (tmp_path / "destinations" / "bali.md").write_text("# Bali\n")
+        changes = await watcher.rescan()
+
+        assert changes.to_dict() == {
+            "added": ["destinations/bali.md"],
+            "modified": ["faq.md"],
+            "removed": ["old.md"],
+        }
+        on_change.assert_awaited_once_with(changes)
+        assert watcher.stats()["reloads"] == 1
+
+        # Already applied
+        assert not await watcher.rescan()
+
+    @pytest.mark.asyncio
+    async def test_failed_reload_is_retried(self, tmp_path):
+        from agents.knowledge_watcher import KnowledgeWatcher
+
+        (tmp_path / "faq.md").write_text("# FAQ\n")
+        on_change = AsyncMock(side_effect=[RuntimeError("embedding down"), None])
+        watcher = KnowledgeWatcher(tmp_path, on_change=on_change)
+
+        (tmp_path / "faq.md").write_text("# FAQ\n\nEdited.\n")
+        with pytest.raises(RuntimeError):
+            await watcher.rescan()
+        changes = await watcher.rescan()
+
+        assert changes.modified == ["faq.md"]
+        assert on_change.await_count == 2
+        assert watcher.stats()["failures"] == 1
+
+
+class TestSectionReader:
+    """Tests for SectionReader."""
+
+    def test_only_changed_files_are_parsed(self, tmp_path):
+        from agents.sections import SectionReader
+
+        faq = tmp_path / "faq.md"
+        policies = tmp_path / "policies.md"
+        faq.write_text("# FAQ\n\n## Gift cards\n\nYes.\n")
+        policies.write_text("# Policies\n\n## Refunds\n\nWithin 30 days.\n")
+        reader = SectionReader(tmp_path)
+
+        reader.read([faq, policies])
+        faq.write_text("# FAQ\n\n## Gift cards\n\nYes, in any amount.\n")
+        sections = reader.read([faq, policies])
+
+        assert reader.parsed == 3
+        assert [s.id for s in sections] == ["faq.md#gift-cards", "policies.md#refunds"]
+        assert sections[0].body == "Yes, in any amount."
+
+
+class TestReloadKnowledge:
+    """Tests for SupportBot's reload_knowledge."""
+
+    @pytest.mark.asyncio
+    async def test_swaps_in_new_sections(self, tmp_path):
+        from agents import support_bot
+        from agents.embeddings import HashingEmbedder
+        from agents.sections import SectionReader
+        from agents.vector_index import VectorKnowledge
+
+        root = tmp_path / "knowledge"
+        root.mkdir()
+        (root / "faq.md").write_text("# FAQ\n\n## Gift cards\n\nGift cards never expire.\n")
+        reader = SectionReader(root)
+        knowledge = VectorKnowledge(
+            [], root=root, embedder=HashingEmbedder(), index_dir=str(tmp_path / "index"), reader=reader
+        )
+        answer_cache = MagicMock()
+
+        with patch.object(support_bot, "KNOWLEDGE_DIR", root), \
+             patch.object(support_bot, "knowledge", knowledge), \
+             patch.object(support_bot, "section_reader", reader), \
+             patch.object(support_bot, "answer_cache", answer_cache), \
+             patch.object(support_bot, "knowledge_sources", []), \
+             patch.object(support_bot, "knowledge_index", support_bot.knowledge_index), \
+             patch.object(support_bot, "quick_response_matcher", support_bot.quick_response_matcher):
+            await support_bot.reload_knowledge()
+            assert support_bot.knowledge_sources == [root / "faq.md"]
+            assert len(knowledge.index.sections) == 1
+
+            (root / "destinations").mkdir()
+            (root / "destinations" / "bali.md").write_text(
+                "# Bali\n\n## Best time to visit\n\nThe dry season runs from April to October.\n"
+            )
+            await support_bot.reload_knowledge()
+
+            ids = [s.id for s in support_bot.knowledge_index.sections]
+            assert ids == ["faq.md#gift-cards", "destinations/bali.md#best-time-to-visit"]
+            assert knowledge.index.embedded == 1
+            assert reader.parsed == 2
+            assert answer_cache.invalidate.call_count == 2
+
+
+class TestReloadEndpoint:
+    """Tests for POST /admin/knowledge/reload."""
+
+    def test_requires_admin(self):
+        from fastapi import HTTPException
+        from api.auth import require_admin
+
+        with pytest.raises(HTTPException) as exc_info:
+            require_admin({"id": "u1", "app_metadata": {"tier": "pro"}})
+        assert exc_info.value.status_code == 403
+        assert require_admin({"id": "u2", "app_metadata": {"role": "admin"}}) == "u2"
+
+    @pytest.mark.asyncio
+    async def test_reports_changes(self):
+        from agents.knowledge_watcher import KnowledgeChanges
+        from api.routes import reload_knowledge_base
+
+        changes = KnowledgeChanges(added=[], modified=["faq.md"], removed=[])
+        with patch("api.routes.knowledge_watcher") as watcher:
+            watcher.rescan = AsyncMock(return_value=changes)
+            response = await reload_knowledge_base(admin_id="admin")
+
+        assert response["data"]["reloaded"] is True
+        assert response["data"]["changes"]["modified"] == ["faq.md"]
+
+    @pytest.mark.asyncio
+    async def test_failure_is_500(self):
+        from fastapi import HTTPException
+        from api.routes import reload_knowledge_base
+
+        with patch("api.routes.knowledge_watcher") as watcher:
+            watcher.rescan = AsyncMock(side_effect=RuntimeError("embedding down"))
+            with pytest.raises(HTTPException) as exc_info:
+                await reload_knowledge_base(admin_id="admin")
+
+        assert exc_info.value.status_code == 500
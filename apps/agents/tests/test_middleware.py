@@ -0,0 +1,111 @@
+"""
+Tests for the pre-auth rate-limit middleware.
+"""
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def auth_calls():
+    return []
+
+
+@pytest.fixture
+def app(auth_calls):
+    """Small app with an auth dependency and a per-user limited route."""
+    from api.middleware import RateLimitMiddleware
+    from api.rate_limit import RateLimiter
+
+    edge = RateLimiter(requests_per_minute=3, requests_per_hour=100)
+    per_user = RateLimiter(requests_per_minute=2, requests_per_hour=100)
+
+    async def fake_auth(request: Request) -> str:
+        auth_calls.append(request.headers.get("Authorization"))
+        if not request.headers.get("Authorization"):
+            raise HTTPException(status_code=401, detail="Missing token")
+        return request.headers["Authorization"].split()[-1]
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=edge)
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @app.post("/api/chat")
+    async def chat(raw_request: Request, user_id: str = Depends(fake_auth)):
+        await per_user.check(f"user:{user_id}", raw_request)
+        return {"ok": True}
+
+    return app
+
+
+class TestRateLimitMiddleware:
+    """Tests for RateLimitMiddleware."""
+
+    def test_rejects_before_auth(self, app, auth_calls):
+        """Test requests over the edge limit never reach the auth dependency."""
+        client = TestClient(app)
+        for _ in range(3):
+            client.post("/api/chat")
+
+        response = client.post("/api/chat")
+
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+        assert response.headers["RateLimit-Remaining"] == "0"
+        assert len(auth_calls) == 3
+
+    def test_rotating_tokens_share_ip_budget(self, app, auth_calls):
+        """Test a fresh unverified token per request doesn't buy a fresh edge budget."""
+        client = TestClient(app)
+        for n in range(3):
+            client.post("/api/chat", headers={"Authorization": f"Bearer forged-{n}"})
+
+        response = client.post("/api/chat", headers={"Authorization": "Bearer forged-3"})
+
+        assert response.status_code == 429
+        assert len(auth_calls) == 3
+
+    def test_headers_report_tightest_limit(self, app):
+        """Test headers reflect the per-user limit when it is tighter than the edge limit."""
+        client = TestClient(app)
+        response = client.post("/api/chat", headers={"Authorization": "Bearer a"})
+
+        assert response.status_code == 200
+        assert response.headers["RateLimit-Limit"] == "2"
+        assert response.headers["RateLimit-Remaining"] == "1"
+        assert int(response.headers["RateLimit-Reset"]) > 0
+
+    def test_per_user_limit_still_applies(self, app):
+        """Test the route-level per-user limit is enforced after auth."""
+        client = TestClient(app)
+        client.post("/api/chat", headers={"Authorization": "Bearer a"})
+        client.post("/api/chat", headers={"Authorization": "Bearer a"})
+
+        # Third request fits the edge limit (3) but not the per-user limit (2)
+        response = client.post("/api/chat", headers={"Authorization": "Bearer a"})
+
+        assert response.status_code == 429
+        assert response.headers["RateLimit-Remaining"] == "0"
+
+    def test_spoofed_forwarded_for_shares_ip_budget(self, app, auth_calls):
+        """Test a made-up X-Forwarded-For from an untrusted peer doesn't buy a fresh edge budget."""
+        client = TestClient(app)
+        for n in range(3):
+            client.post("/api/chat", headers={"X-Forwarded-For": f"203.0.113.{n}"})
+
+        response = client.post("/api/chat", headers={"X-Forwarded-For": "203.0.113.3"})
+
+        assert response.status_code == 429
+        assert len(auth_calls) == 3
+
+    def test_health_is_exempt(self, app):
+        """Test liveness probes are never rate limited."""
+        client = TestClient(app)
+        for _ in range(5):
+            response = client.get("/api/health")
+
+        assert response.status_code == 200
+        assert "RateLimit-Limit" not in response.headers
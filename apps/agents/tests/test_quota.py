@@ -0,0 +1,197 @@
+"""
+Tests for token-weighted quotas and usage tracking.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import HTTPException
+
+
+class TestUsageTracking:
+    """Tests for agents.usage."""
+
+    def test_records_metrics_inside_tracker(self):
+        """Test token metrics are summed across responses, including list metrics."""
+        from agents.usage import record_usage, track_usage
+
+        with track_usage() as usage:
+            record_usage(MagicMock(metrics={"input_tokens": [100, 50], "output_tokens": [20, 30]}))
+            record_usage(MagicMock(metrics={"total_tokens": 40}))
+
+        assert usage.recorded
+        assert usage.input_tokens == 150
+        assert usage.output_tokens == 50
+        assert usage.total_tokens == 240
+
+    def test_ignores_responses_without_metrics(self):
+        """Test responses without a metrics dict don't count as recorded."""
+        from agents.usage import record_usage, track_usage
+
+        with track_usage() as usage:
+            record_usage(MagicMock(content="hi"))
+
+        assert not usage.recorded
+        assert usage.total_tokens == 0
+
+    def test_no_tracker_is_noop(self):
+        """Test recording outside a tracker does nothing."""
+        from agents.usage import record_usage
+
+        record_usage(MagicMock(metrics={"total_tokens": 10}))
+
+    @pytest.mark.asyncio
+    async def test_agent_helpers_record_usage(self, mock_user_id):
+        """Test agent helpers report their run's token usage."""
+        from agents.usage import track_usage
+
+        with patch("agents.support_bot.support_agent") as mock_agent:
+            mock_agent.arun = AsyncMock(
+                return_value=MagicMock(content="Answer", metrics={"total_tokens": [321]})
+            )
+            from agents.support_bot import answer_question
+
+            with track_usage() as usage:
+                await answer_question(question="Can I change dates?", user_id=mock_user_id)
+
+        assert usage.total_tokens == 321
+
+
+class TestTokenQuota:
+    """Tests for the daily token quota."""
+
+    def test_estimates_scale_with_request(self):
+        """Test a long structured trip is estimated far above a support question."""
+        from api.quota import estimate_tokens
+
+        support = estimate_tokens("support", message="Where is my booking?")
+        short_trip = estimate_tokens("trip_planner", duration_days=2)
+        long_trip = estimate_tokens("trip_planner", duration_days=30, structured=True)
+
+        assert support < short_trip < long_trip
+
+    def test_rejects_when_user_budget_exhausted(self, clock):
+        """Test reservations beyond the user's daily budget are rejected with 429."""
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=1000, global_daily_tokens=0)
+        quota.reserve("user:a", 600)
+
+        with pytest.raises(HTTPException) as exc:
+            quota.reserve("user:a", 600)
+
+        assert exc.value.status_code == 429
+        assert "Daily AI usage limit" in exc.value.detail
+        assert int(exc.value.headers["Retry-After"]) <= 86400
+        # Other users have their own budget
+        quota.reserve("user:b", 600)
+
+    def test_rejects_when_global_budget_exhausted(self, clock):
+        """Test the global budget caps all users together."""
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=0, global_daily_tokens=1000)
+        quota.reserve("user:a", 700)
+
+        with pytest.raises(HTTPException) as exc:
+            quota.reserve("user:b", 700)
+
+        assert "capacity" in exc.value.detail
+
+    def test_reconcile_replaces_estimate(self, clock):
+        """Test actual usage replaces the estimate in both budgets."""
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=10000, global_daily_tokens=10000)
+        reservation = quota.reserve("user:a", 5000)
+        quota.reconcile(reservation, 1200)
+
+        remaining = quota.get_remaining("user:a")
+        assert remaining["day"]["used"] == 1200
+        assert remaining["global"]["used"] == 1200
+        assert quota.stats()["reconciled_delta"] == -3800
+
+    def test_resets_at_utc_midnight(self, clock):
+        """Test budgets reset when the UTC day rolls over."""
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=1000, global_daily_tokens=0)
+        quota.reserve("user:a", 1000)
+        clock.advance(86400)
+
+        quota.reserve("user:a", 1000)
+        assert quota.get_remaining("user:a")["day"]["used"] == 1000
+
+    def test_budgets_shared_across_workers(self, clock, tmp_path):
+        """Test workers on shared stores draw on one set of budgets."""
+        from api.quota import TokenQuota
+        from api.shm_store import SharedTATStore
+
+        def worker():
+            return TokenQuota(
+                user_daily_tokens=1000,
+                global_daily_tokens=1500,
+                store=SharedTATStore(str(tmp_path / "users"), slots=64),
+                global_store=SharedTATStore(str(tmp_path / "global"), slots=16),
+            )
+
+        first, second = worker(), worker()
+        reservation = first.reserve("user:a", 800)
+        with pytest.raises(HTTPException):
+            second.reserve("user:a", 800)
+        second.reserve("user:b", 600)
+        with pytest.raises(HTTPException) as exc:
+            first.reserve("user:c", 200)
+        assert "capacity" in exc.value.detail
+
+        first.reconcile(reservation, 500)
+        assert second.get_remaining("user:a")["day"]["used"] == 500
+        assert second.get_remaining("user:a")["global"]["used"] == 1100
+        # A rejected reservation leaves the user's counter untouched
+        assert second.get_remaining("user:c")["day"]["used"] == 0
+
+    def test_metered_charges_actual_usage(self, clock):
+        """Test metered blocks reconcile with the usage recorded inside them."""
+        from agents.usage import record_usage
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=10000, global_daily_tokens=0)
+        with quota.metered("user:a", 4000):
+            record_usage(MagicMock(metrics={"total_tokens": 2500}))
+
+        assert quota.get_remaining("user:a")["day"]["used"] == 2500
+
+    def test_metered_keeps_estimate_without_usage(self, clock):
+        """Test the estimate stands when the model reports no usage."""
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=10000, global_daily_tokens=0)
+        with quota.metered("user:a", 4000):
+            pass
+
+        assert quota.get_remaining("user:a")["day"]["used"] == 4000
+
+    def test_metered_refunds_failed_call(self, clock):
+        """Test a call that fails before using tokens is refunded."""
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=10000, global_daily_tokens=0)
+        with pytest.raises(RuntimeError):
+            with quota.metered("user:a", 4000):
+                raise RuntimeError("upstream down")
+
+        assert quota.get_remaining("user:a")["day"]["used"] == 0
+
+    def test_metered_keeps_estimate_once_model_called(self, clock):
+        """Test a call cancelled after the model started stays charged."""
+        import asyncio
+        from agents.usage import record_started
+        from api.quota import TokenQuota
+
+        quota = TokenQuota(user_daily_tokens=10000, global_daily_tokens=10000)
+        with pytest.raises(asyncio.CancelledError):
+            with quota.metered("user:a", 4000):
+                record_started()
+                raise asyncio.CancelledError()
+
+        remaining = quota.get_remaining("user:a")
+        assert remaining["day"]["used"] == 4000
+        assert remaining["global"]["used"] == 4000
@@ -0,0 +1,160 @@
+"""
+Tests for knowledge chunking and context packing.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+
+
+def _section(body, id="faq.md#q", heading="Question?", parents=None):
+    from agents.sections import Section
+
+    return Section(
+        id=id,
+        source="faq.md",
+        heading=heading,
+        level=3,
+        parents=parents if parents is not None else ["FAQ", "Booking"],
+        body=body,
+    )
+
+
+class TestChunking:
+    """Tests for chunk_section."""
+
+    def test_short_section_stays_whole(self):
+        from agents.rag_context import chunk_section
+
+        section = _section("Yes! Gift cards never expire.")
+
+        assert chunk_section(section, max_tokens=100) == [section]
+
+    def test_long_section_splits_at_blocks_with_breadcrumb(self):
+        from agents.rag_context import chunk_section, chunk_text, count_tokens
+
+        blocks = [f"Paragraph {n}. " + "word " * 30 for n in range(4)]
+        section = _section("\n\n".join(blocks))
+
+        chunks = chunk_section(section, max_tokens=100)
+
+        assert [c.id for c in chunks] == ["faq.md#q", "faq.md#q-part-2"]
+        assert all(c.title == "Booking > Question?" for c in chunks)
+        assert all(count_tokens(chunk_text(c)) <= 100 for c in chunks)
+        assert "\n\n".join(c.body for c in chunks) == section.body
+
+    def test_lists_and_code_are_not_split(self):
+        from agents.rag_context import chunk_section
+
+        listing = "Included:\n" + "\n".join(f"- item {n} " + "x" * 40 for n in range(6))
+        code = "```\n" + "line\n\n" * 10 + "```"
+        section = _section(f"{listing}\n\n{code}")
+
+        chunks = chunk_section(section, max_tokens=60)
+
+        assert [c.body for c in chunks] == [listing, code]
+
+
+class TestContextPacker:
+    """Tests for ContextPacker."""
+
+    def test_drops_duplicates_and_backfills(self):
+        from agents.rag_context import ContextPacker
+
+        hits = [
+            (_section("Refunds within 30 days.", id="a"), 0.9),
+            (_section("Refunds  within 30 days.", id="b", heading="Refunds"), 0.8),
+            (_section("Gift cards never expire.", id="c"), 0.7),
+        ]
+        packer = ContextPacker(budget=1000)
+
+        packed = packer.pack(hits, limit=2)
+
+        assert [s.id for s, _ in packed] == ["a", "c"]
+        assert packer.stats()["duplicates_dropped"] == 1
+
+    def test_fills_budget_best_first(self):
+        from agents.rag_context import ContextPacker, chunk_text, count_tokens
+
+        big = _section("long " * 100, id="big")
+        small = _section("short answer", id="small")
+        best = _section("best answer", id="best")
+        packer = ContextPacker(budget=count_tokens(chunk_text(best)) + count_tokens(chunk_text(small)))
+
+        packed = packer.pack([(best, 0.9), (big, 0.8), (small, 0.7)], limit=5)
+
+        assert [s.id for s, _ in packed] == ["best", "small"]
+        stats = packer.stats()
+        assert stats["over_budget_dropped"] == 1
+        assert stats["avg_tokens_after"] < stats["avg_tokens_before"]
+
+    def test_best_chunk_kept_over_budget(self):
+        from agents.rag_context import ContextPacker
+
+        packed = ContextPacker(budget=5).pack([(_section("long " * 50), 0.9)], limit=5)
+
+        assert len(packed) == 1
+
+    def test_tracks_tokens_per_request(self):
+        from agents.rag_context import ContextPacker, track_context
+
+        packer = ContextPacker(budget=1000)
+        hits = [(_section("Answer one."), 0.9), (_section("Answer one."), 0.8)]
+
+        with track_context() as context:
+            packer.pack(hits, limit=2)
+            packer.pack(hits, limit=2)
+
+        assert context.searches == 2
+        assert context.after * 2 == context.before
+
+
+class TestPackedSearch:
+    """Tests for VectorKnowledge search with packing."""
+
+    @pytest.mark.asyncio
+    async def test_search_returns_packed_chunks(self, tmp_path):
+        from agents.embeddings import HashingEmbedder
+        from agents.vector_index import VectorKnowledge
+
+        root = tmp_path / "knowledge"
+        root.mkdir()
+        (root / "faq.md").write_text(
+            "# FAQ\n\n## Gift cards\n\nGift cards never expire.\n\n"
+            "## Vouchers\n\nGift cards never expire.\n\n"
+            "## Luggage\n\nOne checked bag per traveler.\n"
+        )
+        knowledge = VectorKnowledge(
+            [root / "faq.md"], root=root, embedder=HashingEmbedder(), index_dir=str(tmp_path / "index")
+        )
+        await knowledge.aload()
+
+        with patch.object(knowledge, "_documents", side_effect=lambda hits: hits):
+            hits = await knowledge.async_search("do gift cards expire", num_documents=3)
+
+        assert [s.id for s, _ in hits][0] in ("faq.md#gift-cards", "faq.md#vouchers")
+        assert len(hits) == 2
+        assert knowledge.packer.stats()["duplicates_dropped"] == 1
+
+
+class TestSupportContextTokens:
+    """Tests for per-request context token reporting."""
+
+    @pytest.mark.asyncio
+    async def test_answer_reports_context_tokens(self):
+        from agents import support_bot
+        from agents.rag_context import ContextPacker
+
+        packer = ContextPacker(budget=1000)
+
+        async def arun(prompt, user_id=None):
+            packer.pack([(_section("Refunds within 30 days."), 0.9)], limit=5)
+            response = MagicMock()
+            response.content = "Refunds within 30 days."
+            response.metrics = {}
+            return response
+
+        with patch("agents.support_bot.support_agent") as mock_agent:
+            mock_agent.arun = arun
+            result = await support_bot.answer_question("refund policy?", context={"trip_id": "t1"})
+
+        assert result["context_tokens"]["searches"] == 1
+        assert result["context_tokens"]["after"] > 0
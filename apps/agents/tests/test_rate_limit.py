@@ -0,0 +1,473 @@
+"""
+Tests for API rate limiting.
+"""
+import asyncio
+import multiprocessing
+import pytest
+from unittest.mock import patch
+from fastapi import HTTPException
+
+
+def _admit_from_worker(path, attempts, results):
+    """Run checks from a separate process against a shared table."""
+    from api.rate_limit import RateLimiter
+    from api.shm_store import SharedTATStore
+
+    limiter = RateLimiter(
+        requests_per_minute=50, requests_per_hour=1000, store=SharedTATStore(path, slots=64)
+    )
+
+    async def admit():
+        admitted = 0
+        for _ in range(attempts):
+            try:
+                await limiter.check("user:shared")
+                admitted += 1
+            except HTTPException:
+                pass
+        return admitted
+
+    results.put(asyncio.run(admit()))
+
+
+def _time_lookup_from_fork(store, locked, results):
+    """Time a lookup on a store inherited from the parent process."""
+    import time
+
+    locked.wait(5)
+    started = time.monotonic()
+    store.get("user:a")
+    results.put(time.monotonic() - started)
+
+
+class TestGCRARateLimiter:
+    """Tests for the GCRA rate limiter."""
+
+    @pytest.mark.asyncio
+    async def test_allows_burst_up_to_limit(self, clock):
+        """Test a full per-minute burst is admitted, then rejected."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=60)
+        for _ in range(5):
+            await limiter.check("user:a")
+
+        with pytest.raises(HTTPException) as exc:
+            await limiter.check("user:a")
+        assert exc.value.status_code == 429
+        assert int(exc.value.headers["Retry-After"]) == 12
+
+    @pytest.mark.asyncio
+    async def test_refills_one_request_per_interval(self, clock):
+        """Test a new request is admitted after one emission interval."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=60)
+        for _ in range(5):
+            await limiter.check("user:a")
+
+        clock.advance(12)
+        await limiter.check("user:a")
+        with pytest.raises(HTTPException):
+            await limiter.check("user:a")
+
+    @pytest.mark.asyncio
+    async def test_hourly_limit(self, clock):
+        """Test the per-hour window is enforced independently."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=10, requests_per_hour=15)
+        for _ in range(10):
+            await limiter.check("user:a")
+        clock.advance(60)
+        for _ in range(5):
+            await limiter.check("user:a")
+
+        with pytest.raises(HTTPException) as exc:
+            await limiter.check("user:a")
+        assert "Hourly" in exc.value.detail
+
+    @pytest.mark.asyncio
+    async def test_rejected_request_is_not_recorded(self, clock):
+        """Test rejections don't push the key further into debt."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=1, requests_per_hour=60)
+        await limiter.check("user:a")
+        for _ in range(3):
+            with pytest.raises(HTTPException):
+                await limiter.check("user:a")
+
+        clock.advance(60)
+        await limiter.check("user:a")
+
+    @pytest.mark.asyncio
+    async def test_keys_are_independent(self, clock):
+        """Test one key's usage doesn't affect another."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=1, requests_per_hour=60)
+        await limiter.check("user:a")
+        await limiter.check("user:b")
+
+    @pytest.mark.asyncio
+    async def test_get_remaining(self, clock):
+        """Test usage reporting matches the sliding-window shape."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=60)
+        for _ in range(3):
+            await limiter.check("user:a")
+
+        remaining = limiter.get_remaining("user:a")
+        assert remaining["minute"] == {"used": 3, "limit": 5}
+        assert remaining["hour"] == {"used": 3, "limit": 60}
+        assert limiter.get_remaining("user:unknown")["minute"]["used"] == 0
+
+        clock.advance(60)
+        assert limiter.get_remaining("user:a")["minute"]["used"] == 0
+
+
+class TestSlidingWindowRateLimiter:
+    """Tests for the legacy sliding-window limiter."""
+
+    @pytest.mark.asyncio
+    async def test_per_minute_limit(self, clock):
+        """Test the sliding window rejects past the limit."""
+        from api.rate_limit import SlidingWindowRateLimiter
+
+        limiter = SlidingWindowRateLimiter(requests_per_minute=2, requests_per_hour=60)
+        await limiter.check("user:a")
+        await limiter.check("user:a")
+        with pytest.raises(HTTPException):
+            await limiter.check("user:a")
+
+
+class TestRateLimiterMemory:
+    """Tests for bounded rate-limit state."""
+
+    @pytest.mark.asyncio
+    async def test_sweep_drops_idle_keys(self, clock):
+        """Test keys with no outstanding usage are swept."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=60)
+        await limiter.check("ip:1")
+        clock.advance(3000)
+        await limiter.check("ip:2")
+        clock.advance(30)  # ip:2 still owes part of an hourly interval
+
+        assert limiter.sweep() == 1
+        assert limiter.stats()["keys"] == 1
+
+    @pytest.mark.asyncio
+    async def test_sweep_is_lossless(self, clock):
+        """Test sweeping never resets a key that still has usage."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=1, requests_per_hour=60)
+        await limiter.check("ip:1")
+        limiter.sweep()
+
+        with pytest.raises(HTTPException):
+            await limiter.check("ip:1")
+
+    @pytest.mark.asyncio
+    async def test_hard_cap_on_keys(self, clock):
+        """Test an IP spray can't grow state past max_keys."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=60, max_keys=100)
+        for i in range(1000):
+            await limiter.check(f"ip:{i}")
+
+        stats = limiter.stats()
+        assert stats["keys"] == 100
+        assert stats["evictions"] == 900
+
+    @pytest.mark.asyncio
+    async def test_get_remaining_does_not_track_keys(self, clock):
+        """Test read-only lookups don't create state."""
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter()
+        limiter.get_remaining("ip:scanner")
+
+        assert limiter.stats()["keys"] == 0
+
+
+class TestSharedMemoryBackend:
+    """Tests for the multi-worker shared-memory store."""
+
+    def test_limit_is_shared_across_processes(self, tmp_path):
+        """Test N worker processes together admit exactly the configured limit."""
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        path = str(tmp_path / "ratelimit")
+        workers = [
+            ctx.Process(target=_admit_from_worker, args=(path, 40, results))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(timeout=30)
+
+        assert sum(results.get(timeout=5) for _ in workers) == 50
+
+    def test_lock_excludes_forked_workers(self, tmp_path):
+        """Test a store created before fork still locks out the parent in the child."""
+        import time
+        from api.shm_store import SharedTATStore
+
+        ctx = multiprocessing.get_context("fork")
+        store = SharedTATStore(str(tmp_path / "ratelimit"), slots=64)
+        locked = ctx.Event()
+        results = ctx.Queue()
+        worker = ctx.Process(target=_time_lookup_from_fork, args=(store, locked, results))
+        worker.start()
+
+        def hold(tats):
+            locked.set()
+            time.sleep(0.3)
+            return None, None
+
+        store.update("user:a", hold, time.time())
+        worker.join(timeout=10)
+
+        # The child had to wait for the parent's lock
+        assert results.get(timeout=5) >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_store_round_trip(self, tmp_path, clock):
+        """Test state written by one handle is visible through another."""
+        from api.rate_limit import RateLimiter
+        from api.shm_store import SharedTATStore
+
+        path = str(tmp_path / "ratelimit")
+        first = RateLimiter(requests_per_minute=2, requests_per_hour=60,
+                            store=SharedTATStore(path, slots=64))
+        second = RateLimiter(requests_per_minute=2, requests_per_hour=60,
+                             store=SharedTATStore(path, slots=64))
+        await first.check("user:a")
+        await second.check("user:a")
+
+        with pytest.raises(HTTPException):
+            await first.check("user:a")
+        assert second.get_remaining("user:a")["minute"]["used"] == 2
+
+    def test_full_probe_window_evicts_oldest(self, tmp_path, clock):
+        """Test a saturated table evicts instead of failing."""
+        from api.shm_store import SharedTATStore
+
+        store = SharedTATStore(str(tmp_path / "ratelimit"), slots=4)
+        for i in range(10):
+            store.put(f"ip:{i}", (clock.now + 100 + i, clock.now + 100 + i))
+
+        assert len(store) == 4
+        assert store.evictions == 6
+        assert store.get("ip:9") is not None
+
+    def test_sweep_frees_idle_slots(self, tmp_path, clock):
+        """Test idle slots are released for reuse."""
+        from api.shm_store import SharedTATStore
+
+        store = SharedTATStore(str(tmp_path / "ratelimit"), slots=64)
+        store.put("ip:1", (clock.now - 1, clock.now - 1))
+        store.put("ip:2", (clock.now + 60, clock.now + 60))
+
+        assert store.sweep(clock.now) == 1
+        assert store.get("ip:1") is None
+        assert store.get("ip:2") is not None
+
+    def test_sweep_is_incremental(self, tmp_path):
+        """Test each sweep inspects a bounded batch and the gauge stays exact."""
+        import time
+        from api.shm_store import SharedTATStore
+
+        now = time.time()
+        store = SharedTATStore(str(tmp_path / "ratelimit"), slots=64, sweep_slots=16)
+        for i in range(10):
+            store.put(f"ip:{i}", (now + 10, now + 10))
+        store.put("ip:busy", (now + 600, now + 600))
+        assert len(store) == 11
+
+        freed = [store.sweep(now + 60) for _ in range(4)]
+
+        assert sum(freed) == 10
+        assert all(n <= 16 for n in freed)
+        assert len(store) == 1
+        # Another handle sees the same gauge and continues from the shared cursor
+        other = SharedTATStore(str(tmp_path / "ratelimit"), slots=64, sweep_slots=16)
+        assert len(other) == 1
+        assert other.sweep(now + 60) == 0
+
+    def test_incompatible_file_is_reset(self, tmp_path):
+        """Test a table written with another layout is reinitialized, not misread."""
+        from api.shm_store import SharedTATStore
+
+        path = tmp_path / "ratelimit"
+        path.write_bytes(b"\xff" * 4096)
+        store = SharedTATStore(str(path), slots=64)
+
+        assert len(store) == 0
+        assert store.get("ip:1") is None
+
+
+class TestRedisBackend:
+    """Tests for the Redis-protocol store (using fakeredis)."""
+
+    @pytest.fixture
+    def server(self):
+        import fakeredis
+
+        return fakeredis.FakeServer()
+
+    def make_limiter(self, server, rpm=5, rph=60, **kwargs):
+        import fakeredis
+        from api.rate_limit import RateLimiter
+        from api.redis_store import RedisTATStore
+
+        client = fakeredis.FakeAsyncRedis(server=server)
+        store = RedisTATStore(client, "test:ratelimit", **kwargs)
+        return RateLimiter(requests_per_minute=rpm, requests_per_hour=rph, store=store)
+
+    @pytest.mark.asyncio
+    async def test_limit_shared_across_nodes(self, server):
+        """Test two nodes on one Redis enforce a single combined limit."""
+        node_a = self.make_limiter(server)
+        node_b = self.make_limiter(server)
+        admitted = 0
+        for limiter in (node_a, node_b) * 5:
+            try:
+                await limiter.check("user:a")
+                admitted += 1
+            except HTTPException:
+                pass
+
+        assert admitted == 5
+
+    @pytest.mark.asyncio
+    async def test_rejection_details(self, server):
+        """Test rejections carry the window, usage and Retry-After."""
+        limiter = self.make_limiter(server, rpm=2)
+        await limiter.check("user:a")
+        await limiter.check("user:a")
+
+        with pytest.raises(HTTPException) as exc:
+            await limiter.check("user:a")
+        assert exc.value.status_code == 429
+        assert 1 <= int(exc.value.headers["Retry-After"]) <= 30
+        assert (await limiter.aget_remaining("user:a"))["minute"]["used"] == 2
+
+    @pytest.mark.asyncio
+    async def test_headers_come_from_script_reply(self, server):
+        """Test RateLimit-* values need no extra lookup after the check."""
+        from types import SimpleNamespace
+
+        limiter = self.make_limiter(server, rpm=2)
+        request = SimpleNamespace(state=SimpleNamespace(rate_limits=[]))
+        await limiter.check("user:a", request)
+
+        with patch.object(limiter._tats._client, "hgetall") as hgetall:
+            with pytest.raises(HTTPException):
+                await limiter.check("user:a", request)
+                await limiter.check("user:a", request)
+        hgetall.assert_not_called()
+        assert limiter._tats.round_trips == 3
+        assert [remaining for _limit, remaining, _reset in request.state.rate_limits] == [1, 0, 0]
+
+    @pytest.mark.asyncio
+    async def test_hourly_window_in_script(self, server):
+        """Test the hour window is checked in the same round-trip."""
+        limiter = self.make_limiter(server, rpm=10, rph=3)
+        for _ in range(3):
+            await limiter.check("user:a")
+
+        with pytest.raises(HTTPException) as exc:
+            await limiter.check("user:a")
+        assert "Hourly" in exc.value.detail
+
+    @pytest.mark.asyncio
+    async def test_lease_amortizes_round_trips(self, server):
+        """Test leased permits are served locally without Redis calls."""
+        limiter = self.make_limiter(server, rpm=10, lease_size=5, lease_ttl=60)
+        for _ in range(10):
+            await limiter.check("user:a")
+
+        assert limiter._tats.round_trips == 2
+        assert limiter._tats.leased_hits == 8
+        with pytest.raises(HTTPException):
+            await limiter.check("user:a")
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_local_limits(self):
+        """Test Redis outages degrade to per-node limiting instead of erroring."""
+        from redis.asyncio import Redis
+        from api.rate_limit import RateLimiter, TATStore
+        from api.redis_store import RedisTATStore
+
+        client = Redis(host="127.0.0.1", port=1, socket_connect_timeout=0.05)
+        store = RedisTATStore(client, "test", fallback=TATStore())
+        limiter = RateLimiter(requests_per_minute=1, requests_per_hour=60, store=store)
+
+        await limiter.check("user:a")
+        with pytest.raises(HTTPException):
+            await limiter.check("user:a")
+        assert store.errors == 2
+
+
+class TestWeightedRateLimit:
+    """Tests for weighted rate-limit checks."""
+
+    @pytest.mark.asyncio
+    async def test_cost_consumes_multiple_requests(self):
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=100)
+        await limiter.check("k", cost=3)
+        assert limiter.get_remaining("k")["minute"]["used"] == 3
+        await limiter.check("k", cost=2)
+        with pytest.raises(HTTPException):
+            await limiter.check("k")
+
+    @pytest.mark.asyncio
+    async def test_cost_over_burst_rejected(self):
+        from api.rate_limit import RateLimiter
+
+        limiter = RateLimiter(requests_per_minute=5, requests_per_hour=100)
+        with pytest.raises(HTTPException) as exc:
+            await limiter.check("k", cost=12.25)
+        assert exc.value.status_code == 413
+        assert limiter.get_remaining("k")["minute"]["used"] == 0
+
+        await limiter.check("k", cost=5)
+        assert limiter.get_remaining("k")["minute"]["used"] == 5
+
+
+class TestClientKey:
+    """Tests for keying requests by client address."""
+
+    def _request(self, peer, forwarded=None):
+        from unittest.mock import MagicMock
+
+        request = MagicMock()
+        request.client.host = peer
+        request.headers = {"X-Forwarded-For": forwarded} if forwarded else {}
+        return request
+
+    def test_forwarded_for_ignored_without_trusted_proxy(self):
+        from api.rate_limit import get_client_key
+
+        request = self._request("198.51.100.7", forwarded="203.0.113.1")
+        assert get_client_key(request) == "ip:198.51.100.7"
+
+    def test_forwarded_for_from_trusted_proxy(self):
+        import ipaddress
+        from api.rate_limit import get_client_key
+
+        proxies = [ipaddress.ip_network("10.0.0.0/8")]
+        # The leftmost entry is client-supplied; the last untrusted hop is the client
+        request = self._request("10.0.0.2", forwarded="1.2.3.4, 203.0.113.1, 10.0.0.3")
+        with patch("api.rate_limit.TRUSTED_PROXIES", proxies):
+            assert get_client_key(request) == "ip:203.0.113.1"
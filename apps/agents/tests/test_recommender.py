@@ -238,6 +238,30 @@ class TestRecommenderMemory:
 
         assert recommender_agent.update_user_memories is True
 
+    def test_generic_agent_has_no_memory(self):
+        """Test the shared, non-personalized agent can't see or learn user memories."""
+        from agents.recommender import generic_recommender_agent
+
+        assert generic_recommender_agent.learning is False
+        assert generic_recommender_agent.read_user_memories is False
+        assert generic_recommender_agent.update_user_memories is False
+
+    @pytest.mark.asyncio
+    async def test_non_personalized_uses_generic_agent(self, mock_user_id):
+        """Test personalize=False never runs the memory-backed agent."""
+        with patch("agents.recommender.recommender_agent") as personal, \
+             patch("agents.recommender.generic_recommender_agent") as generic:
+            generic.arun = AsyncMock(return_value=MagicMock(content="Lisbon", metrics={}))
+
+            from agents.recommender import get_recommendations
+
+            result = await get_recommendations(user_id=mock_user_id, personalize=False)
+
+        generic.arun.assert_awaited_once()
+        assert "user_id" not in generic.arun.call_args.kwargs
+        personal.arun.assert_not_called()
+        assert result["personalized"] is False
+
     def test_memory_configuration(self):
         """Test memory configuration settings."""
         from agents.recommender import memory_config
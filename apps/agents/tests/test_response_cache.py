@@ -0,0 +1,134 @@
+"""
+Tests for the tiered response cache.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from api.response_cache import ResponseCache
+
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite3"), max_entries=2, ttl=60, enabled=True)
+    yield cache
+    cache.close()
+
+
+class TestResponseCache:
+    """Tests for ResponseCache."""
+
+    @pytest.mark.asyncio
+    async def test_miss_then_memory_hit(self, cache):
+        """Test a stored value is served from memory and counted per endpoint."""
+        assert await cache.get("trip_plan", "k1") is None
+        await cache.put("trip_plan", "k1", {"plan": "Day 1"})
+
+        assert await cache.get("trip_plan", "k1") == {"plan": "Day 1"}
+
+        stats = cache.stats()["endpoints"]["trip_plan"]
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["bytes_saved"] > 0
+
+    @pytest.mark.asyncio
+    async def test_hits_return_copies(self, cache):
+        """Test callers can't corrupt cached entries by mutating results."""
+        await cache.put("trip_plan", "k1", {"plan": "Day 1"})
+        first = await cache.get("trip_plan", "k1")
+        first["plan"] = "changed"
+
+        assert (await cache.get("trip_plan", "k1"))["plan"] == "Day 1"
+
+    @pytest.mark.asyncio
+    async def test_evicted_entries_come_from_disk(self, cache):
+        """Test entries pushed out of the LRU are still served from disk."""
+        for i in range(3):
+            await cache.put("recommend", f"k{i}", {"i": i})
+
+        assert await cache.get("recommend", "k0") == {"i": 0}
+        assert cache.stats()["endpoints"]["recommend"]["disk_hits"] == 1
+        assert cache.stats()["memory_entries"] == 2
+
+    @pytest.mark.asyncio
+    async def test_survives_restart(self, cache, tmp_path):
+        """Test a new cache instance reads entries persisted by an old one."""
+        from api.response_cache import ResponseCache
+
+        await cache.put("trip_plan", "k1", {"plan": "Day 1"})
+        fresh = ResponseCache(path=cache.path, ttl=60, enabled=True)
+        try:
+            assert await fresh.get("trip_plan", "k1") == {"plan": "Day 1"}
+        finally:
+            fresh.close()
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_miss(self, cache):
+        """Test entries past their TTL are not served from either tier."""
+        cache.ttl = 0.05
+        await cache.put("trip_plan", "k1", {"plan": "Day 1"})
+        await asyncio.sleep(0.1)
+
+        assert await cache.get("trip_plan", "k1") is None
+
+    @pytest.mark.asyncio
+    async def test_disabled_cache_is_noop(self, tmp_path):
+        """Test a disabled cache never stores or serves entries."""
+        from api.response_cache import ResponseCache
+
+        cache = ResponseCache(path=str(tmp_path / "off.sqlite3"), enabled=False)
+        await cache.put("trip_plan", "k1", {"plan": "Day 1"})
+
+        assert await cache.get("trip_plan", "k1") is None
+
+
+class TestResponseCacheIntegration:
+    """Tests for caching trip plans and recommendations."""
+
+    @pytest.mark.asyncio
+    async def test_trip_plans_are_cached(self, cache):
+        """Test a repeated plan request is answered without running the team."""
+        from api.routes import TripPlanRequest, _plan_trip
+
+        plan = AsyncMock(return_value={"plan": "Day 1", "budget": 2000, "destination": "Bali"})
+        with patch("api.routes.response_cache", cache), patch("api.routes.plan_trip", plan):
+            request = TripPlanRequest(destination="Bali", duration_days=3, budget=2000)
+            await _plan_trip(request, "u1")
+            again = await _plan_trip(
+                TripPlanRequest(destination="bali", duration_days=3, budget=2000), "u2"
+            )
+            await _plan_trip(TripPlanRequest(destination="Bali", duration_days=3, budget=2100), "u3")
+
+        assert plan.call_count == 2
+        assert again["plan"] == "Day 1"
+        assert again["destination"] == "bali"
+
+    @pytest.mark.asyncio
+    async def test_prompt_change_invalidates(self, cache):
+        """Test changing the team's instructions changes the cache key."""
+        from api.routes import TripPlanRequest, _plan_trip
+
+        plan = AsyncMock(return_value={"plan": "Day 1"})
+        request = TripPlanRequest(destination="Bali", duration_days=3)
+        with patch("api.routes.response_cache", cache), patch("api.routes.plan_trip", plan), \
+             patch("agents.trip_planner.trip_planner_team", MagicMock(instructions=["v1"])):
+            await _plan_trip(request, "u1")
+        with patch("api.routes.response_cache", cache), patch("api.routes.plan_trip", plan), \
+             patch("agents.trip_planner.trip_planner_team", MagicMock(instructions=["v2"])):
+            await _plan_trip(request, "u1")
+
+        assert plan.call_count == 2
+
+    def test_signature_tracks_instructions_and_model(self):
+        """Test agent signatures change with instructions and model id."""
+        from agents.fingerprint import agent_signature
+
+        base = MagicMock(instructions=["a"], model=MagicMock(id="gpt-4o"), agents=[])
+        base.name, base.role = "Planner", "plan"
+        same = MagicMock(instructions=["a"], model=MagicMock(id="gpt-4o"), agents=[])
+        same.name, same.role = "Planner", "plan"
+        other_model = MagicMock(instructions=["a"], model=MagicMock(id="gpt-4o-mini"), agents=[])
+        other_model.name, other_model.role = "Planner", "plan"
+
+        assert agent_signature(base) == agent_signature(same)
+        assert agent_signature(base) != agent_signature(other_model)
@@ -0,0 +1,151 @@
+"""
+Tests for weighted fair scheduling of LLM runs.
+"""
+import asyncio
+import pytest
+
+
+def _scheduler(**overrides):
+    from api.scheduler import FairScheduler
+
+    params = {
+        "max_concurrent": 1,
+        "class_weights": {"support": 4, "trip_planner": 1},
+        "tier_weights": {"free": 1, "pro": 4},
+    }
+    params.update(overrides)
+    return FairScheduler(**params)
+
+
+async def _drain(scheduler, requests):
+    """Queue `requests` behind a held slot and return the order they ran in."""
+    order = []
+    await scheduler.acquire("holder", "support")
+
+    async def run(name, flow, priority, tier, cost):
+        async with scheduler.slot(flow, priority, tier, cost):
+            order.append(name)
+
+    tasks = [asyncio.ensure_future(run(*r)) for r in requests]
+    await asyncio.sleep(0)
+    scheduler.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+class TestFairScheduler:
+    """Tests for FairScheduler."""
+
+    @pytest.mark.asyncio
+    async def test_limits_concurrency(self):
+        """Test no more than max_concurrent runs hold a slot at once."""
+        scheduler = _scheduler(max_concurrent=2)
+        running = 0
+        peak = 0
+
+        async def work(i):
+            nonlocal running, peak
+            async with scheduler.slot(f"u{i}", "support"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*(work(i) for i in range(6)))
+
+        assert peak == 2
+        assert scheduler.active == 0
+        assert scheduler.stats()["dispatched"] == 6
+
+    @pytest.mark.asyncio
+    async def test_heavy_user_does_not_starve_others(self):
+        """Test a user with a backlog is interleaved with a newcomer."""
+        scheduler = _scheduler()
+        requests = [(f"heavy{i}", "heavy", "trip_planner", "free", 1) for i in range(4)]
+        requests.append(("light", "light", "trip_planner", "free", 1))
+
+        order = await _drain(scheduler, requests)
+
+        assert order.index("light") <= 1
+
+    @pytest.mark.asyncio
+    async def test_priority_class_goes_first(self):
+        """Test support runs are served ahead of queued trip plans."""
+        scheduler = _scheduler()
+        requests = [
+            ("plan", "a", "trip_planner", "free", 100),
+            ("support", "b", "support", "free", 100),
+        ]
+
+        order = await _drain(scheduler, requests)
+
+        assert order == ["support", "plan"]
+
+    @pytest.mark.asyncio
+    async def test_paid_tier_weighs_more(self):
+        """Test a pro user gets more throughput than a free user with equal backlog."""
+        scheduler = _scheduler()
+        requests = []
+        for i in range(4):
+            requests.append((f"free{i}", "f", "trip_planner", "free", 100))
+            requests.append((f"pro{i}", "p", "trip_planner", "pro", 100))
+
+        order = await _drain(scheduler, requests)
+
+        first_half = order[:4]
+        assert sum(name.startswith("pro") for name in first_half) >= 3
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        """Test cancelling a queued run frees its place."""
+        scheduler = _scheduler()
+        await scheduler.acquire("a", "support")
+        waiter = asyncio.ensure_future(scheduler.acquire("b", "support"))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        scheduler.release()
+
+        assert scheduler.active == 0
+        assert scheduler.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_disabled_runs_immediately(self):
+        """Test max_concurrent=0 turns the scheduler into a no-op."""
+        scheduler = _scheduler(max_concurrent=0)
+        async with scheduler.slot("a", "support"):
+            assert scheduler.active == 0
+
+    @pytest.mark.asyncio
+    async def test_service_share_stats(self):
+        """Test service shares are reported by class, tier and top user."""
+        scheduler = _scheduler(max_concurrent=4)
+        async with scheduler.slot("a", "support", "free", 300):
+            pass
+        async with scheduler.slot("b", "trip_planner", "pro", 100):
+            pass
+
+        share = scheduler.stats()["service_share"]
+        assert share["class"] == {"support": 0.75, "trip_planner": 0.25}
+        assert share["tier"] == {"free": 0.75, "pro": 0.25}
+        assert share["active_users"] == 2
+        assert share["top_user"] == 0.75
+
+
+class TestUserTier:
+    """Tests for get_user_tier."""
+
+    def test_reads_app_metadata(self):
+        from api.auth import get_user_tier
+
+        assert get_user_tier({"sub": "u", "app_metadata": {"tier": "Pro"}}) == "pro"
+        assert get_user_tier({"sub": "u", "app_metadata": {"plan": "plus"}}) == "plus"
+
+    def test_defaults_to_free(self):
+        from api.auth import get_user_tier
+
+        assert get_user_tier({"sub": "u"}) == "free"
+        # user_metadata is user-writable and must not grant a tier
+        assert get_user_tier({"sub": "u", "user_metadata": {"tier": "pro"}}) == "free"
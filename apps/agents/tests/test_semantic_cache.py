@@ -0,0 +1,148 @@
+"""
+Tests for the SupportBot semantic answer cache.
+"""
+import os
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+@pytest.fixture
+def cache(tmp_path):
+    from agents.embeddings import HashingEmbedder
+    from agents.semantic_cache import SemanticCache
+
+    knowledge = tmp_path / "knowledge"
+    knowledge.mkdir()
+    (knowledge / "policies.md").write_text("Refunds within 14 days.")
+    return SemanticCache(
+        HashingEmbedder(), threshold=0.8, ttl=60, max_entries=4,
+        watch_dir=knowledge, check_interval=0,
+    )
+
+
+class TestHashingEmbedder:
+    """Tests for the local embedder."""
+
+    @pytest.mark.asyncio
+    async def test_paraphrases_score_higher_than_unrelated(self):
+        """Test similar wording is closer than a different topic."""
+        from agents.embeddings import HashingEmbedder
+
+        vectors = await HashingEmbedder().embed([
+            "How do I get a refund?",
+            "how can I get refunds",
+            "What should I pack for Bali?",
+        ])
+
+        assert vectors.shape == (3, 512)
+        assert vectors[0] @ vectors[1] > 0.8
+        assert vectors[0] @ vectors[2] < 0.3
+
+
+class TestSemanticCache:
+    """Tests for SemanticCache."""
+
+    @pytest.mark.asyncio
+    async def test_paraphrase_hits_stored_answer(self, cache):
+        """Test a close paraphrase returns the stored answer."""
+        answer, vector = await cache.lookup("How do I get a refund?")
+        assert answer is None
+        cache.store(vector, "Email support within 14 days.")
+
+        answer, _ = await cache.lookup("how can I get a refund")
+
+        assert answer == "Email support within 14 days."
+        assert cache.stats()["hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_unrelated_question_misses(self, cache):
+        """Test questions below the threshold go to the agent."""
+        _, vector = await cache.lookup("How do I get a refund?")
+        cache.store(vector, "Refund answer")
+
+        answer, _ = await cache.lookup("Do I need a visa for Japan?")
+
+        assert answer is None
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_miss(self, cache):
+        """Test entries past their TTL are ignored."""
+        cache.ttl = -1
+        _, vector = await cache.lookup("How do I get a refund?")
+        cache.store(vector, "Refund answer")
+
+        answer, _ = await cache.lookup("How do I get a refund?")
+
+        assert answer is None
+
+    @pytest.mark.asyncio
+    async def test_knowledge_change_invalidates(self, cache):
+        """Test editing a knowledge file clears cached answers."""
+        _, vector = await cache.lookup("How do I get a refund?")
+        cache.store(vector, "Refunds within 14 days.")
+
+        policy = cache.watch_dir / "policies.md"
+        policy.write_text("Refunds within 30 days.")
+        os.utime(policy, ns=(1, 1))
+
+        answer, _ = await cache.lookup("How do I get a refund?")
+
+        assert answer is None
+        assert cache.stats()["invalidations"] == 1
+
+    @pytest.mark.asyncio
+    async def test_capacity_reuses_oldest_slot(self, cache):
+        """Test the index never grows past max_entries."""
+        for i in range(6):
+            _, vector = await cache.lookup(f"question number {i} about topic{i}")
+            cache.store(vector, f"answer {i}")
+
+        assert cache.stats()["entries"] == 4
+        answer, _ = await cache.lookup("question number 0 about topic0")
+        assert answer is None
+
+    @pytest.mark.asyncio
+    async def test_embedder_failure_skips_cache(self):
+        """Test an unavailable embedder degrades to a normal miss."""
+        from agents.semantic_cache import SemanticCache
+
+        embedder = MagicMock()
+        embedder.embed = AsyncMock(side_effect=RuntimeError("timeout"))
+        cache = SemanticCache(embedder)
+
+        assert await cache.lookup("refund?") == (None, None)
+        assert cache.stats()["errors"] == 1
+
+
+class TestSupportBotSemanticCache:
+    """Tests for semantic caching in answer_question."""
+
+    @pytest.mark.asyncio
+    async def test_second_paraphrase_skips_agent(self, cache, mock_user_id):
+        """Test the agent runs once for two paraphrased questions."""
+        with patch("agents.support_bot.support_agent") as mock_agent, \
+             patch("agents.support_bot.answer_cache", cache):
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Email support."))
+
+            from agents.support_bot import answer_question
+
+            first = await answer_question("How do I get a refund?", user_id=mock_user_id)
+            second = await answer_question("how can I get a refund", user_id=mock_user_id)
+
+        assert mock_agent.arun.call_count == 1
+        assert second["answer"] == first["answer"] == "Email support."
+        assert second["cached"] is True
+
+    @pytest.mark.asyncio
+    async def test_questions_with_context_bypass_cache(self, cache, mock_conversation_context):
+        """Test booking-specific questions always reach the agent."""
+        with patch("agents.support_bot.support_agent") as mock_agent, \
+             patch("agents.support_bot.answer_cache", cache):
+            mock_agent.arun = AsyncMock(return_value=MagicMock(content="Your trip..."))
+
+            from agents.support_bot import answer_question
+
+            for _ in range(2):
+                await answer_question("Where is my trip?", context=mock_conversation_context)
+
+        assert mock_agent.arun.call_count == 2
@@ -0,0 +1,148 @@
+"""
+Tests for single-flight call coalescing.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+
+
+class TestSingleFlight:
+    """Tests for the SingleFlight helper."""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_result(self):
+        """Test concurrent callers with one key trigger a single call."""
+        from api.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        calls = 0
+
+        async def work():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "done"
+
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(5)])
+
+        assert results == ["done"] * 5
+        assert calls == 1
+        assert flight.stats()["shared"] == 4
+        assert flight.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_exception_propagates_to_all(self):
+        """Test every waiter sees the shared exception."""
+        from api.singleflight import SingleFlight
+
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *[flight.do("k", fail) for _ in range(3)], return_exceptions=True
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_does_not_cancel_others(self):
+        """Test cancelling one waiter leaves the shared call running."""
+        from api.singleflight import SingleFlight
+
+        flight = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.02)
+            return 42
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == 42
+        assert first.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_abandoned_call_is_cancelled(self):
+        """Test the shared task stops once every waiter has left."""
+        from api.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(flight.do("k", work))
+        await started.wait()
+        waiter.cancel()
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+        assert flight.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_coalesced(self):
+        """Test a finished call isn't reused by later callers."""
+        from api.singleflight import SingleFlight
+
+        flight = SingleFlight()
+        work = AsyncMock(side_effect=[1, 2])
+
+        assert await flight.do("k", work) == 1
+        assert await flight.do("k", work) == 2
+
+
+class TestRemoteVerificationCoalescing:
+    """Tests for coalesced remote token verification."""
+
+    @pytest.mark.asyncio
+    async def test_burst_makes_one_upstream_call(self):
+        """Test concurrent requests with one token share a Supabase call."""
+        from api import auth
+        from api.token_cache import token_cache
+
+        token_cache.clear()
+
+        async def remote(token):
+            await asyncio.sleep(0.01)
+            return {"id": "user-123"}
+
+        with patch("api.auth.AUTH_LOCAL_VERIFY", False), \
+             patch("api.auth.verify_token_remotely", side_effect=remote) as mock_remote:
+            results = await asyncio.gather(
+                *[auth.verify_token("burst-token") for _ in range(3)]
+            )
+
+        assert [r["id"] for r in results] == ["user-123"] * 3
+        assert mock_remote.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_burst_shares_rejection(self):
+        """Test an upstream 401 reaches every coalesced caller."""
+        from api import auth
+
+        async def remote(token):
+            await asyncio.sleep(0.01)
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+        with patch("api.auth.AUTH_LOCAL_VERIFY", False), \
+             patch("api.auth.verify_token_remotely", side_effect=remote):
+            results = await asyncio.gather(
+                *[auth.verify_token("bad-token") for _ in range(3)],
+                return_exceptions=True,
+            )
+
+        assert all(
+            isinstance(r, HTTPException) and r.status_code == 401 for r in results
+        )
@@ -0,0 +1,130 @@
+"""
+Tests for the batch support endpoint.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+
+
+def _batch(*messages):
+    from api.routes import ChatMessage, SupportBatchRequest
+
+    return SupportBatchRequest(questions=[ChatMessage(message=m) for m in messages])
+
+
+def _quick(message):
+    return "Quick answer" if message.startswith("quick") else None
+
+
+class TestSupportBatch:
+    """Tests for POST /chat/support/batch."""
+
+    @pytest.mark.asyncio
+    async def test_results_in_order_with_quick_responses(self, raw_request):
+        """Test quick responses skip the agent and results keep request order."""
+        from api.routes import chat_support_batch
+
+        async def answer(question, context, user_id):
+            await asyncio.sleep(0.01 if question == "slow" else 0)
+            return {"answer": f"re: {question}", "agent": "SupportBot"}
+
+        with patch("api.routes.get_quick_response", side_effect=_quick), \
+             patch("api.routes.answer_question", side_effect=answer) as mock_answer, \
+             patch("api.routes.ai_limiter.check", new_callable=AsyncMock):
+            response = await chat_support_batch(
+                _batch("slow", "quick one", "fast"), raw_request(), user_id="u1", tier="free"
+            )
+
+        results = response["data"]["results"]
+        assert [r["data"]["answer"] for r in results] == ["re: slow", "Quick answer", "re: fast"]
+        assert results[1]["data"]["quick_response"] is True
+        assert response["data"]["quick_responses"] == 1
+        assert mock_answer.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_per_item_errors(self, raw_request):
+        """Test one failed question doesn't fail the batch."""
+        from api.routes import chat_support_batch
+
+        async def answer(question, context, user_id):
+            if question == "bad":
+                raise RuntimeError("model error")
+            return {"answer": "ok"}
+
+        with patch("api.routes.get_quick_response", return_value=None), \
+             patch("api.routes.answer_question", side_effect=answer), \
+             patch("api.routes.ai_limiter.check", new_callable=AsyncMock):
+            response = await chat_support_batch(
+                _batch("good", "bad"), raw_request(), user_id="u1", tier="free"
+            )
+
+        results = response["data"]["results"]
+        assert results[0]["success"] is True
+        assert results[1] == {"success": False, "error": "model error", "status_code": 500}
+        assert response["data"]["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_bounded_parallelism(self, raw_request):
+        """Test no more than SUPPORT_BATCH_CONCURRENCY questions run at once."""
+        from api.routes import chat_support_batch
+
+        running = 0
+        peak = 0
+
+        async def answer(question, context, user_id):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {"answer": "ok"}
+
+        with patch("api.routes.SUPPORT_BATCH_CONCURRENCY", 2), \
+             patch("api.routes.get_quick_response", return_value=None), \
+             patch("api.routes.answer_question", side_effect=answer), \
+             patch("api.routes.ai_limiter.check", new_callable=AsyncMock):
+            await chat_support_batch(
+                _batch(*[f"q{i}" for i in range(6)]), raw_request(), user_id="u1", tier="free"
+            )
+
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_charged_as_one_weighted_operation(self, raw_request):
+        """Test the batch is one rate-limit check and one quota reservation."""
+        from api.routes import chat_support_batch
+
+        with patch("api.routes.get_quick_response", side_effect=_quick), \
+             patch("api.routes.answer_question", AsyncMock(return_value={"answer": "ok"})), \
+             patch("api.routes.get_client_key", return_value="user:u1"), \
+             patch("api.routes.ai_limiter.check", new_callable=AsyncMock) as mock_check, \
+             patch("api.routes.token_quota") as mock_quota:
+            await chat_support_batch(
+                _batch("a", "b", "quick", "c", "d", "e"), raw_request(), user_id="u1", tier="free"
+            )
+
+        mock_check.assert_awaited_once()
+        assert mock_check.call_args.kwargs["cost"] == 2.0
+        mock_quota.metered.assert_called_once()
+        key, estimate = mock_quota.metered.call_args.args
+        assert key == "user:u1"
+        assert estimate > 0
+
+    def test_rejects_oversized_batch(self):
+        """Test batches above SUPPORT_BATCH_MAX_ITEMS fail validation."""
+        from pydantic import ValidationError
+        from api.routes import SUPPORT_BATCH_MAX_ITEMS
+
+        with pytest.raises(ValidationError):
+            _batch(*["q"] * (SUPPORT_BATCH_MAX_ITEMS + 1))
+        with pytest.raises(ValidationError):
+            _batch()
+
+    def test_full_batch_fits_the_burst(self):
+        """Test a maximal batch of agent-answered questions can be admitted."""
+        from api.rate_limit import ai_limiter
+        from api.routes import SUPPORT_BATCH_ITEM_WEIGHT, SUPPORT_BATCH_MAX_ITEMS
+
+        cost = 1 + (SUPPORT_BATCH_MAX_ITEMS - 1) * SUPPORT_BATCH_ITEM_WEIGHT
+        assert cost <= ai_limiter.requests_per_minute
+
@@ -125,6 +125,66 @@ class TestTripPlannerAgent:
         assert activity.cost_estimate == 0  # Default value
 
 
+class TestTripPlannerStreaming:
+    """Tests for the streaming trip planner."""
+
+    @staticmethod
+    def _stream(*chunks):
+        async def generate():
+            for chunk in chunks:
+                yield chunk
+
+        return AsyncMock(return_value=generate())
+
+    @pytest.mark.asyncio
+    async def test_stream_emits_stages_deltas_and_summary(self):
+        """Test stage changes, text deltas and a final summary matching plan_trip."""
+        with patch("agents.trip_planner.trip_planner_team") as mock_team:
+            mock_team.arun = self._stream(
+                MagicMock(agent_name="Researcher", content="Bali has "),
+                MagicMock(agent_name="Researcher", content="temples. "),
+                MagicMock(agent_name="Planner", content="Day 1: Ubud."),
+            )
+
+            from agents.trip_planner import stream_plan_trip
+
+            events = [
+                event
+                async for event in stream_plan_trip(destination="Bali", duration_days=2)
+            ]
+
+        assert [e["event"] for e in events] == [
+            "stage", "delta", "delta", "stage", "delta", "summary",
+        ]
+        assert events[0]["data"] == {"agent": "Researcher"}
+        assert events[3]["data"] == {"agent": "Planner"}
+        summary = events[-1]["data"]
+        assert summary["plan"] == "Bali has temples. Day 1: Ubud."
+        assert summary["agents_used"] == ["Researcher", "Planner", "Budgeter"]
+        assert mock_team.arun.call_args.kwargs["stream"] is True
+
+    @pytest.mark.asyncio
+    async def test_stream_structured_formats_summary(self):
+        """Test structured streaming ends with the formatted itinerary."""
+        itinerary = MagicMock()
+        itinerary.model_dump.return_value = {"destination": "Bali", "days": []}
+        with patch("agents.trip_planner.trip_planner_team") as mock_team, \
+             patch("agents.trip_planner._format_itinerary", AsyncMock(return_value=itinerary)):
+            mock_team.arun = self._stream(MagicMock(agent_name="Planner", content="Plan"))
+
+            from agents.trip_planner import stream_plan_trip
+
+            events = [
+                event
+                async for event in stream_plan_trip(
+                    destination="Bali", duration_days=1, structured=True
+                )
+            ]
+
+        assert events[-2] == {"event": "stage", "data": {"agent": "TripFormatter"}}
+        assert events[-1] == {"event": "summary", "data": {"destination": "Bali", "days": []}}
+
+
 class TestTripPlannerTeam:
     """Tests for the multi-agent team configuration."""
 
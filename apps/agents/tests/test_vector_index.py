@@ -0,0 +1,177 @@
+"""
+Tests for the persisted knowledge vector index.
+"""
+import pytest
+
+
+DOC = """# FAQ
+
+## Gift cards
+
+Yes, gift cards are available in any amount and never expire.
+
+## Luggage
+
+Each traveler may bring one checked bag and one carry-on.
+
+## Travel insurance
+
+We recommend comprehensive travel insurance covering medical evacuation.
+"""
+
+
+class CountingEmbedder:
+    """HashingEmbedder that counts the texts it embeds."""
+
+    def __init__(self, name: str = "hashing-test"):
+        from agents.embeddings import HashingEmbedder
+
+        self._inner = HashingEmbedder(dim=256)
+        self.name = name
+        self.texts: list[str] = []
+
+    async def embed(self, texts):
+        self.texts.extend(texts)
+        return await self._inner.embed(texts)
+
+    def embed_sync(self, texts):
+        return self._inner.embed_sync(texts)
+
+
+def sections(text: str = DOC):
+    from agents.sections import split_sections
+
+    return split_sections(text, "faq.md")
+
+
+class TestVectorIndex:
+    """Tests for VectorIndex."""
+
+    @pytest.mark.asyncio
+    async def test_first_sync_embeds_everything(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        embedder = CountingEmbedder()
+        index = VectorIndex(str(tmp_path), embedder)
+        await index.sync(sections())
+
+        assert len(embedder.texts) == 3
+        assert index.stats()["embedded_on_load"] == 3
+        assert (tmp_path / "manifest.json").exists()
+
+    @pytest.mark.asyncio
+    async def test_restart_reuses_stored_vectors(self, tmp_path):
+        import numpy as np
+        from agents.vector_index import VectorIndex
+
+        await VectorIndex(str(tmp_path), CountingEmbedder()).sync(sections())
+
+        embedder = CountingEmbedder()
+        index = VectorIndex(str(tmp_path), embedder)
+        await index.sync(sections())
+
+        assert embedder.texts == []
+        assert index.reused == 3
+        assert isinstance(index._snapshot[1], np.memmap)
+
+    @pytest.mark.asyncio
+    async def test_only_changed_sections_are_embedded(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        await VectorIndex(str(tmp_path), CountingEmbedder()).sync(sections())
+
+        edited = DOC.replace("one checked bag", "two checked bags")
+        edited += "\n## Visas\n\nCheck visa requirements before you travel.\n"
+        embedder = CountingEmbedder()
+        index = VectorIndex(str(tmp_path), embedder)
+        await index.sync(sections(edited))
+
+        assert len(embedder.texts) == 2
+        assert "two checked bags" in embedder.texts[0]
+        assert "Visas" in embedder.texts[1]
+        assert index.reused == 2
+        assert len(list(tmp_path.glob("vectors-*.npy"))) == 1
+
+    @pytest.mark.asyncio
+    async def test_embedder_change_reembeds(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        await VectorIndex(str(tmp_path), CountingEmbedder("model-a")).sync(sections())
+
+        embedder = CountingEmbedder("model-b")
+        await VectorIndex(str(tmp_path), embedder).sync(sections())
+
+        assert len(embedder.texts) == 3
+
+    @pytest.mark.asyncio
+    async def test_recreate_reembeds(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        await VectorIndex(str(tmp_path), CountingEmbedder()).sync(sections())
+
+        embedder = CountingEmbedder()
+        await VectorIndex(str(tmp_path), embedder).sync(sections(), recreate=True)
+
+        assert len(embedder.texts) == 3
+
+    @pytest.mark.asyncio
+    async def test_corrupt_vectors_reembed(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        await VectorIndex(str(tmp_path), CountingEmbedder()).sync(sections())
+        for path in tmp_path.glob("vectors-*.npy"):
+            path.write_bytes(b"not an array")
+
+        embedder = CountingEmbedder()
+        await VectorIndex(str(tmp_path), embedder).sync(sections())
+
+        assert len(embedder.texts) == 3
+
+    @pytest.mark.asyncio
+    async def test_query_finds_relevant_section(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        embedder = CountingEmbedder()
+        index = VectorIndex(str(tmp_path), embedder)
+        await index.sync(sections())
+
+        vector = (await embedder.embed(["do you sell gift cards"]))[0]
+        hits = index.query(vector, limit=2)
+
+        assert len(hits) == 2
+        assert hits[0][0].id == "faq.md#gift-cards"
+        assert hits[0][1] >= hits[1][1]
+
+    @pytest.mark.asyncio
+    async def test_empty_knowledge_base(self, tmp_path):
+        from agents.vector_index import VectorIndex
+
+        index = VectorIndex(str(tmp_path), CountingEmbedder())
+        await index.sync([])
+
+        assert index.query([0.0], limit=3) == []
+
+
+class TestVectorKnowledge:
+    """Tests for the agno-facing knowledge wrapper."""
+
+    @pytest.mark.asyncio
+    async def test_aload_reads_sections_from_files(self, tmp_path):
+        from agents.vector_index import VectorKnowledge
+
+        root = tmp_path / "knowledge"
+        (root / "destinations").mkdir(parents=True)
+        (root / "faq.md").write_text(DOC)
+        (root / "destinations" / "bali.md").write_text("# Bali\n\n## Weather\n\nDry from April to October.\n")
+
+        knowledge = VectorKnowledge(
+            [root / "faq.md", root / "destinations" / "bali.md"],
+            root=root,
+            embedder=CountingEmbedder(),
+            index_dir=str(tmp_path / "index"),
+        )
+        await knowledge.aload()
+
+        ids = [section.id for section in knowledge.index.sections]
+        assert ids[-1] == "destinations/bali.md#weather"
+        assert len(ids) == 4